@@ -0,0 +1,56 @@
+# benchmarks/bench_report_query.py
+"""Сравнение текущего запроса отчета (итоги из order_summary) и прежнего
+запроса с общим GROUP BY на нарядах с большим числом рабочих и строк работ.
+
+Запуск: python -m benchmarks.bench_report_query [нарядов] [рабочих] [работ]
+"""
+import sqlite3
+import sys
+import time
+
+from db.database import Database
+from db.queries import REPORT_BASE_QUERY
+from db.seed import seed_wide_orders
+
+# Прежний запрос: рабочие и работы соединялись в одном GROUP BY (веер строк)
+LEGACY_REPORT_QUERY = """
+SELECT
+    wo.id AS order_id,
+    COALESCE(wo.order_date, 'Нет данных') AS order_date,
+    COALESCE(p.name, 'Не указано') AS product,
+    COALESCE(c.contract_code, 'Без контракта') AS contract_code,
+    COALESCE(SUM(owt.amount), 0) AS total_amount,
+    COALESCE(GROUP_CONCAT(e.full_name, ', '), 'Не выбраны') AS workers
+FROM work_orders wo
+LEFT JOIN products p ON wo.product_id = p.id
+LEFT JOIN contracts c ON wo.contract_id = c.id
+LEFT JOIN order_workers ow ON wo.id = ow.order_id
+LEFT JOIN employees e ON ow.worker_id = e.id
+LEFT JOIN order_work_types owt ON wo.id = owt.order_id
+GROUP BY wo.id
+"""
+
+
+def _timed(conn: sqlite3.Connection, query: str) -> float:
+    started = time.perf_counter()
+    conn.execute(query).fetchall()
+    return time.perf_counter() - started
+
+
+def main(orders: int = 200, workers: int = 50, works: int = 50) -> None:
+    db = Database(":memory:")
+    try:
+        seed_wide_orders(db, orders, workers, works)
+        conn = db.conn
+        legacy = _timed(conn, LEGACY_REPORT_QUERY)
+        current = _timed(conn, REPORT_BASE_QUERY)
+        print(f"Нарядов: {orders}, рабочих: {workers}, работ: {works}")
+        print(f"Прежний запрос (GROUP BY по всем соединениям): {legacy * 1000:.1f} мс")
+        print(f"Текущий запрос (итоги order_summary):          {current * 1000:.1f} мс")
+        print(f"Ускорение: {legacy / current:.1f}x")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:4]))
@@ -0,0 +1,221 @@
+# benchmarks/dataset.py
+"""Генератор синтетических данных производственного объема для схемы нарядов.
+
+Запуск: python -m benchmarks.dataset --preset small --db bench.db [--seed 42]
+"""
+import argparse
+import logging
+import random
+import sys
+import time
+from datetime import date, timedelta
+from itertools import accumulate
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from db.database import Database
+
+logger = logging.getLogger(__name__)
+
+
+class DatasetPreset(NamedTuple):
+    """Объемы справочников и нарядов."""
+    employees: int
+    work_types: int
+    products: int
+    contracts: int
+    orders: int
+    years: int = 5
+    # Типичное и наибольшее число рабочих и строк работ в одном наряде
+    typical_workers: int = 2
+    typical_works: int = 3
+    max_workers: int = 30
+    max_works: int = 50
+    workshops: int = 12
+
+
+PRESETS: Dict[str, DatasetPreset] = {
+    "tiny": DatasetPreset(employees=50, work_types=20, products=10, contracts=5, orders=1_000, years=1),
+    "small": DatasetPreset(employees=500, work_types=100, products=50, contracts=20, orders=20_000, years=2),
+    "medium": DatasetPreset(employees=3_000, work_types=300, products=200, contracts=100, orders=200_000),
+    "plant": DatasetPreset(employees=3_000, work_types=500, products=500, contracts=300, orders=1_000_000),
+    "large": DatasetPreset(employees=5_000, work_types=800, products=1_000, contracts=500, orders=3_000_000,
+                           years=10),
+}
+
+# Первый год периода нарядов
+DATASET_START_YEAR = 2020
+
+# Наряды записываются пачками: одна транзакция на пачку ограничивает рост WAL
+ORDERS_PER_COMMIT = 20_000
+
+_SURNAMES = ("Иванов", "Смирнов", "Кузнецов", "Попов", "Васильев", "Петров", "Соколов", "Михайлов",
+             "Новиков", "Федоров", "Морозов", "Волков", "Алексеев", "Лебедев", "Семенов", "Егоров",
+             "Павлов", "Козлов", "Степанов", "Николаев", "Орлов", "Андреев", "Макаров", "Никитин")
+_NAMES = ("Александр", "Сергей", "Дмитрий", "Андрей", "Алексей", "Максим", "Евгений", "Иван",
+          "Михаил", "Николай", "Владимир", "Павел", "Олег", "Юрий", "Виктор", "Игорь")
+_PATRONYMICS = ("Александрович", "Сергеевич", "Дмитриевич", "Андреевич", "Иванович", "Петрович",
+                "Николаевич", "Владимирович", "Михайлович", "Викторович")
+_POSITIONS = ("Слесарь-сборщик", "Токарь", "Фрезеровщик", "Сварщик", "Монтажник", "Электромонтажник",
+              "Маляр", "Контролер ОТК", "Шлифовщик", "Наладчик")
+_OPERATIONS = ("Сборка", "Монтаж", "Сварка", "Покраска", "Регулировка", "Пайка", "Фрезеровка",
+               "Зачистка", "Проверка", "Упаковка", "Разметка", "Сверловка")
+_UNITS = ("штуки", "комплекты")
+
+
+def _skewed_count(rng: random.Random, typical: int, limit: int) -> int:
+    """Число дочерних строк наряда: в основном около typical, изредка много
+    (распределение Парето с хвостом, ограниченное limit)."""
+    return min(limit, max(1, int(typical * rng.paretovariate(1.8))))
+
+
+def _zipf_cum_weights(size: int) -> List[float]:
+    """Накопленные веса популярности: первые позиции используются чаще."""
+    return list(accumulate(1.0 / rank for rank in range(1, size + 1)))
+
+
+class DatasetGenerator:
+    """Заполняет все таблицы схемы детерминированными (по seed) данными."""
+
+    def __init__(self, db: Database, preset: DatasetPreset, seed: int = 42) -> None:
+        self.db = db
+        self.preset = preset
+        self.rng = random.Random(seed)
+        self._prices: List[float] = []
+
+    def generate(self) -> Dict[str, int]:
+        """Массовая загрузка справочников и нарядов; возвращает число строк по таблицам."""
+        started = time.perf_counter()
+        counts = {
+            "employees": self._insert(
+                "INSERT INTO employees (id, employee_id, full_name, workshop_number, position)"
+                " VALUES (?, ?, ?, ?, ?)", self._employees()),
+            "work_types": self._insert(
+                "INSERT INTO work_types (id, name, unit, price) VALUES (?, ?, ?, ?)", self._work_types()),
+            "products": self._insert(
+                "INSERT INTO products (id, name, product_code) VALUES (?, ?, ?)", self._products()),
+            "contracts": self._insert(
+                "INSERT INTO contracts (id, contract_code, start_date, end_date, description)"
+                " VALUES (?, ?, ?, ?, ?)", self._contracts()),
+        }
+        counts.update(self._insert_orders())
+        self.db.analyze()
+        logger.info(f"Сгенерировано за {time.perf_counter() - started:.1f} с: {counts}")
+        return counts
+
+    def _insert(self, query: str, rows: Iterator[Tuple]) -> int:
+        with self.db.transaction() as conn:
+            return conn.executemany(query, rows).rowcount
+
+    def _employees(self) -> Iterator[Tuple]:
+        for i in range(1, self.preset.employees + 1):
+            full_name = " ".join((self.rng.choice(_SURNAMES), self.rng.choice(_NAMES),
+                                  self.rng.choice(_PATRONYMICS)))
+            workshop = (i - 1) % self.preset.workshops + 1
+            yield i, f"{100000 + i}", full_name, workshop, self.rng.choice(_POSITIONS)
+
+    def _work_types(self) -> Iterator[Tuple]:
+        for i in range(1, self.preset.work_types + 1):
+            price = round(self.rng.uniform(15, 2500), 2)
+            self._prices.append(price)
+            name = f"{self.rng.choice(_OPERATIONS)} узла {i:04d}"
+            yield i, name, self.rng.choice(_UNITS), price
+
+    def _products(self) -> Iterator[Tuple]:
+        for i in range(1, self.preset.products + 1):
+            yield i, f"Изделие {i:04d}", f"ИЗД-{i:05d}"
+
+    def _contracts(self) -> Iterator[Tuple]:
+        first_day = self._first_day()
+        for i in range(1, self.preset.contracts + 1):
+            start = first_day + timedelta(days=self.rng.randrange(self.preset.years * 365))
+            end = start + timedelta(days=self.rng.randrange(90, 730))
+            yield i, f"К-{i:05d}", start.isoformat(), end.isoformat(), f"Контракт {i}"
+
+    def _first_day(self) -> date:
+        """Начало периода нарядов; фиксировано, чтобы данные зависели только от seed."""
+        return date(DATASET_START_YEAR, 1, 1)
+
+    def _insert_orders(self) -> Dict[str, int]:
+        """Наряды в хронологическом порядке с бригадами из одного цеха."""
+        preset = self.preset
+        workshops: Dict[int, List[int]] = {}
+        for employee_id in range(1, preset.employees + 1):
+            workshops.setdefault((employee_id - 1) % preset.workshops + 1, []).append(employee_id)
+        work_type_ids = list(range(1, preset.work_types + 1))
+        work_weights = _zipf_cum_weights(preset.work_types)
+        product_weights = _zipf_cum_weights(preset.products)
+        days = preset.years * 365
+        first_day = self._first_day()
+
+        counts = {"work_orders": 0, "order_workers": 0, "order_work_types": 0}
+        for batch_start in range(1, preset.orders + 1, ORDERS_PER_COMMIT):
+            batch_end = min(preset.orders + 1, batch_start + ORDERS_PER_COMMIT)
+            orders: List[Tuple] = []
+            workers: List[Tuple[int, int]] = []
+            works: List[Tuple] = []
+            for order_id in range(batch_start, batch_end):
+                day = first_day + timedelta(days=(order_id - 1) * days // preset.orders)
+                brigade = workshops[self.rng.randrange(1, preset.workshops + 1)]
+                size = _skewed_count(self.rng, preset.typical_workers, preset.max_workers)
+                members = self.rng.sample(brigade, min(len(brigade), size))
+                workers.extend((order_id, worker_id) for worker_id in members)
+
+                lines = set(self.rng.choices(work_type_ids, cum_weights=work_weights,
+                                             k=_skewed_count(self.rng, preset.typical_works, preset.max_works)))
+                total = 0.0
+                for work_type_id in lines:
+                    quantity = self.rng.randint(1, 40)
+                    amount = round(self._prices[work_type_id - 1] * quantity, 2)
+                    total += amount
+                    works.append((order_id, work_type_id, quantity, amount))
+
+                product_id = self.rng.choices(range(1, preset.products + 1), cum_weights=product_weights)[0]
+                contract_id = self.rng.randint(1, preset.contracts)
+                orders.append((order_id, day.isoformat(), product_id, contract_id, round(total, 2)))
+
+            # Родительские строки раньше дочерних: триггеры order_summary находят строку итогов
+            with self.db.transaction() as conn:
+                conn.executemany(
+                    "INSERT INTO work_orders (id, order_date, product_id, contract_id, total_amount)"
+                    " VALUES (?, ?, ?, ?, ?)", orders)
+                conn.executemany("INSERT INTO order_workers (order_id, worker_id) VALUES (?, ?)", workers)
+                conn.executemany(
+                    "INSERT INTO order_work_types (order_id, work_type_id, quantity, amount)"
+                    " VALUES (?, ?, ?, ?)", works)
+            counts["work_orders"] += len(orders)
+            counts["order_workers"] += len(workers)
+            counts["order_work_types"] += len(works)
+            logger.info(f"Загружено нарядов: {counts['work_orders']} из {preset.orders}")
+        return counts
+
+
+def generate_dataset(db: Database, preset: str = "tiny", seed: int = 42) -> Dict[str, int]:
+    """Заполняет пустую БД данными выбранного объема."""
+    return DatasetGenerator(db, PRESETS[preset], seed).generate()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Генерация синтетической БД нарядов")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--db", type=Path, default=Path("bench_work_orders.db"))
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    if args.db.exists():
+        print(f"Файл {args.db} уже существует, укажите новый путь")
+        return 1
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(message)s")
+    db = Database(args.db)
+    try:
+        counts = generate_dataset(db, args.preset, args.seed)
+    finally:
+        db.close()
+    for table, count in counts.items():
+        print(f"{table}: {count}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
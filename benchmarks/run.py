@@ -0,0 +1,295 @@
+# benchmarks/run.py
+"""Набор бенчмарков сохранения нарядов, импорта, отчетов и резервного
+копирования с контролем регрессий относительно сохраненных базовых значений.
+
+Запуск:
+    python -m benchmarks.run --preset tiny --preset small
+    python -m benchmarks.run --preset small --update-baseline
+"""
+import argparse
+import json
+import logging
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from benchmarks.dataset import PRESETS, DatasetPreset, generate_dataset
+from db.database import Database
+from db.migrations import MIGRATIONS
+
+logger = logging.getLogger(__name__)
+
+BASELINE_PATH = Path(__file__).with_name("baselines.json")
+DATA_DIR = Path(__file__).with_name(".data")
+# Допустимое замедление относительно базового значения
+DEFAULT_TOLERANCE = 0.25
+# Разница меньше этой считается шумом измерения, с
+MIN_REGRESSION_SECONDS = 0.05
+# Сколько нарядов сохраняется в замере пропускной способности
+ORDERS_TO_SAVE = 200
+
+
+class BenchmarkResult(NamedTuple):
+    preset: str
+    name: str
+    seconds: Optional[float]
+    skipped: Optional[str] = None
+
+
+class Regression(NamedTuple):
+    preset: str
+    name: str
+    seconds: float
+    baseline: float
+
+    def __str__(self) -> str:
+        return (f"{self.preset}/{self.name}: {self.seconds:.3f} с при базовом {self.baseline:.3f} с "
+                f"(+{(self.seconds / self.baseline - 1) * 100:.0f}%)")
+
+
+def dataset_path(preset: str, seed: int = 42, data_dir: Path = DATA_DIR) -> Path:
+    """Файл с данными пресета; генерируется один раз и переиспользуется."""
+    path = data_dir / f"{preset}_seed{seed}_v{MIGRATIONS[-1].version}.db"
+    if not path.exists():
+        data_dir.mkdir(exist_ok=True, parents=True)
+        partial = path.with_suffix(".partial")
+        partial.unlink(missing_ok=True)
+        db = Database(partial)
+        try:
+            generate_dataset(db, preset, seed)
+            db.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            db.close()
+        partial.rename(path)
+    return path
+
+
+def _timed(action: Callable[[], object]) -> float:
+    started = time.perf_counter()
+    result = action()
+    elapsed = time.perf_counter() - started
+    if result is None or result is False:
+        raise RuntimeError("операция завершилась без результата, подробности в логе")
+    return elapsed
+
+
+def bench_order_save(db: Database, workdir: Path, preset: DatasetPreset) -> float:
+    """Пропускная способность сохранения нарядов (путь формы без GUI)."""
+    from db.orders import save_work_order
+
+    prices = db.execute_query("SELECT id, price FROM work_types ORDER BY id LIMIT 8")
+    works = [{"type_id": type_id, "price": price, "quantity": 3} for type_id, price in prices]
+    workers = [row[0] for row in db.execute_query("SELECT id FROM employees ORDER BY id LIMIT 5")]
+
+    def save_orders() -> bool:
+        for _ in range(ORDERS_TO_SAVE):
+            save_work_order(db, "2024-06-15", 1, 1, workers, works)
+        return True
+
+    return _timed(save_orders)
+
+
+def bench_excel_import(db: Database, workdir: Path, preset: DatasetPreset) -> float:
+    """Импорт работников из Excel-файла (объем зависит от пресета)."""
+    import pandas as pd
+    from utils.excel_handler import ExcelHandler
+
+    rows = preset.employees * 4
+    source = workdir / "employees.xlsx"
+    pd.DataFrame({
+        "ФИО": [f"Импортов Иван {i}" for i in range(rows)],
+        "Номер цеха": [i % preset.workshops + 1 for i in range(rows)],
+        "Должность": ["Слесарь"] * rows,
+        "Табельный номер": [f"IMP{i:07d}" for i in range(rows)],
+    }).to_excel(source, index=False)
+
+    handler = ExcelHandler(db)
+    return _timed(lambda: handler.import_table("employees", source)[0])
+
+
+def bench_excel_report(db: Database, workdir: Path, preset: DatasetPreset) -> float:
+    """Сводный Excel-отчет по всем нарядам."""
+    from reports.excel_report import ExcelReportGenerator
+
+    return _timed(ExcelReportGenerator(db, output_dir=workdir).generate)
+
+
+def bench_excel_report_stream(db: Database, workdir: Path, preset: DatasetPreset) -> float:
+    """Тот же Excel-отчет потоковой выгрузкой (write-only книга)."""
+    from reports.excel_report import ExcelReportGenerator
+
+    return _timed(ExcelReportGenerator(db, output_dir=workdir).generate_streaming)
+
+
+def bench_pdf_report(db: Database, workdir: Path, preset: DatasetPreset) -> float:
+    """Сводный PDF-отчет по всем нарядам."""
+    from reports.pdf_report import PDFReportGenerator
+
+    return _timed(PDFReportGenerator(db, output_dir=workdir).generate)
+
+
+def bench_html_report(db: Database, workdir: Path, preset: DatasetPreset) -> float:
+    """Сводный HTML-отчет по всем нарядам (потоковая запись)."""
+    from reports.html_report import HTMLReportGenerator
+
+    return _timed(HTMLReportGenerator(db, output_dir=workdir).generate)
+
+
+def bench_report_bundle(db: Database, workdir: Path, preset: DatasetPreset) -> float:
+    """Комплект Excel, PDF и HTML по одному снимку данных."""
+    from reports.bundle import ReportBundleGenerator
+
+    return _timed(ReportBundleGenerator(db, output_dir=workdir).generate)
+
+
+def bench_backup(db: Database, workdir: Path, preset: DatasetPreset) -> float:
+    """Создание резервной копии БД."""
+    from db.backup import BackupManager
+
+    manager = BackupManager(str(db.db_path), backup_dir=str(workdir / "backups"))
+    return _timed(manager.create_backup)
+
+
+BENCHMARKS: Dict[str, Callable[[Database, Path, DatasetPreset], float]] = {
+    "order_save": bench_order_save,
+    "excel_import": bench_excel_import,
+    "excel_report": bench_excel_report,
+    "excel_report_stream": bench_excel_report_stream,
+    "pdf_report": bench_pdf_report,
+    "html_report": bench_html_report,
+    "report_bundle": bench_report_bundle,
+    "backup": bench_backup,
+}
+
+
+def run_benchmarks(
+        presets: Sequence[str],
+        names: Optional[Sequence[str]] = None,
+        repeat: int = 3,
+        data_dir: Path = DATA_DIR
+) -> List[BenchmarkResult]:
+    """Выполняет замеры; каждый повтор идет на свежей копии данных, берется медиана."""
+    results = []
+    for preset in presets:
+        source = dataset_path(preset, data_dir=data_dir)
+        for name in names or BENCHMARKS:
+            bench = BENCHMARKS[name]
+            timings = []
+            skipped = None
+            for _ in range(repeat):
+                with tempfile.TemporaryDirectory() as tmp:
+                    workdir = Path(tmp)
+                    db_copy = workdir / "bench.db"
+                    shutil.copy2(source, db_copy)
+                    db = Database(db_copy)
+                    try:
+                        timings.append(bench(db, workdir, PRESETS[preset]))
+                    except ImportError as e:
+                        skipped = f"нет {e.name}"
+                    finally:
+                        db.close()
+                if skipped:
+                    break
+            seconds = statistics.median(timings) if timings else None
+            results.append(BenchmarkResult(preset, name, seconds, skipped))
+            logger.info(f"{preset}/{name}: {seconds if seconds is not None else skipped}")
+    return results
+
+
+def load_baseline(path: Path = BASELINE_PATH) -> Dict[str, Dict[str, float]]:
+    if not path.exists():
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(results: Sequence[BenchmarkResult], path: Path = BASELINE_PATH) -> None:
+    """Записывает результаты как новые базовые значения (остальные сохраняются)."""
+    baseline = load_baseline(path)
+    for result in results:
+        if result.seconds is not None:
+            baseline.setdefault(result.preset, {})[result.name] = round(result.seconds, 4)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def find_regressions(
+        results: Sequence[BenchmarkResult],
+        baseline: Dict[str, Dict[str, float]],
+        tolerance: float = DEFAULT_TOLERANCE
+) -> List[Regression]:
+    """Замеры, которые медленнее базовых больше чем на tolerance (и больше шума)."""
+    regressions = []
+    for result in results:
+        reference = baseline.get(result.preset, {}).get(result.name)
+        if result.seconds is None or not reference:
+            continue
+        if result.seconds > max(reference * (1 + tolerance), reference + MIN_REGRESSION_SECONDS):
+            regressions.append(Regression(result.preset, result.name, result.seconds, reference))
+    return regressions
+
+
+def find_missing_baselines(
+        results: Sequence[BenchmarkResult],
+        baseline: Dict[str, Dict[str, float]]
+) -> List[str]:
+    """Выполненные замеры без базового значения: сравнить их не с чем."""
+    return [
+        f"{result.preset}/{result.name}" for result in results
+        if result.seconds is not None and not baseline.get(result.preset, {}).get(result.name)
+    ]
+
+
+def format_results(results: Sequence[BenchmarkResult], baseline: Dict[str, Dict[str, float]]) -> str:
+    lines = [f"{'Пресет':<8} {'Замер':<20} {'Время, с':>10} {'Базовое, с':>11}"]
+    for result in results:
+        reference = baseline.get(result.preset, {}).get(result.name)
+        seconds = f"{result.seconds:.3f}" if result.seconds is not None else result.skipped
+        lines.append(f"{result.preset:<8} {result.name:<20} {seconds:>10} "
+                     f"{reference if reference is not None else '-':>11}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарки производительности")
+    parser.add_argument("--preset", action="append", choices=sorted(PRESETS))
+    parser.add_argument("--only", action="append", choices=sorted(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    results = run_benchmarks(args.preset or ["tiny"], args.only, args.repeat)
+    baseline = load_baseline(args.baseline)
+    print(format_results(results, baseline))
+
+    if args.update_baseline:
+        save_baseline(results, args.baseline)
+        print(f"Базовые значения обновлены: {args.baseline}")
+        return 0
+
+    failed = False
+    missing = find_missing_baselines(results, baseline)
+    if missing:
+        print("\nНет базовых значений (запустите с --update-baseline):")
+        for name in missing:
+            print(f"  {name}")
+        failed = True
+
+    regressions = find_regressions(results, baseline, args.tolerance)
+    if regressions:
+        print("\nРегрессии производительности:")
+        for regression in regressions:
+            print(f"  {regression}")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
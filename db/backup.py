@@ -1,37 +1,146 @@
 # db/backup.py
+import argparse
+import gzip
+import json
+import lzma
 import os
 import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime
-from typing import Optional
+from typing import IO, Callable, Dict, List, Optional, Sequence, Tuple
 import logging
 
+from db.backup_store import ChunkStore
+from utils.progress import ProgressCallback
+
+try:
+    import zstandard
+except ImportError:  # zstd необязателен, без него доступны lzma и gzip
+    zstandard = None
+
 logger = logging.getLogger(__name__)
 
+# Страниц за один шаг копирования: между шагами БД доступна другим соединениям
+BACKUP_PAGES_PER_STEP = 1024
+
+# Расширения файлов сжатых копий
+COMPRESSION_SUFFIXES = {"lzma": ".xz", "gzip": ".gz", "zstd": ".zst"}
+
+# Буфер потокового сжатия: память не зависит от размера БД
+STREAM_BUFFER_SIZE = 1024 * 1024
+
+# Список копий для ротации (вместо glob и stat при каждом запуске)
+INDEX_FILE = "index.json"
+
+
+def open_compressed(path: Path, mode: str, compression: Optional[str]) -> IO[bytes]:
+    """Файл копии с потоковым сжатием (compression=None - без сжатия)."""
+    if compression is None:
+        return open(path, mode)
+    if compression == "lzma":
+        return lzma.open(path, mode, preset=3) if "w" in mode else lzma.open(path, mode)
+    if compression == "gzip":
+        return gzip.open(path, mode, compresslevel=6)
+    if compression == "zstd":
+        if zstandard is None:
+            raise ValueError("Сжатие zstd недоступно: не установлен пакет zstandard")
+        return zstandard.open(path, mode)
+    raise ValueError(f"Неизвестный формат сжатия: {compression}")
+
+
+def compression_of(path: Path) -> Optional[str]:
+    """Формат сжатия копии по расширению файла."""
+    for compression, suffix in COMPRESSION_SUFFIXES.items():
+        if path.name.endswith(suffix):
+            return compression
+    return None
+
+
+def check_backup(path: str) -> Tuple[str, str]:
+    """Распаковывает копию во временный файл и выполняет PRAGMA integrity_check.
+
+    Выполняется в отдельном процессе: возвращает (путь, "ok" или описание ошибки).
+    """
+    source = Path(path)
+    compression = compression_of(source)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_file = source
+            if compression is not None:
+                db_file = Path(tmp) / "check.db"
+                with open_compressed(source, "rb", compression) as src, open(db_file, "wb") as dst:
+                    shutil.copyfileobj(src, dst, STREAM_BUFFER_SIZE)
+            conn = sqlite3.connect(f"{db_file.resolve().as_uri()}?mode=ro", uri=True)
+            try:
+                rows = conn.execute("PRAGMA integrity_check").fetchall()
+            finally:
+                conn.close()
+        return path, "; ".join(row[0] for row in rows)
+    except (OSError, EOFError, ValueError, sqlite3.Error, lzma.LZMAError) as e:
+        return path, f"ошибка чтения: {str(e)}"
+
+
 class BackupManager:
-    """Управление резервными копиями БД с автоматическим созданием директории."""
+    """Управление резервными копиями БД с автоматическим созданием директории.
+
+    Копия снимается через SQLite backup API (или VACUUM INTO), поэтому она
+    согласована даже при открытых соединениях приложения.
+    """
 
-    def __init__(self, db_path: str, backup_dir: str = "backups", max_backups: int = 20):
+    def __init__(
+            self,
+            db_path: str,
+            backup_dir: str = "backups",
+            max_backups: int = 20,
+            pages_per_step: int = BACKUP_PAGES_PER_STEP,
+            compression: Optional[str] = None
+    ):
+        if compression is not None and compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"Неизвестный формат сжатия: {compression}")
         self.db_path = Path(db_path)
         self.backup_dir = Path(backup_dir)
         self.max_backups = max_backups
+        self.pages_per_step = pages_per_step
+        self.compression = compression
+        self.index_path = self.backup_dir / INDEX_FILE
         self._ensure_backup_dir()
 
     def _ensure_backup_dir(self) -> None:
         """Создать директории для резервных копий."""
         self.backup_dir.mkdir(exist_ok=True, parents=True)
 
-    def create_backup(self) -> Optional[str]:
-        """Создание резервной копии с обработкой отсутствия файла."""
+    def create_backup(self, progress: Optional[ProgressCallback] = None, compact: bool = False) -> Optional[str]:
+        """Создание резервной копии с обработкой отсутствия файла.
+
+        compact=True снимает копию через VACUUM INTO: файл без свободных
+        страниц, но прогресс при этом не сообщается. При заданном сжатии
+        снимок потоково сжимается и исходный снимок удаляется.
+        """
         try:
             if not self.db_path.exists():
                 logger.warning(f"Файл БД {self.db_path} не найден, резервная копия не создана")
                 return None
 
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
             backup_path = self.backup_dir / f"backup_{timestamp}.db"
-            shutil.copy2(str(self.db_path), str(backup_path))
-            self._cleanup_old_backups()
+            # Копия пишется во временный файл: прерванное копирование не оставит
+            # файл, похожий на готовую резервную копию
+            partial_path = backup_path.with_name(backup_path.name + ".part")
+            partial_path.unlink(missing_ok=True)
+            if compact:
+                self._vacuum_into(partial_path)
+            else:
+                self._copy_online(partial_path, progress)
+            if self.compression is not None:
+                backup_path = self._compress(partial_path, backup_path)
+            else:
+                partial_path.replace(backup_path)
+            self._register_backup(backup_path)
             logger.info(f"Создана резервная копия: {backup_path}")
             return str(backup_path)
 
@@ -39,14 +148,177 @@ class BackupManager:
             logger.error(f"Ошибка резервного копирования: {str(e)}", exc_info=True)
             return None
 
-    def _cleanup_old_backups(self) -> None:
-        """Удаление старых копий, если превышен лимит."""
-        backups = sorted(
-            self.backup_dir.glob("backup_*.db"),
-            key=lambda x: x.stat().st_mtime,
-            reverse=False
-        )
-
-        while len(backups) > self.max_backups:
-            old_backup = backups.pop(0)
-            os.remove(str(old_backup))
\ No newline at end of file
+    def create_incremental_backup(self, progress: Optional[ProgressCallback] = None) -> Optional[str]:
+        """Инкрементная копия в хранилище блоков (backup_dir/store).
+
+        Снимок БД делается во временный файл и режется на блоки; на диске
+        остаются только блоки, которых еще нет в хранилище. Возвращает путь
+        манифеста копии.
+        """
+        try:
+            if not self.db_path.exists():
+                logger.warning(f"Файл БД {self.db_path} не найден, резервная копия не создана")
+                return None
+
+            # Свое имя снимка у каждого запуска: параллельные копии не затирают друг друга
+            fd, name = tempfile.mkstemp(prefix="snapshot_", suffix=".db.part", dir=self.backup_dir)
+            os.close(fd)
+            snapshot = Path(name)
+            try:
+                self._copy_online(snapshot, progress)
+                store = ChunkStore(self.backup_dir / "store")
+                stored = store.add(snapshot, source=str(self.db_path))
+                store.prune(self.max_backups)
+            finally:
+                snapshot.unlink(missing_ok=True)
+            return str(stored.manifest)
+
+        except Exception as e:
+            logger.error(f"Ошибка резервного копирования: {str(e)}", exc_info=True)
+            return None
+
+    def create_backup_async(
+            self,
+            progress: Optional[ProgressCallback] = None,
+            compact: bool = False,
+            on_done: Optional[Callable[[Optional[str]], None]] = None,
+            incremental: bool = False
+    ) -> threading.Thread:
+        """Создание резервной копии в фоновом потоке; on_done получает путь копии или None."""
+        def run() -> None:
+            if incremental:
+                result = self.create_incremental_backup(progress)
+            else:
+                result = self.create_backup(progress, compact)
+            if on_done is not None:
+                on_done(result)
+
+        # Не фоновый (daemon) поток: при выходе из приложения копия дописывается
+        thread = threading.Thread(target=run, name="backup")
+        thread.start()
+        return thread
+
+    def _copy_online(self, target: Path, progress: Optional[ProgressCallback]) -> None:
+        """Постраничное копирование через sqlite3.Connection.backup."""
+        def report(status: int, remaining: int, total: int) -> None:
+            logger.debug(f"Резервное копирование: {total - remaining} из {total} страниц")
+            if progress is not None:
+                progress(total - remaining, total)
+
+        source = sqlite3.connect(str(self.db_path))
+        destination = sqlite3.connect(str(target))
+        try:
+            source.backup(destination, pages=self.pages_per_step, progress=report)
+        finally:
+            destination.close()
+            source.close()
+
+    def _vacuum_into(self, target: Path) -> None:
+        """Сжатая копия без свободных страниц (VACUUM INTO)."""
+        source = sqlite3.connect(str(self.db_path))
+        try:
+            source.execute("VACUUM INTO ?", (str(target),))
+        finally:
+            source.close()
+
+    def _compress(self, snapshot: Path, backup_path: Path) -> Path:
+        """Потоковое сжатие снимка в файл копии."""
+        compressed_path = backup_path.with_name(backup_path.name + COMPRESSION_SUFFIXES[self.compression])
+        partial_path = compressed_path.with_name(compressed_path.name + ".part")
+        try:
+            with open(snapshot, "rb") as src, open_compressed(partial_path, "wb", self.compression) as dst:
+                shutil.copyfileobj(src, dst, STREAM_BUFFER_SIZE)
+            partial_path.replace(compressed_path)
+        finally:
+            snapshot.unlink(missing_ok=True)
+            partial_path.unlink(missing_ok=True)
+        return compressed_path
+
+    def list_backups(self) -> List[Path]:
+        """Полные копии от старых к новым по индексу."""
+        return [self.backup_dir / entry["file"] for entry in self._load_index()]
+
+    def _load_index(self) -> List[Dict]:
+        """Индекс копий; при первом запуске строится по уже лежащим в каталоге файлам."""
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            existing = sorted(
+                (path for path in self.backup_dir.glob("backup_*.db*") if not path.name.endswith(".part")),
+                key=lambda x: x.stat().st_mtime
+            )
+            return [{"file": path.name, "size": path.stat().st_size} for path in existing]
+        except (OSError, ValueError) as e:
+            logger.warning(f"Индекс резервных копий не читается, будет построен заново: {str(e)}")
+            self.index_path.unlink(missing_ok=True)
+            return self._load_index()
+
+    def _save_index(self, entries: List[Dict]) -> None:
+        partial_path = self.index_path.with_name(INDEX_FILE + ".part")
+        with open(partial_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False, indent=1)
+        partial_path.replace(self.index_path)
+
+    def _register_backup(self, backup_path: Path) -> None:
+        """Добавляет копию в индекс и удаляет старые, если превышен лимит."""
+        entries = self._load_index()
+        entries.append({
+            "file": backup_path.name,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "size": backup_path.stat().st_size,
+            "compression": self.compression,
+        })
+        while len(entries) > self.max_backups:
+            old_backup = self.backup_dir / entries.pop(0)["file"]
+            if old_backup.exists():
+                os.remove(str(old_backup))
+        self._save_index(entries)
+
+    def verify_backups(
+            self,
+            backups: Optional[Sequence[Path]] = None,
+            workers: Optional[int] = None
+    ) -> Dict[str, str]:
+        """Проверка целостности копий в параллельных процессах.
+
+        Возвращает {путь: "ok" или описание проблемы}.
+        """
+        paths = [str(path) for path in (backups if backups is not None else self.list_backups())]
+        if not paths:
+            return {}
+        with ProcessPoolExecutor(max_workers=workers or min(len(paths), os.cpu_count() or 1)) as pool:
+            results = dict(pool.map(check_backup, paths))
+        for path, result in results.items():
+            if result != "ok":
+                logger.error(f"Резервная копия {path} повреждена: {result}")
+        return results
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Резервные копии БД")
+    parser.add_argument("--db", default="work_orders.db")
+    parser.add_argument("--backup-dir", default="backups")
+    commands = parser.add_subparsers(dest="command", required=True)
+    create_parser = commands.add_parser("create")
+    create_parser.add_argument("--compression", choices=sorted(COMPRESSION_SUFFIXES))
+    create_parser.add_argument("--compact", action="store_true")
+    verify_parser = commands.add_parser("verify")
+    verify_parser.add_argument("backups", type=Path, nargs="*")
+    verify_parser.add_argument("--workers", type=int)
+    args = parser.parse_args(argv)
+
+    if args.command == "create":
+        manager = BackupManager(args.db, args.backup_dir, compression=args.compression)
+        backup_path = manager.create_backup(compact=args.compact)
+        print(backup_path or "Резервная копия не создана, подробности в логе")
+        return 0 if backup_path else 1
+
+    results = BackupManager(args.db, args.backup_dir).verify_backups(args.backups or None, args.workers)
+    for path, result in results.items():
+        print(f"{path}: {result}")
+    return 0 if all(result == "ok" for result in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+# db/backup_store.py
+"""Хранилище инкрементных резервных копий: файл БД режется на блоки
+фиксированного размера, блоки хранятся по SHA-256 содержимого, копия
+описывается манифестом - списком хешей. Неизменившиеся страницы БД
+попадают в уже записанные блоки и места не занимают.
+
+Запуск:
+    python -m db.backup_store list [--store backups/store]
+    python -m db.backup_store verify [манифест]
+    python -m db.backup_store restore манифест путь_к_БД
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Set
+
+logger = logging.getLogger(__name__)
+
+# Размер блока кратен любому размеру страницы SQLite, поэтому изменение
+# страницы затрагивает ровно один блок
+CHUNK_SIZE = 256 * 1024
+
+DEFAULT_STORE_DIR = Path("backups/store")
+
+# Блокировки хранилищ по каталогу: запись копии и очистка одного хранилища
+# из разных потоков (и разных экземпляров ChunkStore) идут по очереди
+_store_locks: Dict[Path, threading.RLock] = {}
+_store_locks_guard = threading.Lock()
+
+
+def _store_lock(root: Path) -> threading.RLock:
+    with _store_locks_guard:
+        return _store_locks.setdefault(root.resolve(), threading.RLock())
+
+
+class StoredBackup(NamedTuple):
+    """Результат записи копии в хранилище."""
+    manifest: Path
+    chunks: int
+    new_chunks: int
+    new_bytes: int
+
+
+class ChunkStore:
+    """Дедуплицирующее хранилище копий: chunks/ab/<sha256>, manifests/*.json."""
+
+    def __init__(self, root: Path = DEFAULT_STORE_DIR, chunk_size: int = CHUNK_SIZE) -> None:
+        self.root = Path(root)
+        self.chunk_size = chunk_size
+        self.chunks_dir = self.root / "chunks"
+        self.manifests_dir = self.root / "manifests"
+        self.chunks_dir.mkdir(exist_ok=True, parents=True)
+        self.manifests_dir.mkdir(exist_ok=True, parents=True)
+        self._lock = _store_lock(self.root)
+
+    def _chunk_path(self, digest: str) -> Path:
+        return self.chunks_dir / digest[:2] / digest
+
+    def _read_chunks(self, path: Path) -> Iterator[bytes]:
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(self.chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+    def add(self, snapshot: Path, source: str = "") -> StoredBackup:
+        """Записывает согласованный снимок БД: только новые блоки и манифест.
+
+        Если снимок совпадает с последней копией, новый манифест не создается.
+        """
+        with self._lock:
+            return self._add(snapshot, source)
+
+    def _add(self, snapshot: Path, source: str) -> StoredBackup:
+        digests: List[str] = []
+        file_hash = hashlib.sha256()
+        new_chunks = new_bytes = size = 0
+        for chunk in self._read_chunks(snapshot):
+            digest = hashlib.sha256(chunk).hexdigest()
+            file_hash.update(chunk)
+            size += len(chunk)
+            digests.append(digest)
+            chunk_path = self._chunk_path(digest)
+            if not chunk_path.exists():
+                chunk_path.parent.mkdir(exist_ok=True)
+                _write_atomic(chunk_path, chunk)
+                new_chunks += 1
+                new_bytes += len(chunk)
+
+        sha256 = file_hash.hexdigest()
+        latest = self.latest()
+        if latest is not None and load_manifest(latest).get("sha256") == sha256:
+            logger.info(f"БД не изменилась с копии {latest.name}, новая копия не нужна")
+            return StoredBackup(latest, len(digests), 0, 0)
+
+        created = datetime.now()
+        manifest = {
+            "created": created.isoformat(timespec="seconds"),
+            "source": source,
+            "size": size,
+            "chunk_size": self.chunk_size,
+            "sha256": sha256,
+            "chunks": digests,
+        }
+        manifest_path = self.manifests_dir / f"backup_{created.strftime('%Y%m%d_%H%M%S_%f')}.json"
+        _write_atomic(manifest_path, json.dumps(manifest, indent=1).encode("utf-8"))
+        logger.info(
+            f"Инкрементная копия {manifest_path.name}: блоков {len(digests)}, новых {new_chunks} "
+            f"({new_bytes / 1024 / 1024:.1f} МБ)"
+        )
+        return StoredBackup(manifest_path, len(digests), new_chunks, new_bytes)
+
+    def manifests(self) -> List[Path]:
+        """Манифесты копий от старых к новым."""
+        return sorted(self.manifests_dir.glob("backup_*.json"))
+
+    def latest(self) -> Optional[Path]:
+        manifests = self.manifests()
+        return manifests[-1] if manifests else None
+
+    def restore(self, manifest_path: Path, target: Path) -> Path:
+        """Собирает файл БД из блоков копии и сверяет хеш всего файла."""
+        manifest = load_manifest(manifest_path)
+        target = Path(target)
+        partial = target.with_name(target.name + ".part")
+        file_hash = hashlib.sha256()
+        with open(partial, "wb") as out:
+            for digest in manifest["chunks"]:
+                with open(self._chunk_path(digest), "rb") as f:
+                    chunk = f.read()
+                file_hash.update(chunk)
+                out.write(chunk)
+        if file_hash.hexdigest() != manifest["sha256"]:
+            partial.unlink()
+            raise ValueError(f"Контрольная сумма восстановленной БД не совпадает: {manifest_path}")
+        partial.replace(target)
+        logger.info(f"БД восстановлена из {manifest_path.name}: {target}")
+        return target
+
+    def verify(self, manifests: Optional[Sequence[Path]] = None) -> List[str]:
+        """Проверяет наличие и целостность блоков; возвращает список проблем."""
+        problems = []
+        checked: Dict[str, bool] = {}
+        for manifest_path in manifests if manifests is not None else self.manifests():
+            try:
+                manifest = load_manifest(manifest_path)
+            except (OSError, ValueError) as e:
+                problems.append(f"{manifest_path.name}: манифест не читается: {str(e)}")
+                continue
+            for digest in manifest["chunks"]:
+                if digest not in checked:
+                    checked[digest] = self._chunk_ok(digest)
+                if not checked[digest]:
+                    problems.append(f"{manifest_path.name}: блок {digest} отсутствует или поврежден")
+        return problems
+
+    def _chunk_ok(self, digest: str) -> bool:
+        try:
+            with open(self._chunk_path(digest), "rb") as f:
+                return hashlib.sha256(f.read()).hexdigest() == digest
+        except OSError:
+            return False
+
+    def prune(self, keep: int) -> int:
+        """Оставляет keep последних копий и удаляет блоки, на которые никто не ссылается.
+
+        Возвращает число удаленных блоков.
+        """
+        # Без блокировки очистка удалила бы блоки копии, манифест которой еще пишется
+        with self._lock:
+            return self._prune(keep)
+
+    def _prune(self, keep: int) -> int:
+        manifests = self.manifests()
+        for manifest_path in manifests[:-keep] if keep > 0 else manifests:
+            manifest_path.unlink()
+
+        referenced: Set[str] = set()
+        for manifest_path in self.manifests():
+            referenced.update(load_manifest(manifest_path)["chunks"])
+        removed = 0
+        for chunk_path in self.chunks_dir.glob("*/*"):
+            if chunk_path.name not in referenced:
+                chunk_path.unlink()
+                removed += 1
+        return removed
+
+
+def load_manifest(path: Path) -> Dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """Запись через временный файл: оборванная запись не оставит битый блок."""
+    partial = path.with_name(path.name + ".part")
+    with open(partial, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    partial.replace(path)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Инкрементные резервные копии БД")
+    parser.add_argument("--store", type=Path, default=DEFAULT_STORE_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list")
+    verify_parser = commands.add_parser("verify")
+    verify_parser.add_argument("manifest", type=Path, nargs="?")
+    restore_parser = commands.add_parser("restore")
+    restore_parser.add_argument("manifest", type=Path)
+    restore_parser.add_argument("target", type=Path)
+    args = parser.parse_args(argv)
+
+    store = ChunkStore(args.store)
+    if args.command == "list":
+        for manifest_path in store.manifests():
+            manifest = load_manifest(manifest_path)
+            print(f"{manifest_path.name}  {manifest['created']}  {manifest['size'] / 1024 / 1024:.1f} МБ")
+        return 0
+
+    if args.command == "verify":
+        problems = store.verify([args.manifest] if args.manifest else None)
+        for problem in problems:
+            print(problem)
+        print("Копии в порядке" if not problems else f"Проблем: {len(problems)}")
+        return 1 if problems else 0
+
+    if args.target.exists():
+        print(f"Файл {args.target} уже существует, укажите новый путь")
+        return 1
+    store.restore(args.manifest, args.target)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
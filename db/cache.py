@@ -0,0 +1,80 @@
+# db/cache.py
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Hashable, Iterable, List, Optional, Tuple
+
+# Справочные таблицы: читаются постоянно, меняются редко
+CACHED_TABLES = frozenset({"products", "contracts", "work_types", "employees"})
+
+_READ_TABLES_RE = re.compile(r"\b(?:FROM|JOIN)\s+([A-Za-z_]\w*)", re.IGNORECASE)
+_WRITE_TABLE_RE = re.compile(
+    r"\b(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+([A-Za-z_]\w*)",
+    re.IGNORECASE
+)
+
+
+def read_tables(query: str) -> FrozenSet[str]:
+    """Таблицы, из которых читает запрос."""
+    return frozenset(name.lower() for name in _READ_TABLES_RE.findall(query))
+
+
+def write_table(query: str) -> Optional[str]:
+    """Таблица, в которую пишет запрос, или None для чтения."""
+    match = _WRITE_TABLE_RE.search(query)
+    return match.group(1).lower() if match else None
+
+
+class QueryCache:
+    """LRU-кэш результатов чтения справочных таблиц.
+
+    Запись помнит версии таблиц на момент чтения; запись в таблицу повышает
+    ее версию, и все результаты, построенные по старой версии, становятся
+    промахами без явного обхода кэша.
+    """
+
+    def __init__(self, max_size: int = 256) -> None:
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[Tuple[int, ...], List[Tuple[Any, ...]]]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    def versions(self, tables: Iterable[str]) -> Tuple[int, ...]:
+        """Снимок версий таблиц (в порядке сортировки имен) с эпохой кэша."""
+        with self._lock:
+            return (self._epoch,) + tuple(self._versions.get(table, 0) for table in sorted(tables))
+
+    def get(self, key: Hashable, tables: Iterable[str]) -> Optional[List[Tuple[Any, ...]]]:
+        """Результат из кэша, если таблицы не менялись с момента чтения."""
+        current = self.versions(tables)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != current:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(entry[1])
+
+    def put(self, key: Hashable, versions: Tuple[int, ...], rows: List[Tuple[Any, ...]]) -> None:
+        """Сохраняет результат, прочитанный при указанных версиях таблиц."""
+        with self._lock:
+            self._entries[key] = (versions, list(rows))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def bump(self, tables: Iterable[str]) -> None:
+        """Повышает версии измененных таблиц."""
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+    def clear(self) -> None:
+        """Полная очистка (после записи в неизвестные таблицы)."""
+        with self._lock:
+            self._entries.clear()
+            self._epoch += 1
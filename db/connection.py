@@ -0,0 +1,146 @@
+# db/connection.py
+import itertools
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, Iterator, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+MEMORY_PATH = ":memory:"
+
+# Номера для имен БД в памяти: у каждого пула своя БД
+_memory_ids = itertools.count(1)
+
+
+def is_memory_path(db_path: Union[str, Path]) -> bool:
+    """Путь указывает на БД в памяти: ":memory:", "file::memory:" или URI "file:"
+    с mode=memory. Общий кэш (cache=shared) бывает и у файла на диске, он не признак."""
+    if isinstance(db_path, Path):
+        return False
+    if db_path == MEMORY_PATH:
+        return True
+    if not db_path.startswith("file:"):
+        return False
+    name, _, query = db_path[len("file:"):].partition("?")
+    options = set(query.split("&"))
+    return name == MEMORY_PATH or "mode=memory" in options
+
+
+class ConnectionManager:
+    """Пул соединений SQLite: отдельное соединение на поток, WAL-журнал,
+    ограниченное число одновременных читателей и один писатель."""
+
+    def __init__(
+            self,
+            db_path: Union[str, Path],
+            max_readers: int = 4,
+            busy_timeout: float = 30.0
+    ) -> None:
+        self.db_path = str(db_path)
+        self.busy_timeout = busy_timeout
+        self.is_memory = is_memory_path(self.db_path)
+        # Все потоки должны видеть одну БД в памяти, поэтому ":memory:" заменяется
+        # именованной БД с общим кэшем
+        if self.db_path == MEMORY_PATH:
+            self.database = f"file:naryad_memory_{next(_memory_ids)}?mode=memory&cache=shared"
+        else:
+            self.database = self.db_path
+        self.uri = self.database.startswith("file:")
+        self._local = threading.local()
+        self._readers = threading.BoundedSemaphore(max_readers)
+        self._write_lock = threading.RLock()
+        self._registry_lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+        # БД в памяти существует, пока открыто хотя бы одно соединение
+        self._keeper: Optional[sqlite3.Connection] = self.open() if self.is_memory else None
+
+    def open(self, **kwargs: Any) -> sqlite3.Connection:
+        """Отдельное соединение с той же БД вне пула (закрывает вызывающий)."""
+        kwargs.setdefault("timeout", self.busy_timeout)
+        return sqlite3.connect(self.database, uri=self.uri, **kwargs)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Открывает и настраивает новое соединение для текущего потока."""
+        conn = self.open(
+            isolation_level=None,
+            # Соединение используется только своим потоком, но закрывается из close_all()
+            check_same_thread=False
+        )
+        conn.execute("PRAGMA foreign_keys = ON")
+        if not self.is_memory:
+            mode = conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+            if mode.lower() != "wal":
+                logger.warning(f"WAL-режим недоступен для {self.db_path}, используется {mode}")
+            # В WAL-режиме NORMAL безопасен и не делает fsync на каждый коммит
+            conn.execute("PRAGMA synchronous = NORMAL")
+        with self._registry_lock:
+            self._connections.append(conn)
+        logger.debug(f"Открыто соединение с БД в потоке {threading.current_thread().name}")
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        """Возвращает соединение текущего потока, создавая его при необходимости."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """Соединение для чтения; число одновременных читателей (потоков) ограничено.
+
+        В памяти WAL нет, а блокировки таблиц общего кэша не ждут busy_timeout
+        (сразу "database table is locked"), поэтому чтение идет под блокировкой
+        писателя, по одному потоку.
+        """
+        if self.is_memory:
+            with self._write_lock:
+                yield self.connection()
+            return
+        # Чтение внутри открытого потокового чтения того же потока (например,
+        # подробности пачки нарядов) идет через то же соединение и слот: ожидание
+        # второго слота при занятых остальных повесило бы поток навсегда
+        depth = getattr(self._local, "read_depth", 0)
+        slot = self._readers if depth == 0 else nullcontext()
+        with slot:
+            self._local.read_depth = depth + 1
+            try:
+                yield self.connection()
+            finally:
+                self._local.read_depth = depth
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """Соединение для записи; запись выполняется строго по одному потоку."""
+        with self._write_lock:
+            yield self.connection()
+
+    def close_thread_connection(self) -> None:
+        """Закрывает соединение текущего потока (для фоновых потоков)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            return
+        self._local.conn = None
+        with self._registry_lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+        conn.close()
+
+    def close_all(self) -> None:
+        """Закрывает все открытые соединения пула."""
+        with self._registry_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+    def shutdown(self) -> None:
+        """Закрывает все соединения; БД в памяти при этом освобождается."""
+        self.close_all()
+        if self._keeper is not None:
+            self._keeper.close()
+            self._keeper = None
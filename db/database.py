@@ -1,143 +1,416 @@
 # db/database.py
 import logging
+import re
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, List, Tuple, Any
+from typing import Optional, List, Tuple, Any, Iterable, Iterator, Sequence, Union
+
+from db.cache import CACHED_TABLES, QueryCache, read_tables, write_table
+from db.connection import ConnectionManager, is_memory_path
+from db.migrations import apply_migrations
+from db.profiler import QueryProfiler
 
 logger = logging.getLogger(__name__)
 
+# Операторы, которые только читают данные и могут выполняться параллельно
+READ_ONLY_PREFIXES = ("SELECT", "PRAGMA", "EXPLAIN", "VALUES")
+
+# После пакетной записи такого объема обновляется статистика планировщика
+ANALYZE_ROW_THRESHOLD = 1000
+
+# Файл БД приложения
+DEFAULT_DB_PATH = Path("work_orders.db")
+
+# Строковые литералы, идентификаторы в кавычках и комментарии: слова внутри
+# них (например, текст 'delete' или столбец "update") не являются операторами
+SQL_LITERALS_PATTERN = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|`[^`]*`|\[[^\]]*\]|--[^\n]*|/\*.*?\*/", re.S)
+# Операторы записи в CTE - целыми словами (last_update - не UPDATE);
+# replace() без INTO - строковая функция
+WRITE_KEYWORDS_PATTERN = re.compile(r"\b(?:INSERT|UPDATE|DELETE)\b|\bREPLACE\s+INTO\b", re.IGNORECASE)
+
+# Ключ страниц подставляется в SQL как имя столбца, поэтому допускается только идентификатор
+KEY_COLUMN_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)?")
+
 
 class Database:
-    """Singleton для управления подключением к SQLite."""
-    _instance = None
-
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance._init_db()
-        return cls._instance
-
-    def _init_db(self) -> None:
-        """Инициализация БД с гарантированным созданием файла."""
-        self.db_path = Path("work_orders.db")
-        self.conn = sqlite3.connect(str(self.db_path))
-        self.conn.execute("PRAGMA foreign_keys = ON")
+    """Подключение к SQLite: пул соединений, схема, кэш справочников и профилирование.
+
+    Экземпляры независимы; путь может быть файлом, ":memory:" или URI
+    ("file:...?mode=memory&cache=shared"). Общий экземпляр приложения - default().
+    """
+    _default: Optional["Database"] = None
+    _default_lock = threading.Lock()
+
+    def __init__(
+            self,
+            db_path: Union[str, Path] = DEFAULT_DB_PATH,
+            profiler: Optional[QueryProfiler] = None
+    ) -> None:
+        self.db_path = db_path if is_memory_path(db_path) else Path(db_path)
+        self.pool = ConnectionManager(self.db_path)
+        self._tx = threading.local()
+        self.cache = QueryCache()
+        self.profiler = profiler or QueryProfiler()
         logger.info(f"База данных инициализирована: {self.db_path}")
-        self._create_tables()
-
-    def _create_tables(self) -> None:
-        """Создание таблиц при первом запуске."""
-        tables = [
-            """CREATE TABLE IF NOT EXISTS employees (
-                id INTEGER PRIMARY KEY,
-                employee_id TEXT UNIQUE NOT NULL,
-                full_name TEXT NOT NULL,
-                workshop_number INTEGER NOT NULL,
-                position TEXT NOT NULL
-            )""",
-
-            """CREATE TABLE IF NOT EXISTS work_types (
-                id INTEGER PRIMARY KEY,
-                name TEXT UNIQUE NOT NULL,
-                unit TEXT NOT NULL,
-                price REAL NOT NULL CHECK(price > 0)
-            )""",
-
-            """CREATE TABLE IF NOT EXISTS products (
-                id INTEGER PRIMARY KEY,
-                name TEXT NOT NULL,
-                product_code TEXT UNIQUE NOT NULL
-            )""",
-
-            """CREATE TABLE IF NOT EXISTS contracts (
-                id INTEGER PRIMARY KEY,
-                contract_code TEXT UNIQUE NOT NULL,
-                start_date TEXT NOT NULL,
-                end_date TEXT NOT NULL,
-                description TEXT
-            )""",
-
-            """CREATE TABLE IF NOT EXISTS work_orders (
-                id INTEGER PRIMARY KEY,
-                order_date TEXT NOT NULL,
-                product_id INTEGER NOT NULL,
-                contract_id INTEGER NOT NULL,
-                total_amount REAL NOT NULL,
-                FOREIGN KEY(product_id) REFERENCES products(id),
-                FOREIGN KEY(contract_id) REFERENCES contracts(id)
-            )""",
-
-            """CREATE TABLE IF NOT EXISTS order_workers (
-                order_id INTEGER NOT NULL,
-                worker_id INTEGER NOT NULL,
-                PRIMARY KEY(order_id, worker_id),
-                FOREIGN KEY(order_id) REFERENCES work_orders(id),
-                FOREIGN KEY(worker_id) REFERENCES employees(id)
-            )""",
-
-            """CREATE TABLE IF NOT EXISTS order_work_types (
-                order_id INTEGER NOT NULL,
-                work_type_id INTEGER NOT NULL,
-                quantity INTEGER NOT NULL CHECK(quantity > 0),
-                amount REAL NOT NULL,
-                PRIMARY KEY(order_id, work_type_id),
-                FOREIGN KEY(order_id) REFERENCES work_orders(id),
-                FOREIGN KEY(work_type_id) REFERENCES work_types(id)
-            )"""
-        ]
-
-        cursor = self.conn.cursor()
+        self._migrate()
+
+    @classmethod
+    def default(cls) -> "Database":
+        """Общий экземпляр приложения (work_orders.db), создается при первом вызове."""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    @property
+    def is_memory(self) -> bool:
+        """БД в памяти: данных нет на диске, файловое резервное копирование неприменимо."""
+        return self.pool.is_memory
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Соединение текущего потока.
+
+        Запись напрямую через него вне transaction() не сбрасывает кэш справочников.
+        """
+        return self.pool.connection()
+
+    @property
+    def in_transaction(self) -> bool:
+        """Выполняется ли текущий поток внутри db.transaction()."""
+        return getattr(self._tx, "depth", 0) > 0
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Единица работы: все операции блока фиксируются одним COMMIT.
+
+        Вложенные блоки оформляются точками сохранения (SAVEPOINT): ошибка во
+        вложенном блоке откатывает только его, ошибка во внешнем - всё целиком.
+        """
+        with self.pool.writer() as conn:
+            depth = getattr(self._tx, "depth", 0)
+            savepoint = f"sp_{depth}"
+            if depth == 0:
+                conn.execute("BEGIN IMMEDIATE")
+                self._tx.dirty = set()
+                changes_before = conn.total_changes
+            else:
+                conn.execute(f"SAVEPOINT {savepoint}")
+            self._tx.depth = depth + 1
+            try:
+                yield conn
+            except BaseException:
+                if depth == 0:
+                    conn.rollback()
+                else:
+                    conn.execute(f"ROLLBACK TO {savepoint}")
+                    conn.execute(f"RELEASE {savepoint}")
+                raise
+            else:
+                if depth == 0:
+                    conn.commit()
+                    self._invalidate_cache(conn.total_changes != changes_before)
+                else:
+                    conn.execute(f"RELEASE {savepoint}")
+            finally:
+                self._tx.depth = depth
+
+    def _invalidate_cache(self, changed: bool) -> None:
+        """Сбрасывает кэш по таблицам, измененным зафиксированной транзакцией.
+
+        Если изменения были сделаны напрямую через соединение транзакции и
+        таблицы неизвестны, кэш очищается целиком.
+        """
+        dirty = self._tx.dirty
+        if dirty:
+            self.cache.bump(dirty)
+        elif changed:
+            self.cache.clear()
+
+    def _handle_error(self, message: str, error: sqlite3.Error) -> None:
+        """Логирует ошибку запроса; внутри единицы работы пробрасывает её,
+        чтобы откатить всю транзакцию."""
+        logger.error(f"{message}: {str(error)}")
+        if self.in_transaction:
+            raise error
+
+    @staticmethod
+    def _is_read_only(query: str) -> bool:
+        """Определяет, что запрос не изменяет данные."""
+        statement = query.lstrip().upper()
+        return statement.startswith(READ_ONLY_PREFIXES) or (
+            statement.startswith("WITH")
+            and not WRITE_KEYWORDS_PATTERN.search(SQL_LITERALS_PATTERN.sub(" ", statement))
+        )
+
+    def _migrate(self) -> None:
+        """Приведение схемы БД к актуальной версии.
+
+        Ошибка пробрасывается: работа на частично мигрированной схеме дала бы
+        сбои отчетов и поиска далеко от причины.
+        """
         try:
-            for table in tables:
-                cursor.execute(table)
-            self.conn.commit()
+            version = apply_migrations(self)
+            logger.info(f"Версия схемы БД: {version}")
         except sqlite3.Error as e:
-            logger.error(f"Ошибка создания таблиц: {str(e)}")
-            self.conn.rollback()
-        finally:
-            cursor.close()
+            logger.error(f"Ошибка миграции схемы: {str(e)}")
+            self.pool.shutdown()
+            raise
+
+    def analyze(self) -> None:
+        """Обновление статистики планировщика после крупных изменений."""
+        try:
+            with self.pool.writer() as conn:
+                conn.execute("ANALYZE")
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка обновления статистики: {str(e)}")
 
     def execute_query(
             self,
             query: str,
             params: Optional[Tuple[Any, ...]] = None
     ) -> Optional[List[Tuple[Any, ...]]]:
-        """Безопасное выполнение SQL-запроса с поддержкой транзакций."""
-        cursor = self.conn.cursor()
+        """Безопасное выполнение SQL-запроса с поддержкой транзакций.
+
+        Чтение выполняется на соединении текущего потока параллельно с другими
+        читателями (WAL), запись сериализуется через единственного писателя.
+        Вне db.transaction() каждая запись фиксируется отдельно.
+        Чтение справочных таблиц обслуживается из кэша до первой записи в них,
+        в том числе другим процессом или экземпляром Database.
+        """
         try:
-            cursor.execute("BEGIN TRANSACTION")
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
-            result = cursor.fetchall()
-            self.conn.commit()
-            return result
+            if self._is_read_only(query):
+                return self._read(query, params)
+
+            with self.transaction() as conn:
+                self._mark_dirty(query)
+                started = time.perf_counter()
+                cursor = conn.execute(query, params or ())
+                result = cursor.fetchall()
+                self.profiler.record(
+                    query, time.perf_counter() - started, max(cursor.rowcount, len(result)), conn, params
+                )
+                return result
         except sqlite3.Error as e:
-            self.conn.rollback()
-            logger.error(f"Ошибка выполнения запроса: {str(e)}")
+            self._handle_error("Ошибка выполнения запроса", e)
             return None
+
+    def _read(
+            self,
+            query: str,
+            params: Optional[Tuple[Any, ...]]
+    ) -> List[Tuple[Any, ...]]:
+        """Чтение с кэшем для запросов только к справочным таблицам."""
+        tables = read_tables(query)
+        # Внутри транзакции с записью кэш может не совпадать с данными потока
+        cacheable = (
+            tables and tables <= CACHED_TABLES
+            and not (self.in_transaction and self._tx.dirty)
+        )
+        with self.pool.reader() as conn:
+            if cacheable:
+                self._check_external_changes(conn)
+                key = (query, tuple(params or ()))
+                rows = self.cache.get(key, tables)
+                if rows is not None:
+                    return rows
+                # Версии снимаются до чтения, чтобы параллельная запись сделала результат устаревшим
+                versions = self.cache.versions(tables)
+
+            started = time.perf_counter()
+            rows = conn.execute(query, params or ()).fetchall()
+            self.profiler.record(query, time.perf_counter() - started, len(rows), conn, params)
+
+        if cacheable:
+            self.cache.put(key, versions, rows)
+        return rows
+
+    def _check_external_changes(self, conn: sqlite3.Connection) -> None:
+        """Очищает кэш, если БД изменило другое соединение.
+
+        PRAGMA data_version соединения меняется после фиксации записи любым
+        другим соединением: другим процессом (второе рабочее место, генератор
+        данных), другим экземпляром Database или потоком. Для нового
+        соединения прежнего значения нет, и кэш очищается на всякий случай.
+        """
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        seen = getattr(self._tx, "data_version", None)
+        if seen is None or seen[0] is not conn or seen[1] != version:
+            self.cache.clear()
+        self._tx.data_version = (conn, version)
+
+    def _mark_dirty(self, query: str) -> None:
+        """Запоминает таблицу, в которую пишет запрос текущей транзакции."""
+        table = write_table(query)
+        if table:
+            self._tx.dirty.add(table)
+
+    def iter_query(
+            self,
+            query: str,
+            params: Optional[Tuple[Any, ...]] = None,
+            batch_size: int = 500
+    ) -> Iterator[Tuple[Any, ...]]:
+        """Потоковое чтение: строки выбираются с курсора пачками по batch_size,
+        поэтому в памяти находится не больше одной пачки.
+
+        Ошибка выполнения логируется и пробрасывается, чтобы потребитель не
+        принял оборванную выборку за полную.
+        """
+        with self.pool.reader() as conn:
+            yield from self._stream(conn, query, params, batch_size)
+
+    @contextmanager
+    def counted_query(
+            self,
+            query: str,
+            params: Optional[Tuple[Any, ...]] = None,
+            batch_size: int = 500
+    ) -> Iterator[Tuple[int, Iterator[Tuple[Any, ...]]]]:
+        """Число строк выборки и ее потоковое чтение в одной транзакции чтения.
+
+        Счетчик и строки видят один снимок БД, поэтому параллельная запись не
+        разведет total и выданные строки. Ошибки SQL пробрасываются вызывающему.
+        Строки нужно дочитать внутри блока with.
+        """
+        with self.pool.reader() as conn:
+            # Внутри транзакции этого потока снимок уже зафиксирован
+            own_transaction = not conn.in_transaction
+            if own_transaction:
+                conn.execute("BEGIN")
+            rows = None
+            try:
+                count_query = f"SELECT COUNT(*) FROM ({query})"
+                started = time.perf_counter()
+                total = conn.execute(count_query, params or ()).fetchone()[0]
+                self.profiler.record(count_query, time.perf_counter() - started, 1)
+                rows = self._stream(conn, query, params, batch_size)
+                yield total, rows
+            finally:
+                if rows is not None:
+                    rows.close()
+                if own_transaction:
+                    conn.execute("COMMIT")
+
+    def _stream(
+            self,
+            conn: sqlite3.Connection,
+            query: str,
+            params: Optional[Tuple[Any, ...]],
+            batch_size: int
+    ) -> Iterator[Tuple[Any, ...]]:
+        cursor = conn.cursor()
+        # Учитывается только время работы курсора, без обработки строк потребителем
+        elapsed = 0.0
+        count = 0
+        try:
+            started = time.perf_counter()
+            cursor.execute(query, params or ())
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                elapsed += time.perf_counter() - started
+                if not rows:
+                    break
+                count += len(rows)
+                yield from rows
+                started = time.perf_counter()
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка потокового чтения: {str(e)}")
+            raise
         finally:
             cursor.close()
+            self.profiler.record(query, elapsed, count)
 
-    def __del__(self) -> None:
-        """Закрытие соединения при удалении объекта."""
-        if hasattr(self, "conn"):
-            self.conn.close()
-
-    # Добавление индексов
-    def _create_indexes(self):
-        """Создание индексов для оптимизации запросов"""
-        indexes = [
-            "CREATE INDEX IF NOT EXISTS idx_orders_date ON work_orders(order_date)",
-            "CREATE INDEX IF NOT EXISTS idx_workers_name ON employees(full_name)",
-            "CREATE INDEX IF NOT EXISTS idx_contracts_code ON contracts(contract_code)"
-        ]
-
-        cursor = self.conn.cursor()
+    def fetch_page(
+            self,
+            query: str,
+            params: Optional[Tuple[Any, ...]] = None,
+            key: str = "id",
+            after: Any = None,
+            limit: int = 100
+    ) -> List[Tuple[Any, ...]]:
+        """Страница выборки по ключу (keyset): WHERE key > ? ORDER BY key LIMIT ?.
+
+        Запрос оборачивается подзапросом, который SQLite разворачивает, поэтому
+        поиск начала страницы идет по индексу ключа, а не через OFFSET.
+        Ключ - имя столбца выборки; псевдоним таблицы ("e.id") отбрасывается,
+        так как вне подзапроса он не виден. Недопустимый ключ - ValueError,
+        ошибка SQL логируется и пробрасывается, как в iter_query.
+        """
+        if not KEY_COLUMN_PATTERN.fullmatch(key):
+            raise ValueError(f"Недопустимое имя ключа страниц: {key!r}")
+        column = key.rsplit(".", 1)[-1]
+        sql = f"SELECT * FROM ({query}) AS page"
+        args = list(params or ())
+        if after is not None:
+            sql += f" WHERE {column} > ?"
+            args.append(after)
+        sql += f" ORDER BY {column} LIMIT ?"
+        args.append(limit)
+        try:
+            return self._read(sql, tuple(args))
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка чтения страницы: {str(e)}")
+            raise
+
+    def iter_pages(
+            self,
+            query: str,
+            params: Optional[Tuple[Any, ...]] = None,
+            key: str = "id",
+            key_index: int = 0,
+            page_size: int = 1000
+    ) -> Iterator[List[Tuple[Any, ...]]]:
+        """Последовательный обход выборки страницами по ключу.
+
+        В отличие от iter_query, между страницами не держит открытый курсор.
+        """
+        after = None
+        while True:
+            page = self.fetch_page(query, params, key=key, after=after, limit=page_size)
+            if not page:
+                return
+            yield page
+            after = page[-1][key_index]
+
+    def execute_many(
+            self,
+            query: str,
+            params_seq: Iterable[Sequence[Any]]
+    ) -> Optional[int]:
+        """Пакетное выполнение запроса для набора параметров в одной транзакции.
+
+        Параметры передаются в executemany потоком, поэтому итератор не
+        материализуется целиком. Возвращает число затронутых строк или None
+        при ошибке (вся пачка откатывается).
+        """
         try:
-            for index in indexes:
-                cursor.execute(index)
-            self.conn.commit()
+            with self.transaction() as conn:
+                self._mark_dirty(query)
+                started = time.perf_counter()
+                rowcount = conn.executemany(query, params_seq).rowcount
+                self.profiler.record(query, time.perf_counter() - started, rowcount)
         except sqlite3.Error as e:
-            logger.error(f"Ошибка создания индексов: {str(e)}")
\ No newline at end of file
+            self._handle_error("Ошибка пакетного выполнения запроса", e)
+            return None
+
+        if rowcount >= ANALYZE_ROW_THRESHOLD and not self.in_transaction:
+            self.analyze()
+        return rowcount
+
+    def close(self) -> None:
+        """Закрытие всех соединений с БД.
+
+        БД в памяти при этом сохраняется: соединения открываются заново при
+        следующем запросе, данные освобождаются только при удалении объекта.
+        """
+        if hasattr(self, "pool"):
+            self.pool.close_all()
+
+    def __del__(self) -> None:
+        """Закрытие соединений при удалении объекта."""
+        if hasattr(self, "pool"):
+            self.pool.shutdown()
@@ -0,0 +1,296 @@
+# db/migrations.py
+import logging
+from typing import TYPE_CHECKING, List, NamedTuple, Tuple
+
+if TYPE_CHECKING:
+    from db.database import Database
+
+logger = logging.getLogger(__name__)
+
+
+class Migration(NamedTuple):
+    """Шаг схемы БД: номер версии, описание и SQL-операторы."""
+    version: int
+    description: str
+    statements: Tuple[str, ...]
+    analyze: bool = False
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Базовые таблицы", (
+        """CREATE TABLE IF NOT EXISTS employees (
+            id INTEGER PRIMARY KEY,
+            employee_id TEXT UNIQUE NOT NULL,
+            full_name TEXT NOT NULL,
+            workshop_number INTEGER NOT NULL,
+            position TEXT NOT NULL
+        )""",
+
+        """CREATE TABLE IF NOT EXISTS work_types (
+            id INTEGER PRIMARY KEY,
+            name TEXT UNIQUE NOT NULL,
+            unit TEXT NOT NULL,
+            price REAL NOT NULL CHECK(price > 0)
+        )""",
+
+        """CREATE TABLE IF NOT EXISTS products (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            product_code TEXT UNIQUE NOT NULL
+        )""",
+
+        """CREATE TABLE IF NOT EXISTS contracts (
+            id INTEGER PRIMARY KEY,
+            contract_code TEXT UNIQUE NOT NULL,
+            start_date TEXT NOT NULL,
+            end_date TEXT NOT NULL,
+            description TEXT
+        )""",
+
+        """CREATE TABLE IF NOT EXISTS work_orders (
+            id INTEGER PRIMARY KEY,
+            order_date TEXT NOT NULL,
+            product_id INTEGER NOT NULL,
+            contract_id INTEGER NOT NULL,
+            total_amount REAL NOT NULL,
+            FOREIGN KEY(product_id) REFERENCES products(id),
+            FOREIGN KEY(contract_id) REFERENCES contracts(id)
+        )""",
+
+        """CREATE TABLE IF NOT EXISTS order_workers (
+            order_id INTEGER NOT NULL,
+            worker_id INTEGER NOT NULL,
+            PRIMARY KEY(order_id, worker_id),
+            FOREIGN KEY(order_id) REFERENCES work_orders(id),
+            FOREIGN KEY(worker_id) REFERENCES employees(id)
+        )""",
+
+        """CREATE TABLE IF NOT EXISTS order_work_types (
+            order_id INTEGER NOT NULL,
+            work_type_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL CHECK(quantity > 0),
+            amount REAL NOT NULL,
+            PRIMARY KEY(order_id, work_type_id),
+            FOREIGN KEY(order_id) REFERENCES work_orders(id),
+            FOREIGN KEY(work_type_id) REFERENCES work_types(id)
+        )""",
+    )),
+
+    # Индексы по внешним ключам: проверки перед удалением работника или вида
+    # работ и отборы нарядов по изделию/контракту идут по индексу, а не сканом
+    Migration(2, "Индексы внешних ключей и поиска", (
+        "CREATE INDEX IF NOT EXISTS idx_order_workers_worker ON order_workers(worker_id)",
+        "CREATE INDEX IF NOT EXISTS idx_order_work_types_work_type ON order_work_types(work_type_id)",
+        "CREATE INDEX IF NOT EXISTS idx_orders_product ON work_orders(product_id)",
+        "CREATE INDEX IF NOT EXISTS idx_orders_contract ON work_orders(contract_id)",
+        "CREATE INDEX IF NOT EXISTS idx_orders_date ON work_orders(order_date)",
+        "CREATE INDEX IF NOT EXISTS idx_workers_name ON employees(full_name)",
+    ), analyze=True),
+
+    # Даты в формате ДД.ММ.ГГГГ не сортируются хронологически, поэтому BETWEEN
+    # давал неверные отчеты и не мог использовать индекс. Храним ISO ГГГГ-ММ-ДД
+    Migration(3, "Даты в формате ISO", (
+        """UPDATE work_orders
+           SET order_date = substr(order_date, 7, 4) || '-' || substr(order_date, 4, 2)
+                            || '-' || substr(order_date, 1, 2)
+           WHERE order_date GLOB '[0-9][0-9].[0-9][0-9].[0-9][0-9][0-9][0-9]'""",
+        """UPDATE contracts
+           SET start_date = substr(start_date, 7, 4) || '-' || substr(start_date, 4, 2)
+                            || '-' || substr(start_date, 1, 2)
+           WHERE start_date GLOB '[0-9][0-9].[0-9][0-9].[0-9][0-9][0-9][0-9]'""",
+        """UPDATE contracts
+           SET end_date = substr(end_date, 7, 4) || '-' || substr(end_date, 4, 2)
+                          || '-' || substr(end_date, 1, 2)
+           WHERE end_date GLOB '[0-9][0-9].[0-9][0-9].[0-9][0-9][0-9][0-9]'""",
+    ), analyze=True),
+
+    # Итоги наряда поддерживаются триггерами при каждой записи, поэтому отчеты
+    # читают одну строку по первичному ключу вместо агрегации дочерних таблиц
+    Migration(4, "Таблица итогов нарядов", (
+        """CREATE TABLE IF NOT EXISTS order_summary (
+            order_id INTEGER PRIMARY KEY,
+            total_amount REAL NOT NULL DEFAULT 0,
+            worker_count INTEGER NOT NULL DEFAULT 0,
+            workers TEXT
+        )""",
+
+        """CREATE TRIGGER IF NOT EXISTS trg_summary_order_insert
+           AFTER INSERT ON work_orders
+           BEGIN
+               INSERT OR IGNORE INTO order_summary (order_id) VALUES (NEW.id);
+           END""",
+
+        """CREATE TRIGGER IF NOT EXISTS trg_summary_order_delete
+           AFTER DELETE ON work_orders
+           BEGIN
+               DELETE FROM order_summary WHERE order_id = OLD.id;
+           END""",
+
+        """CREATE TRIGGER IF NOT EXISTS trg_summary_work_insert
+           AFTER INSERT ON order_work_types
+           BEGIN
+               UPDATE order_summary SET total_amount = total_amount + NEW.amount
+               WHERE order_id = NEW.order_id;
+           END""",
+
+        """CREATE TRIGGER IF NOT EXISTS trg_summary_work_update
+           AFTER UPDATE OF amount, order_id ON order_work_types
+           BEGIN
+               UPDATE order_summary SET total_amount = total_amount - OLD.amount
+               WHERE order_id = OLD.order_id;
+               UPDATE order_summary SET total_amount = total_amount + NEW.amount
+               WHERE order_id = NEW.order_id;
+           END""",
+
+        """CREATE TRIGGER IF NOT EXISTS trg_summary_work_delete
+           AFTER DELETE ON order_work_types
+           BEGIN
+               UPDATE order_summary SET total_amount = total_amount - OLD.amount
+               WHERE order_id = OLD.order_id;
+           END""",
+
+        """CREATE TRIGGER IF NOT EXISTS trg_summary_worker_insert
+           AFTER INSERT ON order_workers
+           BEGIN
+               UPDATE order_summary
+               SET worker_count = worker_count + 1,
+                   workers = COALESCE(workers || ', ', '')
+                             || (SELECT full_name FROM employees WHERE id = NEW.worker_id)
+               WHERE order_id = NEW.order_id;
+           END""",
+
+        """CREATE TRIGGER IF NOT EXISTS trg_summary_worker_delete
+           AFTER DELETE ON order_workers
+           BEGIN
+               UPDATE order_summary
+               SET worker_count = worker_count - 1,
+                   workers = (
+                       SELECT GROUP_CONCAT(e.full_name, ', ')
+                       FROM order_workers ow
+                       JOIN employees e ON e.id = ow.worker_id
+                       WHERE ow.order_id = OLD.order_id
+                   )
+               WHERE order_id = OLD.order_id;
+           END""",
+
+        """CREATE TRIGGER IF NOT EXISTS trg_summary_employee_rename
+           AFTER UPDATE OF full_name ON employees
+           BEGIN
+               UPDATE order_summary
+               SET workers = (
+                   SELECT GROUP_CONCAT(e.full_name, ', ')
+                   FROM order_workers ow
+                   JOIN employees e ON e.id = ow.worker_id
+                   WHERE ow.order_id = order_summary.order_id
+               )
+               WHERE order_id IN (SELECT order_id FROM order_workers WHERE worker_id = NEW.id);
+           END""",
+
+        # Заполнение итогов для уже существующих нарядов
+        """INSERT OR REPLACE INTO order_summary (order_id, total_amount, worker_count, workers)
+           SELECT
+               wo.id,
+               COALESCE((SELECT SUM(owt.amount) FROM order_work_types owt
+                         WHERE owt.order_id = wo.id), 0),
+               (SELECT COUNT(*) FROM order_workers ow WHERE ow.order_id = wo.id),
+               (SELECT GROUP_CONCAT(e.full_name, ', ') FROM order_workers ow
+                JOIN employees e ON e.id = ow.worker_id WHERE ow.order_id = wo.id)
+           FROM work_orders wo""",
+    ), analyze=True),
+
+    # Отбор отчета по изделию сканировал все наряды (выявлено db/query_audit.py)
+    Migration(5, "Индекс наименований изделий", (
+        "CREATE INDEX IF NOT EXISTS idx_products_name ON products(name)",
+    ), analyze=True),
+
+    # Полнотекстовый поиск в диалогах выбора: индексы FTS5 над справочниками
+    # (внешнее содержимое, синхронизация триггерами) вместо загрузки всех строк
+    Migration(6, "Полнотекстовый поиск работников и видов работ", (
+        """CREATE VIRTUAL TABLE IF NOT EXISTS employees_fts USING fts5(
+            full_name, employee_id, position,
+            content='employees', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )""",
+
+        """CREATE TRIGGER IF NOT EXISTS trg_employees_fts_insert
+           AFTER INSERT ON employees
+           BEGIN
+               INSERT INTO employees_fts (rowid, full_name, employee_id, position)
+               VALUES (NEW.id, NEW.full_name, NEW.employee_id, NEW.position);
+           END""",
+
+        """CREATE TRIGGER IF NOT EXISTS trg_employees_fts_delete
+           AFTER DELETE ON employees
+           BEGIN
+               INSERT INTO employees_fts (employees_fts, rowid, full_name, employee_id, position)
+               VALUES ('delete', OLD.id, OLD.full_name, OLD.employee_id, OLD.position);
+           END""",
+
+        """CREATE TRIGGER IF NOT EXISTS trg_employees_fts_update
+           AFTER UPDATE OF full_name, employee_id, position ON employees
+           BEGIN
+               INSERT INTO employees_fts (employees_fts, rowid, full_name, employee_id, position)
+               VALUES ('delete', OLD.id, OLD.full_name, OLD.employee_id, OLD.position);
+               INSERT INTO employees_fts (rowid, full_name, employee_id, position)
+               VALUES (NEW.id, NEW.full_name, NEW.employee_id, NEW.position);
+           END""",
+
+        """CREATE VIRTUAL TABLE IF NOT EXISTS work_types_fts USING fts5(
+            name,
+            content='work_types', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )""",
+
+        """CREATE TRIGGER IF NOT EXISTS trg_work_types_fts_insert
+           AFTER INSERT ON work_types
+           BEGIN
+               INSERT INTO work_types_fts (rowid, name) VALUES (NEW.id, NEW.name);
+           END""",
+
+        """CREATE TRIGGER IF NOT EXISTS trg_work_types_fts_delete
+           AFTER DELETE ON work_types
+           BEGIN
+               INSERT INTO work_types_fts (work_types_fts, rowid, name) VALUES ('delete', OLD.id, OLD.name);
+           END""",
+
+        """CREATE TRIGGER IF NOT EXISTS trg_work_types_fts_update
+           AFTER UPDATE OF name ON work_types
+           BEGIN
+               INSERT INTO work_types_fts (work_types_fts, rowid, name) VALUES ('delete', OLD.id, OLD.name);
+               INSERT INTO work_types_fts (rowid, name) VALUES (NEW.id, NEW.name);
+           END""",
+
+        # Индексация уже существующих строк
+        "INSERT INTO employees_fts (employees_fts) VALUES ('rebuild')",
+        "INSERT INTO work_types_fts (work_types_fts) VALUES ('rebuild')",
+    )),
+]
+
+
+def get_schema_version(db: "Database") -> int:
+    """Текущая версия схемы из PRAGMA user_version."""
+    return db.conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def apply_migrations(db: "Database") -> int:
+    """Применяет недостающие миграции по порядку, каждую в своей транзакции.
+
+    Возвращает итоговую версию схемы.
+    """
+    current = get_schema_version(db)
+    pending = [m for m in MIGRATIONS if m.version > current]
+    if not pending:
+        return current
+
+    for migration in pending:
+        with db.transaction() as conn:
+            for statement in migration.statements:
+                conn.execute(statement)
+            # user_version хранится в заголовке файла и меняется в той же транзакции
+            conn.execute(f"PRAGMA user_version = {migration.version}")
+        logger.info(f"Применена миграция {migration.version}: {migration.description}")
+
+    if any(m.analyze for m in pending):
+        db.analyze()
+
+    return pending[-1].version
@@ -0,0 +1,30 @@
+# db/orders.py
+from typing import Dict, Sequence
+
+from db.database import Database
+from db.queries import ORDER_INSERT, ORDER_WORK_TYPES_INSERT, ORDER_WORKERS_INSERT
+
+
+def save_work_order(
+        db: Database,
+        order_date: str,
+        product_id: int,
+        contract_id: int,
+        workers: Sequence[int],
+        works: Sequence[Dict]
+) -> int:
+    """Сохраняет наряд, его рабочих и работы одной транзакцией.
+
+    order_date передается в формате хранения (ГГГГ-ММ-ДД), works - словари
+    с ключами type_id, price и quantity, как в форме наряда.
+    """
+    total = sum(w["price"] * w["quantity"] for w in works)
+    with db.transaction():
+        result = db.execute_query(ORDER_INSERT, (order_date, product_id, contract_id, total))
+        order_id = result[0][0]
+        db.execute_many(ORDER_WORKERS_INSERT, [(order_id, worker_id) for worker_id in workers])
+        db.execute_many(ORDER_WORK_TYPES_INSERT, [
+            (order_id, w["type_id"], w["quantity"], w["price"] * w["quantity"])
+            for w in works
+        ])
+    return order_id
@@ -0,0 +1,184 @@
+# db/profiler.py
+import json
+import logging
+import os
+import random
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+# Отдельный логгер: configure_logging направляет его в logs/slow_queries.log
+slow_logger = logging.getLogger("db.slow_queries")
+
+# Порог медленного запроса без настройки, мс
+FALLBACK_SLOW_THRESHOLD_MS = 200.0
+# Значения переменной окружения, включающие флаг
+TRUE_VALUES = ("1", "true", "yes", "on")
+
+
+def _env_threshold_ms(name: str, default: float) -> float:
+    """Читает порог из переменной окружения; некорректное значение не роняет запуск."""
+    raw = os.environ.get(name)
+    if raw is None or not raw.strip():
+        return default
+    try:
+        value = float(raw)
+    except ValueError:
+        logger.warning("Некорректное значение %s=%r, используется порог %s мс", name, raw, default)
+        return default
+    if value < 0:
+        logger.warning("Отрицательное значение %s=%r, используется порог %s мс", name, raw, default)
+        return default
+    return value
+
+
+def _env_flag(name: str) -> bool:
+    """Флаг из переменной окружения: 1/true/yes/on включают его."""
+    return os.environ.get(name, "").strip().lower() in TRUE_VALUES
+
+
+# Порог медленного запроса по умолчанию, мс (переопределяется переменной окружения)
+DEFAULT_SLOW_THRESHOLD_MS = _env_threshold_ms("NARYAD_SLOW_QUERY_MS", FALLBACK_SLOW_THRESHOLD_MS)
+# Записывать ли план EXPLAIN QUERY PLAN для медленных запросов (переменная окружения)
+DEFAULT_EXPLAIN_SLOW = _env_flag("NARYAD_EXPLAIN_SLOW")
+# Сколько замеров хранить на запрос для расчета перцентилей
+MAX_SAMPLES = 1000
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_SPACES_RE = re.compile(r"\s+")
+
+
+def normalize_sql(query: str) -> str:
+    """Приводит текст запроса к шаблону: литералы заменены на ?, пробелы схлопнуты."""
+    text = _STRING_RE.sub("?", query)
+    text = _NUMBER_RE.sub("?", text)
+    text = _SPACES_RE.sub(" ", text).strip()
+    return _IN_LIST_RE.sub("IN (?)", text)
+
+
+class _StatementStats:
+    """Накопленная статистика одного шаблона запроса."""
+
+    __slots__ = ("count", "total", "max", "rows", "samples")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.samples: List[float] = []
+
+    def add(self, seconds: float, rows: int) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.rows += rows
+        # Резервуарная выборка: перцентили по ограниченному числу замеров
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append(seconds)
+        else:
+            index = random.randrange(self.count)
+            if index < MAX_SAMPLES:
+                self.samples[index] = seconds
+
+    def percentile(self, fraction: float) -> float:
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+class QueryProfiler:
+    """Замеры времени выполнения запросов Database и журнал медленных запросов."""
+
+    def __init__(
+            self,
+            slow_threshold_ms: float = DEFAULT_SLOW_THRESHOLD_MS,
+            explain_slow: bool = DEFAULT_EXPLAIN_SLOW,
+            enabled: bool = True
+    ) -> None:
+        self.slow_threshold_ms = slow_threshold_ms
+        self.explain_slow = explain_slow
+        self.enabled = enabled
+        self._stats: Dict[str, _StatementStats] = {}
+        self._lock = threading.Lock()
+
+    def record(
+            self,
+            query: str,
+            seconds: float,
+            rows: int,
+            conn: Optional[sqlite3.Connection] = None,
+            params: Optional[Sequence[Any]] = None
+    ) -> None:
+        """Учитывает выполнение запроса; медленные пишутся в отдельный журнал."""
+        if not self.enabled:
+            return
+        key = normalize_sql(query)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = _StatementStats()
+            stats.add(seconds, rows)
+
+        elapsed_ms = seconds * 1000
+        if elapsed_ms >= self.slow_threshold_ms:
+            message = f"{elapsed_ms:.1f} мс, строк: {rows}: {key}"
+            if self.explain_slow and conn is not None:
+                message += "\n" + self._explain(conn, query, params)
+            slow_logger.warning(message)
+
+    @staticmethod
+    def _explain(conn: sqlite3.Connection, query: str, params: Optional[Sequence[Any]]) -> str:
+        """План выполнения запроса для журнала медленных запросов."""
+        try:
+            plan = conn.execute(f"EXPLAIN QUERY PLAN {query}", params or ()).fetchall()
+            return "\n".join(f"    {row[-1]}" for row in plan)
+        except sqlite3.Error as e:
+            return f"    План недоступен: {str(e)}"
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Сводка по шаблонам запросов, самые затратные первыми."""
+        with self._lock:
+            items: List[Tuple[str, _StatementStats]] = list(self._stats.items())
+            result = [
+                {
+                    "query": query,
+                    "count": stats.count,
+                    "total_ms": round(stats.total * 1000, 3),
+                    "p50_ms": round(stats.percentile(0.50) * 1000, 3),
+                    "p95_ms": round(stats.percentile(0.95) * 1000, 3),
+                    "max_ms": round(stats.max * 1000, 3),
+                    "rows": stats.rows,
+                }
+                for query, stats in items
+            ]
+        return sorted(result, key=lambda item: item["total_ms"], reverse=True)
+
+    def dump(self, path: Path) -> Optional[Path]:
+        """Сохраняет сводку в JSON-файл."""
+        path = Path(path)
+        try:
+            path.parent.mkdir(exist_ok=True, parents=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"generated": datetime.now().isoformat(timespec="seconds"),
+                     "statements": self.summary()},
+                    f,
+                    ensure_ascii=False,
+                    indent=2
+                )
+            logger.info(f"Статистика запросов сохранена: {path}")
+            return path
+        except OSError as e:
+            logger.error(f"Ошибка сохранения статистики запросов: {str(e)}")
+            return None
+
+    def reset(self) -> None:
+        """Сброс накопленной статистики."""
+        with self._lock:
+            self._stats.clear()
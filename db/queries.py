@@ -1,31 +1,224 @@
 # db/queries.py
-REPORT_BASE_QUERY = """
-SELECT 
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+from utils.dates import parse_date
+
+# Выборка нарядов для всех отчетов (Excel, PDF, HTML). Сумма и список рабочих
+# берутся из order_summary, которую триггеры обновляют при каждой записи
+# (миграция 4): отчет читает одну строку итогов по первичному ключу и не
+# соединяет дочерние таблицы, поэтому строки не размножаются
+REPORT_SELECT = """
+SELECT
     wo.id AS order_id,
-    COALESCE(wo.order_date, 'Нет данных') AS order_date,
+    wo.order_date AS order_date,
     COALESCE(p.name, 'Не указано') AS product,
     COALESCE(c.contract_code, 'Без контракта') AS contract_code,
-    COALESCE(SUM(owt.amount), 0) AS total_amount,
-    COALESCE(GROUP_CONCAT(e.full_name, ', '), 'Не выбраны') AS workers
+    COALESCE(s.total_amount, 0) AS total_amount,
+    COALESCE(s.workers, 'Не выбраны') AS workers
 FROM work_orders wo
+LEFT JOIN order_summary s ON s.order_id = wo.id
 LEFT JOIN products p ON wo.product_id = p.id
 LEFT JOIN contracts c ON wo.contract_id = c.id
-LEFT JOIN order_workers ow ON wo.id = ow.order_id
-LEFT JOIN employees e ON ow.worker_id = e.id
-LEFT JOIN order_work_types owt ON wo.id = owt.order_id
-GROUP BY wo.id
 """
 
-WORK_ORDERS_FOR_PDF_HTML = """
+REPORT_COLUMNS = ["order_id", "order_date", "product", "contract_code", "total_amount", "workers"]
+
+
+def build_report_query(where_clauses: Sequence[str] = (), select: str = REPORT_SELECT) -> str:
+    """Собирает запрос отчета с условиями отбора, применяемыми до агрегации."""
+    query = select
+    if where_clauses:
+        query += "WHERE " + " AND ".join(where_clauses) + "\n"
+    return query + "ORDER BY wo.id"
+
+
+# Выражения SQL для столбцов отчета в фильтрах. Изделие и контракт
+# сравниваются по самим столбцам (а не по COALESCE с подписью), чтобы
+# отбор шел по индексам idx_products_name и уникальному contract_code
+REPORT_FILTER_COLUMNS: Dict[str, str] = {
+    "order_id": "wo.id",
+    "order_date": "wo.order_date",
+    "product": "p.name",
+    "contract_code": "c.contract_code",
+    "total_amount": "COALESCE(s.total_amount, 0)",
+    "workers": "s.workers",
+}
+
+
+def compile_report_filters(filters: Mapping[str, Any]) -> Tuple[List[str], List[Any]]:
+    """Переводит фильтры отчета в условия WHERE с параметрами.
+
+    Список значений - IN, словарь {"start", "end"} - диапазон (границы
+    включаются, одну из них можно опустить), иное значение - равенство.
+    Даты order_date принимаются как date, ГГГГ-ММ-ДД или ДД.ММ.ГГГГ.
+    Неизвестные столбцы пропускаются; неверная дата или диапазон с началом
+    позже конца - ValueError (отбор не расширяется до всех нарядов).
+    """
+    clauses: List[str] = []
+    params: List[Any] = []
+    for column, value in filters.items():
+        expression = REPORT_FILTER_COLUMNS.get(column)
+        if expression is None:
+            continue
+        if column == "order_date":
+            value = _normalize_dates(value)
+
+        if isinstance(value, (list, tuple, set, frozenset)):
+            values = list(value)
+            if not values:
+                clauses.append("0")
+                continue
+            clauses.append(f"{expression} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+        elif isinstance(value, dict):
+            if value.get("start") is not None and value.get("end") is not None and value["start"] > value["end"]:
+                raise ValueError(f"Неверный диапазон {column}: {value['start']} > {value['end']}")
+            if value.get("start") is not None:
+                clauses.append(f"{expression} >= ?")
+                params.append(value["start"])
+            if value.get("end") is not None:
+                clauses.append(f"{expression} <= ?")
+                params.append(value["end"])
+        elif value is None:
+            clauses.append(f"{expression} IS NULL")
+        else:
+            clauses.append(f"{expression} = ?")
+            params.append(value)
+    return clauses, params
+
+
+def _normalize_dates(value: Any) -> Any:
+    """Значение фильтра order_date в формате хранения."""
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [parse_date(item) for item in value]
+    if isinstance(value, dict):
+        return {key: parse_date(bound) if bound is not None else None for key, bound in value.items()}
+    return parse_date(value) if value is not None else None
+
+
+def report_query(filters: Optional[Mapping[str, Any]], select: str = REPORT_SELECT) -> Tuple[str, Tuple[Any, ...]]:
+    """Запрос отчета и его параметры по фильтрам (см. compile_report_filters).
+
+    select - начало запроса с псевдонимами таблиц REPORT_SELECT (wo, s, p, c),
+    например ORDER_SHEET_SELECT для бланков нарядов.
+    """
+    clauses, params = compile_report_filters(filters or {})
+    return build_report_query(clauses, select), tuple(params)
+
+
+REPORT_BASE_QUERY = build_report_query()
+
+WORK_ORDERS_FOR_PDF_HTML = REPORT_BASE_QUERY
+
+
+# Справочники для выпадающих списков и фильтров
+PRODUCTS_FOR_SELECT = "SELECT id, name FROM products"
+CONTRACTS_FOR_SELECT = "SELECT id, contract_code FROM contracts"
+PRODUCT_NAMES = "SELECT name FROM products"
+CONTRACT_CODES = "SELECT contract_code FROM contracts"
+
+# Работники
+EMPLOYEES_LIST = "SELECT employee_id, full_name, workshop_number, position FROM employees"
+EMPLOYEES_FOR_SELECTION = """
+    SELECT id, employee_id, full_name, workshop_number
+    FROM employees
+    ORDER BY full_name
+    LIMIT ?
+"""
+# Ранжирование bm25: совпадение в ФИО весит больше табельного номера и должности
+EMPLOYEES_SEARCH = """
+    SELECT e.id, e.employee_id, e.full_name, e.workshop_number
+    FROM employees_fts
+    JOIN employees e ON e.id = employees_fts.rowid
+    WHERE employees_fts MATCH ?
+    ORDER BY bm25(employees_fts, 10.0, 5.0, 1.0)
+    LIMIT ?
+"""
+EMPLOYEE_UPSERT = """
+    INSERT INTO employees (employee_id, full_name, workshop_number, position)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(employee_id) DO UPDATE SET
+        full_name = excluded.full_name,
+        workshop_number = excluded.workshop_number,
+        position = excluded.position
+"""
+EMPLOYEE_ORDERS_COUNT = (
+    "SELECT COUNT(*) FROM order_workers "
+    "WHERE worker_id = (SELECT id FROM employees WHERE employee_id = ?)"
+)
+EMPLOYEE_DELETE = "DELETE FROM employees WHERE employee_id = ?"
+EMPLOYEE_ID_EXISTS = "SELECT COUNT(*) FROM employees WHERE employee_id = ?"
+
+# Виды работ
+WORK_TYPES_LIST = "SELECT id, name, unit, price FROM work_types"
+WORK_TYPES_FOR_ORDER = "SELECT id, name, price, unit FROM work_types ORDER BY name LIMIT ?"
+WORK_TYPES_SEARCH = """
+    SELECT w.id, w.name, w.price, w.unit
+    FROM work_types_fts
+    JOIN work_types w ON w.id = work_types_fts.rowid
+    WHERE work_types_fts MATCH ?
+    ORDER BY bm25(work_types_fts)
+    LIMIT ?
+"""
+WORK_TYPE_INSERT = "INSERT INTO work_types (name, unit, price) VALUES (?, ?, ?)"
+WORK_TYPE_UPDATE = "UPDATE work_types SET name = ?, unit = ?, price = ? WHERE id = ?"
+WORK_TYPE_USAGE_COUNT = "SELECT COUNT(*) FROM order_work_types WHERE work_type_id = ?"
+WORK_TYPE_DELETE = "DELETE FROM work_types WHERE id = ?"
+WORK_TYPE_NAME_EXISTS = "SELECT COUNT(*) FROM work_types WHERE name = ? AND id != ?"
+
+# Контракты
+CONTRACT_CODE_EXISTS = "SELECT COUNT(*) FROM contracts WHERE contract_code = ?"
+
+# Наряды
+ORDER_INSERT = """
+    INSERT INTO work_orders (order_date, product_id, contract_id, total_amount)
+    VALUES (?, ?, ?, ?)
+    RETURNING id
+"""
+ORDER_WORKERS_INSERT = "INSERT INTO order_workers (order_id, worker_id) VALUES (?, ?)"
+ORDER_WORK_TYPES_INSERT = """
+    INSERT INTO order_work_types (order_id, work_type_id, quantity, amount)
+    VALUES (?, ?, ?, ?)
+"""
+
+# Бланки нарядов для печати. Строки рабочих и работ выбираются сразу для
+# пачки нарядов: номера передаются одним параметром - JSON-массивом.
+# Псевдонимы таблиц те же, что в REPORT_SELECT: отбор - фильтрами отчета,
+# сумма - из order_summary, как в отчетах
+ORDER_SHEET_SELECT = """
 SELECT
-    wo.id AS order_id,
+    wo.id,
     wo.order_date,
-    p.name AS product,
-    c.contract_code,
-    SUM(owt.amount) AS total_amount
+    COALESCE(p.name, 'Не указано'),
+    COALESCE(c.contract_code, 'Без контракта'),
+    COALESCE(s.total_amount, 0)
 FROM work_orders wo
+LEFT JOIN order_summary s ON s.order_id = wo.id
 LEFT JOIN products p ON wo.product_id = p.id
 LEFT JOIN contracts c ON wo.contract_id = c.id
-LEFT JOIN order_work_types owt ON wo.id = owt.order_id
-GROUP BY wo.id
-"""
\ No newline at end of file
+"""
+ORDER_SHEET_WORKERS = """
+    SELECT ow.order_id, e.employee_id, e.full_name, e.position
+    FROM order_workers ow
+    JOIN employees e ON e.id = ow.worker_id
+    WHERE ow.order_id IN (SELECT value FROM json_each(?))
+    ORDER BY ow.order_id, e.full_name
+"""
+ORDER_SHEET_WORKS = """
+    SELECT owt.order_id, w.name, w.unit, owt.quantity, owt.amount
+    FROM order_work_types owt
+    JOIN work_types w ON w.id = owt.work_type_id
+    WHERE owt.order_id IN (SELECT value FROM json_each(?))
+    ORDER BY owt.order_id, w.name
+"""
+
+# Импорт из Excel
+EMPLOYEES_IMPORT = """
+    INSERT INTO employees (full_name, workshop_number, position, employee_id)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(employee_id) DO NOTHING
+"""
+WORK_TYPES_IMPORT = """
+    INSERT INTO work_types (name, unit, price)
+    VALUES (?, ?, ?)
+    ON CONFLICT(name) DO NOTHING
+"""
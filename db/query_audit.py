@@ -0,0 +1,207 @@
+# db/query_audit.py
+"""Проверка планов выполнения (EXPLAIN QUERY PLAN) для всех SQL-запросов
+приложения: горячие запросы не должны полностью сканировать таблицы.
+
+Запуск: python -m db.query_audit [путь_к_БД] [--stats logs/query_stats.json]
+
+Без пути проверка идет на БД в памяти с синтетическими данными (пресет tiny);
+файл по указанному пути открывается только для чтения и не мигрируется.
+"""
+import argparse
+import json
+import re
+import sqlite3
+import sys
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import db.queries as queries
+from db.database import Database
+
+_SCAN_RE = re.compile(r"^SCAN (\w+)")
+
+
+class AuditedQuery(NamedTuple):
+    """Запрос для проверки: горячий запрос не должен содержать SCAN."""
+    name: str
+    sql: str
+    hot: bool = False
+
+
+class AuditResult(NamedTuple):
+    query: AuditedQuery
+    plan: List[str]
+    scans: List[str]
+    error: Optional[str] = None
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None or (self.query.hot and bool(self.scans))
+
+
+def _page_query(query: str, key: str) -> str:
+    """Запрос страницы так, как его строит Database.fetch_page."""
+    return f"SELECT * FROM ({query}) AS page WHERE {key} > ? ORDER BY {key} LIMIT ?"
+
+
+# Запросы, которые выполняются на каждое действие пользователя или по
+# большим таблицам с условием отбора: им нужен поиск по индексу
+HOT_QUERIES: List[AuditedQuery] = [
+    AuditedQuery("EMPLOYEE_ORDERS_COUNT", queries.EMPLOYEE_ORDERS_COUNT, hot=True),
+    AuditedQuery("EMPLOYEE_DELETE", queries.EMPLOYEE_DELETE, hot=True),
+    AuditedQuery("EMPLOYEE_ID_EXISTS", queries.EMPLOYEE_ID_EXISTS, hot=True),
+    AuditedQuery("WORK_TYPE_USAGE_COUNT", queries.WORK_TYPE_USAGE_COUNT, hot=True),
+    AuditedQuery("WORK_TYPE_DELETE", queries.WORK_TYPE_DELETE, hot=True),
+    AuditedQuery("WORK_TYPE_UPDATE", queries.WORK_TYPE_UPDATE, hot=True),
+    AuditedQuery("WORK_TYPE_NAME_EXISTS", queries.WORK_TYPE_NAME_EXISTS, hot=True),
+    AuditedQuery("CONTRACT_CODE_EXISTS", queries.CONTRACT_CODE_EXISTS, hot=True),
+    AuditedQuery(
+        "report: период",
+        queries.build_report_query(["wo.order_date BETWEEN ? AND ?"]),
+        hot=True
+    ),
+    AuditedQuery("report: контракт", queries.build_report_query(["c.contract_code = ?"]), hot=True),
+    AuditedQuery("report: изделие", queries.build_report_query(["p.name = ?"]), hot=True),
+    AuditedQuery("report: страница", _page_query(queries.REPORT_BASE_QUERY, "order_id"), hot=True),
+    AuditedQuery("EMPLOYEES_LIST: страница", _page_query(queries.EMPLOYEES_LIST, "employee_id"), hot=True),
+    AuditedQuery("WORK_TYPES_LIST: страница", _page_query(queries.WORK_TYPES_LIST, "id"), hot=True),
+]
+
+
+def collect_queries() -> List[AuditedQuery]:
+    """Горячие запросы и все остальные SQL-константы из db/queries.py."""
+    hot_sql = {query.sql for query in HOT_QUERIES}
+    collected = list(HOT_QUERIES)
+    for name in sorted(vars(queries)):
+        value = getattr(queries, name)
+        if name.isupper() and isinstance(value, str) and value not in hot_sql:
+            collected.append(AuditedQuery(name, value))
+    return collected
+
+
+def load_profiled_queries(stats_path: Path) -> List[AuditedQuery]:
+    """Запросы, зафиксированные профилировщиком на рабочем месте (query_stats.json)."""
+    with open(stats_path, encoding="utf-8") as f:
+        statements = json.load(f)["statements"]
+    return [AuditedQuery(f"profiled #{i}", item["query"]) for i, item in enumerate(statements, 1)]
+
+
+def explain(conn: sqlite3.Connection, sql: str) -> List[str]:
+    """План запроса; параметры подставляются как NULL."""
+    params = (None,) * sql.count("?")
+    return [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def audit(db: Database, audited: Optional[Sequence[AuditedQuery]] = None) -> List[AuditResult]:
+    """Строит планы для запросов и отмечает полные сканирования таблиц."""
+    # Отдельное соединение без кэша операторов: скомпилированный EXPLAIN не
+    # перестраивается после изменения схемы и показал бы устаревший план
+    conn = db.pool.open(cached_statements=0)
+    try:
+        return audit_connection(conn, audited)
+    finally:
+        conn.close()
+
+
+def audit_connection(conn: sqlite3.Connection, audited: Optional[Sequence[AuditedQuery]] = None) -> List[AuditResult]:
+    """Планы запросов на готовом соединении."""
+    return [_audit_query(conn, query) for query in (audited if audited is not None else collect_queries())]
+
+
+def open_read_only(db_path: Union[str, Path]) -> sqlite3.Connection:
+    """Соединение с файлом БД только для чтения: схема и данные не меняются."""
+    path = Path(db_path)
+    if not path.exists():
+        raise FileNotFoundError(f"Файл БД не найден: {path}")
+    return sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True, cached_statements=0)
+
+
+def _audit_query(conn: sqlite3.Connection, query: AuditedQuery) -> AuditResult:
+    """План одного запроса и найденные в нем сканирования."""
+    try:
+        plan = explain(conn, query.sql)
+    except sqlite3.Error as e:
+        return AuditResult(query, [], [], str(e))
+    scans = [match.group(1) for match in map(_SCAN_RE.match, plan) if match]
+    return AuditResult(query, plan, scans)
+
+
+def format_report(results: Sequence[AuditResult]) -> str:
+    """Читаемый отчет: сначала нарушения, затем допустимые сканирования."""
+    failed = [r for r in results if r.failed]
+    scanned = [r for r in results if not r.failed and r.scans]
+    lines: List[str] = [
+        f"Проверено запросов: {len(results)}, нарушений: {len(failed)}, "
+        f"допустимых сканирований: {len(scanned)}"
+    ]
+
+    def describe(title: str, items: Sequence[AuditResult]) -> None:
+        if not items:
+            return
+        lines.append("")
+        lines.append(title)
+        for result in items:
+            reason = result.error or "SCAN " + ", ".join(result.scans)
+            lines.append(f"  {result.query.name}: {reason}")
+            lines.extend(f"      {step}" for step in result.plan)
+
+    describe("Горячие запросы без индекса:", failed)
+    describe("Полные сканирования (списки и справочники):", scanned)
+    return "\n".join(lines)
+
+
+def _audited_queries(stats_path: Optional[Path]) -> List[AuditedQuery]:
+    audited = collect_queries()
+    if stats_path:
+        audited += load_profiled_queries(stats_path)
+    return audited
+
+
+def _summary(results: Sequence[AuditResult]) -> Tuple[bool, str]:
+    return not any(r.failed for r in results), format_report(results)
+
+
+def run(db: Database, stats_path: Optional[Path] = None) -> Tuple[bool, str]:
+    """Проверка всех запросов; возвращает (успех, текст отчета)."""
+    return _summary(audit(db, _audited_queries(stats_path)))
+
+
+def run_read_only(db_path: Union[str, Path], stats_path: Optional[Path] = None) -> Tuple[bool, str]:
+    """Проверка всех запросов на файле БД, открытом только для чтения."""
+    conn = open_read_only(db_path)
+    try:
+        return _summary(audit_connection(conn, _audited_queries(stats_path)))
+    finally:
+        conn.close()
+
+
+def run_seeded(stats_path: Optional[Path] = None, preset: str = "tiny") -> Tuple[bool, str]:
+    """Проверка всех запросов на БД в памяти с синтетическими данными."""
+    # Импорт здесь: генератор данных сам зависит от db.database
+    from benchmarks.dataset import generate_dataset
+
+    db = Database(":memory:")
+    try:
+        generate_dataset(db, preset)
+        return run(db, stats_path)
+    finally:
+        db.close()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Проверка планов выполнения SQL-запросов")
+    parser.add_argument("db_path", nargs="?", type=Path,
+                        help="файл БД (только чтение); без него - синтетическая БД в памяти")
+    parser.add_argument("--stats", type=Path, help="query_stats.json профилировщика")
+    args = parser.parse_args(argv)
+
+    if args.db_path is None:
+        ok, report = run_seeded(args.stats)
+    else:
+        ok, report = run_read_only(args.db_path, args.stats)
+    print(report)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+# db/search.py
+import re
+from typing import Any, List, Optional, Tuple
+
+from db.database import Database
+from db.queries import EMPLOYEES_FOR_SELECTION, EMPLOYEES_SEARCH, WORK_TYPES_FOR_ORDER, WORK_TYPES_SEARCH
+
+# Сколько совпадений показывать в диалогах выбора
+SEARCH_LIMIT = 50
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def build_match(text: str) -> Optional[str]:
+    """Выражение MATCH для FTS5: каждое слово ввода ищется по префиксу.
+
+    Из ввода берутся только буквы и цифры, поэтому синтаксис FTS5
+    (кавычки, NEAR, звездочки) не может сломать запрос.
+    """
+    tokens = _TOKEN_RE.findall(text)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def _search(db: Database, text: str, search_query: str, list_query: str, limit: int) -> List[Tuple[Any, ...]]:
+    match = build_match(text)
+    if match is None:
+        rows = db.execute_query(list_query, (limit,))
+    else:
+        rows = db.execute_query(search_query, (match, limit))
+    return rows or []
+
+
+def search_employees(db: Database, text: str, limit: int = SEARCH_LIMIT) -> List[Tuple[Any, ...]]:
+    """Лучшие совпадения по ФИО, табельному номеру и должности.
+
+    Строки: (id, табельный номер, ФИО, цех); пустой ввод - первые по алфавиту.
+    """
+    return _search(db, text, EMPLOYEES_SEARCH, EMPLOYEES_FOR_SELECTION, limit)
+
+
+def search_work_types(db: Database, text: str, limit: int = SEARCH_LIMIT) -> List[Tuple[Any, ...]]:
+    """Лучшие совпадения по наименованию вида работ: (id, наименование, цена, ед. изм.)."""
+    return _search(db, text, WORK_TYPES_SEARCH, WORK_TYPES_FOR_ORDER, limit)
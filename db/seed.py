@@ -0,0 +1,35 @@
+# db/seed.py
+"""Наполнение БД однотипными нарядами для тестов и замеров."""
+from db.database import Database
+
+
+def seed_wide_orders(db: Database, orders: int, workers: int, works: int) -> None:
+    """Наполняет БД нарядами с заданным числом рабочих и строк работ."""
+    with db.transaction() as conn:
+        conn.execute("INSERT INTO products (id, name, product_code) VALUES (1, 'Изделие', 'P-1')")
+        conn.execute(
+            "INSERT INTO contracts (id, contract_code, start_date, end_date) "
+            "VALUES (1, 'K-1', '2024-01-01', '2024-12-31')"
+        )
+        conn.executemany(
+            "INSERT INTO employees (id, employee_id, full_name, workshop_number, position) "
+            "VALUES (?, ?, ?, 1, 'Сборщик')",
+            ((i, f"T{i:05d}", f"Работник {i}") for i in range(1, workers + 1))
+        )
+        conn.executemany(
+            "INSERT INTO work_types (id, name, unit, price) VALUES (?, ?, 'штуки', 10)",
+            ((i, f"Работа {i}") for i in range(1, works + 1))
+        )
+        conn.executemany(
+            "INSERT INTO work_orders (id, order_date, product_id, contract_id, total_amount) "
+            "VALUES (?, '2024-03-01', 1, 1, ?)",
+            ((i, works * 10.0) for i in range(1, orders + 1))
+        )
+        conn.executemany(
+            "INSERT INTO order_workers (order_id, worker_id) VALUES (?, ?)",
+            ((o, w) for o in range(1, orders + 1) for w in range(1, workers + 1))
+        )
+        conn.executemany(
+            "INSERT INTO order_work_types (order_id, work_type_id, quantity, amount) VALUES (?, ?, 1, 10)",
+            ((o, t) for o in range(1, orders + 1) for t in range(1, works + 1))
+        )
@@ -1,31 +1,49 @@
 # gui/base_form.py
+import sqlite3
 import customtkinter as ctk
 from tkinter import ttk
 from typing import List, Optional, Tuple
 from db.database import Database
+from gui.dialogs import show_error
 
 
 class BaseForm(ctk.CTkFrame):
     """Базовый класс для всех форм с таблицей и кнопками управления."""
 
+    # Ключ постраничной загрузки: столбец запроса, по которому упорядочены строки.
+    # Значение ключа должно быть в первом столбце выборки
+    key_column = "id"
+    # Строк в одной странице; следующая подгружается при прокрутке к концу
+    page_size = 200
+
     def __init__(self, parent: ctk.CTkFrame, db: Database, columns: List[str]):
         super().__init__(parent)
         self.db = db
         self.columns = columns
+        self._page_query: Optional[Tuple[str, Optional[Tuple]]] = None
+        self._last_key = None
+        self._has_more = False
         self._setup_ui()
 
     def _setup_ui(self) -> None:
         """Инициализация интерфейса."""
-        # Таблица
+        # Таблица с прокруткой
+        table_frame = ctk.CTkFrame(self)
+        table_frame.pack(expand=True, fill="both", padx=10, pady=10)
+
         self.table = ttk.Treeview(
-            self,
+            table_frame,
             columns=self.columns,
             show="headings",
             style="Custom.Treeview"
         )
         for col in self.columns:
             self.table.heading(col, text=col)
-        self.table.pack(expand=True, fill="both", padx=10, pady=10)
+
+        self.scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.table.yview)
+        self.table.configure(yscrollcommand=self._on_scroll)
+        self.scrollbar.pack(side="right", fill="y")
+        self.table.pack(side="left", expand=True, fill="both")
 
         # Кнопки управления
         self.btn_frame = ctk.CTkFrame(self)
@@ -41,12 +59,38 @@ class BaseForm(ctk.CTkFrame):
         self.delete_btn.pack(side="left", padx=5)
 
     def _load_data(self, query: str, params: Optional[Tuple] = None) -> None:
-        """Загружает данные из БД в таблицу."""
-        for row in self.table.get_children():
-            self.table.delete(row)
-        data = self.db.execute_query(query, params)
-        for item in data:
+        """Загружает в таблицу первую страницу данных из БД."""
+        self.table.delete(*self.table.get_children())
+        self._page_query = (query, params)
+        self._last_key = None
+        self._has_more = True
+        self._load_next_page()
+
+    def _load_next_page(self) -> None:
+        """Подгружает следующую страницу по ключу (без OFFSET)."""
+        if not self._page_query or not self._has_more:
+            return
+        query, params = self._page_query
+        try:
+            page = self.db.fetch_page(
+                query, params, key=self.key_column, after=self._last_key, limit=self.page_size
+            )
+        except sqlite3.Error:
+            # Ошибка уже в журнале; дальше не подгружаем, чтобы не повторять ее при прокрутке
+            self._has_more = False
+            show_error("Ошибка загрузки данных")
+            return
+        for item in page:
             self.table.insert("", "end", values=item)
+        self._has_more = len(page) == self.page_size
+        if page:
+            self._last_key = page[-1][0]
+
+    def _on_scroll(self, first: str, last: str) -> None:
+        """Синхронизирует полосу прокрутки и подгружает данные у конца списка."""
+        self.scrollbar.set(first, last)
+        if self._has_more and float(last) >= 0.95:
+            self._load_next_page()
 
     def _add_item(self) -> None:
         """Добавление элемента (реализуется в дочерних классах)."""
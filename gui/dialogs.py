@@ -4,8 +4,12 @@ from tkinter import ttk
 import customtkinter as ctk
 from tkcalendar import Calendar
 from datetime import datetime
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 from db.database import Database
+from db.search import search_employees
+
+# Задержка поиска после последнего нажатия клавиши, мс
+SEARCH_DELAY_MS = 250
 
 
 class DatePickerDialog(ctk.CTkToplevel):
@@ -46,29 +50,36 @@ class DatePickerDialog(ctk.CTkToplevel):
 
 
 class WorkerSelectionDialog(ctk.CTkToplevel):
-    """Диалоговое окно выбора рабочих."""
+    """Диалоговое окно выбора рабочих с поиском по мере ввода."""
 
     def __init__(self, parent: ctk.CTkFrame, db: Database) -> None:
         super().__init__(parent)
         self.title("Выбор рабочих")
-        self.geometry("600x400")
+        self.geometry("600x450")
         self.db = db
         self._selected_ids: List[int] = []
+        # Выбор сохраняется между поисками: id -> ФИО
+        self._chosen: Dict[int, str] = {}
+        self._search_job: Optional[str] = None
         self._setup_ui()
+        self._refresh()
 
     def _setup_ui(self) -> None:
         """Инициализация интерфейса."""
-        # Таблица работников
+        self.search_entry = ctk.CTkEntry(self, placeholder_text="Поиск: ФИО, табельный номер, должность")
+        self.search_entry.pack(fill="x", padx=10, pady=(10, 0))
+        self.search_entry.bind("<KeyRelease>", self._on_search_input)
+
+        # Таблица работников; id записи хранится в теге строки
         self.tree = ttk.Treeview(self, columns=("id", "name", "workshop"), show="headings")
         self.tree.heading("id", text="Табельный №")
         self.tree.heading("name", text="ФИО")
         self.tree.heading("workshop", text="Цех")
         self.tree.pack(expand=True, fill="both", padx=10, pady=10)
+        self.tree.bind("<<TreeviewSelect>>", self._on_tree_select)
 
-        # Загрузка данных
-        workers = self.db.execute_query("SELECT employee_id, full_name, workshop_number FROM employees")
-        for worker in workers:
-            self.tree.insert("", "end", values=worker)
+        self.chosen_label = ctk.CTkLabel(self, text="Выбрано: 0")
+        self.chosen_label.pack()
 
         # Кнопки
         self.btn_frame = ctk.CTkFrame(self)
@@ -80,10 +91,37 @@ class WorkerSelectionDialog(ctk.CTkToplevel):
         self.cancel_btn = ctk.CTkButton(self.btn_frame, text="Отмена", command=self.destroy)
         self.cancel_btn.pack(side="right", padx=5)
 
+    def _on_search_input(self, _event=None) -> None:
+        """Поиск запускается после паузы во вводе, а не на каждую клавишу."""
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(SEARCH_DELAY_MS, self._refresh)
+
+    def _refresh(self) -> None:
+        """Показывает лучшие совпадения и отмечает ранее выбранных рабочих."""
+        self._search_job = None
+        self.tree.delete(*self.tree.get_children())
+        visible = []
+        for row_id, employee_id, full_name, workshop in search_employees(self.db, self.search_entry.get()):
+            item = self.tree.insert("", "end", values=(employee_id, full_name, workshop), tags=(row_id,))
+            if row_id in self._chosen:
+                visible.append(item)
+        self.tree.selection_set(visible)
+
+    def _on_tree_select(self, _event=None) -> None:
+        """Переносит выбор в видимых строках в общий список выбранных."""
+        selected = set(self.tree.selection())
+        for item in self.tree.get_children():
+            row_id = int(self.tree.item(item)["tags"][0])
+            if item in selected:
+                self._chosen[row_id] = self.tree.item(item)["values"][1]
+            else:
+                self._chosen.pop(row_id, None)
+        self.chosen_label.configure(text=f"Выбрано: {len(self._chosen)}")
+
     def _on_select(self) -> None:
         """Обработка выбранных рабочих."""
-        selected_items = self.tree.selection()
-        self._selected_ids = [int(self.tree.item(item)["values"][0]) for item in selected_items]
+        self._selected_ids = list(self._chosen)
         self.destroy()
 
     def get_selected_workers(self) -> List[int]:
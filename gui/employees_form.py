@@ -1,15 +1,22 @@
 # gui/employees_form.py
+import logging
+import sqlite3
 from typing import Optional
 import customtkinter as ctk
 from db.database import Database
+from db.queries import EMPLOYEE_DELETE, EMPLOYEE_ORDERS_COUNT, EMPLOYEE_UPSERT, EMPLOYEES_LIST
 from gui.base_form import BaseForm
 from gui.dialogs import show_error, show_info
 from utils.validators import validate_unique_employee_id
 
+logger = logging.getLogger(__name__)
+
 
 class EmployeesForm(BaseForm):
     """Форма для управления данными работников с исправленной загрузкой данных."""
 
+    key_column = "employee_id"
+
     def __init__(self, parent: ctk.CTkFrame, db: Database):
         columns = ["Табельный №", "ФИО", "Цех", "Должность"]
         super().__init__(parent, db, columns)
@@ -17,8 +24,7 @@ class EmployeesForm(BaseForm):
 
     def _load_data(self) -> None:
         """Исправленная загрузка данных с правильным запросом."""
-        query = "SELECT employee_id, full_name, workshop_number, position FROM employees"
-        super()._load_data(query)
+        super()._load_data(EMPLOYEES_LIST)
 
     def _add_item(self) -> None:
         """Открытие диалога добавления работника с обновлением данных."""
@@ -52,19 +58,21 @@ class EmployeesForm(BaseForm):
             return
         employee_id = self.table.item(selected[0])["values"][0]
 
-        # Проверка наличия в нарядах
-        orders_count = self.db.execute_query(
-            "SELECT COUNT(*) FROM order_workers WHERE worker_id = (SELECT id FROM employees WHERE employee_id = ?)",
-            (employee_id,)
-        )
-        if orders_count and orders_count[0][0] > 0:
-            show_error("Невозможно удалить: работник участвует в нарядах")
+        # Проверка наличия в нарядах и удаление - одна транзакция; сообщения - после ее завершения
+        try:
+            with self.db.transaction():
+                orders_count = self.db.execute_query(EMPLOYEE_ORDERS_COUNT, (employee_id,))
+                in_use = bool(orders_count and orders_count[0][0] > 0)
+                if not in_use:
+                    self.db.execute_query(EMPLOYEE_DELETE, (employee_id,))
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка удаления работника {employee_id}: {str(e)}")
+            show_error("Не удалось удалить запись, подробности в журнале")
             return
 
-        self.db.execute_query(
-            "DELETE FROM employees WHERE employee_id = ?",
-            (employee_id,)
-        )
+        if in_use:
+            show_error("Невозможно удалить: работник участвует в нарядах")
+            return
         self._load_data()
 
 
@@ -128,15 +136,6 @@ class EmployeeDialog(ctk.CTkToplevel):
             show_error("Табельный номер должен быть уникальным!")
             return
 
-        # Исправленный SQL-запрос
-        query = """
-            INSERT INTO employees (employee_id, full_name, workshop_number, position)
-            VALUES (?, ?, ?, ?)
-            ON CONFLICT(employee_id) DO UPDATE SET
-                full_name = excluded.full_name,
-                workshop_number = excluded.workshop_number,
-                position = excluded.position
-        """
-        self.db.execute_query(query, (employee_id, full_name, workshop, position))
+        self.db.execute_query(EMPLOYEE_UPSERT, (employee_id, full_name, workshop, position))
         self.result = True
         self.destroy()
\ No newline at end of file
@@ -1,16 +1,20 @@
 # gui/main_window.py
 import logging
-from pathlib import Path
-from tkinter import filedialog
-from typing import Optional
 import customtkinter as ctk
 from db.database import Database
-from gui.dialogs import show_error, show_info
+from db.queries import CONTRACT_CODES, PRODUCT_NAMES
+from gui.dialogs import show_error
 from gui.employees_form import EmployeesForm
+from gui.report_jobs_panel import ReportJobsPanel
 from gui.work_order_form import WorkOrderForm
 from gui.work_types_form import WorkTypesForm
+from reports.bundle import ReportBundleGenerator
 from reports.excel_report import ExcelReportGenerator
-from utils.excel_handler import ExcelHandler
+from reports.html_report import HTMLReportGenerator
+from reports.jobs import ReportJobQueue
+from reports.order_sheets import OrderSheetPrinter
+from reports.pdf_report import PDFReportGenerator
+from utils.validators import validate_date_range
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +25,8 @@ class MainWindow(ctk.CTk):
         self.title("Учет сдельных работ")
         self.geometry("1200x800")
         self.db = db
+        self.report_jobs = ReportJobQueue()
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
 
         try:
             logger.info("Инициализация главного окна")
@@ -82,31 +88,80 @@ class MainWindow(ctk.CTk):
             command=self._generate_pdf_report
         ).pack(side="left", padx=10)
 
+        ctk.CTkButton(
+            btn_frame,
+            text="HTML-отчет",
+            command=self._generate_html_report
+        ).pack(side="left", padx=10)
+
+        ctk.CTkButton(
+            btn_frame,
+            text="Комплект (Excel, PDF, HTML)",
+            command=self._generate_report_bundle
+        ).pack(side="left", padx=10)
+
+        ctk.CTkButton(
+            btn_frame,
+            text="Печать нарядов",
+            command=self._print_order_sheets
+        ).pack(side="left", padx=10)
+
+        # Отчеты формируются в фоне, окно остается доступным
+        self.jobs_panel = ReportJobsPanel(tab, self.report_jobs)
+        self.jobs_panel.pack(expand=True, fill="both", padx=20, pady=(0, 20))
+
     def _generate_excel_report(self) -> None:
-        """Генерация Excel-отчета с проверкой данных."""
-        try:
-            generator = ExcelReportGenerator(self.db)
-            report_path = generator.generate()
-            if report_path:
-                show_info(f"Отчет сохранен: {report_path}")
-        except Exception as e:
-            logger.error(f"Ошибка генерации Excel: {str(e)}")
-            show_error("Ошибка создания отчета")
+        """Генерация Excel-отчета в фоне."""
+        generator = ExcelReportGenerator(self.db)
+        self.report_jobs.submit("Excel-отчет", lambda progress: generator.generate_streaming(progress=progress))
 
     def _generate_pdf_report(self) -> None:
-        """Генерация PDF-отчета."""
-        show_info("PDF-отчеты временно недоступны. Используйте Excel.")
+        """Генерация PDF-отчета в фоне."""
+        generator = PDFReportGenerator(self.db)
+        self.report_jobs.submit("PDF-отчет", lambda progress: generator.generate(progress=progress))
+
+    def _generate_html_report(self) -> None:
+        """Генерация HTML-отчета в фоне."""
+        generator = HTMLReportGenerator(self.db)
+        self.report_jobs.submit("HTML-отчет", lambda progress: generator.generate(progress=progress))
+
+    def _generate_report_bundle(self) -> None:
+        """Комплект отчета в трех форматах по одним данным (в фоне)."""
+        generator = ReportBundleGenerator(self.db)
+        self.report_jobs.submit("Комплект отчетов", lambda progress: generator.generate(progress=progress))
+
+    def _print_order_sheets(self) -> None:
+        """Печать бланков нарядов за период в один PDF (в фоне)."""
+        dialog = ctk.CTkInputDialog(title="Печать нарядов", text="Период (ДД.ММ.ГГГГ-ДД.ММ.ГГГГ):")
+        period = dialog.get_input()
+        if not period:
+            return
+        start, _, end = (part.strip() for part in period.partition("-"))
+        if not validate_date_range(start, end):
+            show_error("Неверный период")
+            return
+        printer = OrderSheetPrinter(self.db)
+        filters = {"order_date": {"start": start, "end": end}}
+        self.report_jobs.submit(
+            f"Наряды {start}-{end}",
+            lambda progress: printer.print_orders(filters=filters, progress=progress)
+        )
 
     def _load_filters_data(self) -> None:
         """Загрузка данных для фильтров (исправлено)."""
         try:
-            self.contracts = self.db.execute_query("SELECT contract_code FROM contracts") or []
-            self.products = self.db.execute_query("SELECT name FROM products") or []
+            self.contracts = self.db.execute_query(CONTRACT_CODES) or []
+            self.products = self.db.execute_query(PRODUCT_NAMES) or []
         except Exception as e:
             logger.error(f"Ошибка загрузки данных: {str(e)}")
             show_error("Ошибка загрузки справочников")
 
+    def _on_close(self) -> None:
+        """Закрытие окна: незавершенные отчеты отменяются до закрытия БД."""
+        self.report_jobs.shutdown()
+        self.destroy()
+
     def __del__(self) -> None:
         """Закрытие соединения с БД."""
         if hasattr(self, "db"):
-            self.db.conn.close()
\ No newline at end of file
+            self.db.close()
\ No newline at end of file
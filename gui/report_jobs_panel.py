@@ -0,0 +1,74 @@
+# gui/report_jobs_panel.py
+import logging
+from typing import Dict, Tuple
+import customtkinter as ctk
+from reports.jobs import DONE, FAILED, STATUS_TITLES, JobState, ReportJobQueue
+
+logger = logging.getLogger(__name__)
+
+# Период опроса состояния заданий, мс
+POLL_INTERVAL_MS = 200
+
+
+class ReportJobsPanel(ctk.CTkScrollableFrame):
+    """Список заданий очереди отчетов: состояние, прогресс и отмена.
+
+    Состояние читается из очереди по таймеру after() в главном потоке,
+    потоки заданий к виджетам не обращаются.
+    """
+
+    def __init__(self, parent: ctk.CTkFrame, queue: ReportJobQueue) -> None:
+        super().__init__(parent, label_text="Задания")
+        self.queue = queue
+        self.columnconfigure(0, weight=1)
+        self._rows: Dict[int, Tuple[ctk.CTkLabel, ctk.CTkProgressBar, ctk.CTkButton]] = {}
+        self._poll_job = self.after(POLL_INTERVAL_MS, self._poll)
+
+    def _poll(self) -> None:
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.error(f"Ошибка обновления списка заданий: {str(e)}", exc_info=True)
+        self._poll_job = self.after(POLL_INTERVAL_MS, self._poll)
+
+    def refresh(self) -> None:
+        """Приводит строки списка к текущему состоянию очереди (новые задания сверху)."""
+        states = self.queue.snapshot()
+        current = {state.job_id for state in states}
+        for job_id in list(self._rows):
+            if job_id not in current:
+                for widget in self._rows.pop(job_id):
+                    widget.destroy()
+
+        for position, state in enumerate(reversed(states)):
+            row = self._rows.get(state.job_id)
+            if row is None:
+                row = self._create_row(state.job_id)
+            label, bar, button = row
+            for column, widget in enumerate(row):
+                widget.grid(row=position, column=column, padx=5, pady=3, sticky="ew" if column == 0 else "")
+            label.configure(text=self._describe(state))
+            bar.set(1.0 if state.status == DONE else state.fraction)
+            button.configure(state="disabled" if state.finished else "normal")
+
+    def _create_row(self, job_id: int) -> Tuple[ctk.CTkLabel, ctk.CTkProgressBar, ctk.CTkButton]:
+        label = ctk.CTkLabel(self, anchor="w", justify="left")
+        bar = ctk.CTkProgressBar(self, width=200)
+        button = ctk.CTkButton(self, text="Отменить", width=90, command=lambda: self.queue.cancel(job_id))
+        self._rows[job_id] = (label, bar, button)
+        return self._rows[job_id]
+
+    @staticmethod
+    def _describe(state: JobState) -> str:
+        text = f"{state.created.strftime('%H:%M:%S')}  {state.title}: {STATUS_TITLES[state.status]}"
+        if state.total and not state.finished:
+            text += f" ({state.done} из {state.total})"
+        if state.status == DONE:
+            text += f"\n{state.result}"
+        elif state.status == FAILED:
+            text += " - нет данных или ошибка, подробности в логе"
+        return text
+
+    def destroy(self) -> None:
+        self.after_cancel(self._poll_job)
+        super().destroy()
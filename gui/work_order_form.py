@@ -7,7 +7,11 @@ from typing import List, Dict, Optional, Tuple
 import customtkinter as ctk
 
 from db.database import Database
-from gui.dialogs import DatePickerDialog, WorkerSelectionDialog, show_error, show_info
+from db.orders import save_work_order
+from db.queries import CONTRACTS_FOR_SELECT, PRODUCTS_FOR_SELECT
+from db.search import search_work_types
+from gui.dialogs import SEARCH_DELAY_MS, DatePickerDialog, WorkerSelectionDialog, show_error, show_info
+from utils.dates import to_db_date
 from utils.validators import validate_date
 
 logger = logging.getLogger(__name__)
@@ -86,9 +90,9 @@ class WorkOrderForm(ctk.CTkFrame):
         """Обновление данных выпадающего списка."""
         try:
             if table == "products":
-                data = self.db.execute_query("SELECT id, name FROM products")
+                data = self.db.execute_query(PRODUCTS_FOR_SELECT)
             elif table == "contracts":
-                data = self.db.execute_query("SELECT id, contract_code FROM contracts")
+                data = self.db.execute_query(CONTRACTS_FOR_SELECT)
             values = [f"{row[0]} - {row[1]}" for row in data] if data else []
             getattr(self, f"{table}_combobox").configure(values=values)
         except Exception as e:
@@ -205,14 +209,11 @@ class WorkOrderForm(ctk.CTkFrame):
     def _add_work(self) -> None:
         """Добавление работы с выбором из существующих."""
         try:
-            work_types = self.db.execute_query(
-                "SELECT id, name, price, unit FROM work_types"
-            )
-            if not work_types:
+            if not search_work_types(self.db, "", limit=1):
                 show_error("Нет доступных видов работ")
                 return
 
-            dialog = WorkTypeSelectionDialog(self, work_types)
+            dialog = WorkTypeSelectionDialog(self, self.db)
             self.wait_window(dialog)
             selected = dialog.get_selected_work()
 
@@ -289,9 +290,15 @@ class WorkOrderForm(ctk.CTkFrame):
                 show_error(" ".join(errors))
                 return
 
-            # Сохранение в БД
-            order_id = self._save_to_database(product_id, contract_id)
-            self._save_related_data(order_id)
+            # Наряд, рабочие и работы сохраняются одной транзакцией
+            save_work_order(
+                self.db,
+                to_db_date(self.date_entry.get()),
+                product_id,
+                contract_id,
+                self._current_workers,
+                self._current_works
+            )
             show_info("Наряд сохранен")
             self._clear_form()
 
@@ -305,41 +312,6 @@ class WorkOrderForm(ctk.CTkFrame):
         value = combobox.get()
         return int(value.split(" - ")[0]) if value else None
 
-    def _save_to_database(self, product_id: int, contract_id: int) -> int:
-        """Сохранение основной записи наряда."""
-        total = sum(w["price"] * w["quantity"] for w in self._current_works)
-        result = self.db.execute_query(
-            """INSERT INTO work_orders 
-               (order_date, product_id, contract_id, total_amount)
-               VALUES (?, ?, ?, ?)
-               RETURNING id""",
-            (self.date_entry.get(), product_id, contract_id, total)
-        )
-        return result[0][0] if result else None
-
-    def _save_related_data(self, order_id: int) -> None:
-        """Сохранение связанных данных в БД."""
-        # Сохранение рабочих
-        workers_data = [(order_id, worker_id) for worker_id in self._current_workers]
-        self.db.execute_query(
-            "INSERT INTO order_workers (order_id, worker_id) VALUES (?, ?)",
-            workers_data,
-            many=True
-        )
-
-        # Сохранение работ
-        works_data = [
-            (order_id, w["type_id"], w["quantity"], w["price"] * w["quantity"])
-            for w in self._current_works
-        ]
-        self.db.execute_query(
-            """INSERT INTO order_work_types 
-               (order_id, work_type_id, quantity, amount)
-               VALUES (?, ?, ?, ?)""",
-            works_data,
-            many=True
-        )
-
     def _clear_form(self) -> None:
         """Очистка формы после сохранения."""
         self.date_entry.delete(0, "end")
@@ -353,13 +325,19 @@ class WorkOrderForm(ctk.CTkFrame):
 
 
 class WorkTypeSelectionDialog(ctk.CTkToplevel):
-    """Диалог выбора вида работ с поддержкой единиц измерения."""
+    """Диалог выбора вида работ с поиском по наименованию."""
 
-    def __init__(self, parent: ctk.CTkFrame, work_types: List[Tuple]):
+    def __init__(self, parent: ctk.CTkFrame, db: Database):
         super().__init__(parent)
         self.title("Выбор вида работ")
-        self.geometry("500x350")
+        self.geometry("500x400")
+        self.db = db
         self._selected = None
+        self._search_job: Optional[str] = None
+
+        self.search_entry = ctk.CTkEntry(self, placeholder_text="Поиск по наименованию")
+        self.search_entry.pack(fill="x", padx=10, pady=(10, 0))
+        self.search_entry.bind("<KeyRelease>", self._on_search_input)
 
         # Таблица видов работ
         self.tree = ttk.Treeview(
@@ -371,13 +349,7 @@ class WorkTypeSelectionDialog(ctk.CTkToplevel):
         self.tree.heading("Ед.изм.", text="Ед. изм.")
         self.tree.heading("Цена", text="Цена за ед.")
         self.tree.pack(expand=True, fill="both", padx=10, pady=10)
-
-        for wt in work_types:
-            self.tree.insert("", "end", values=(
-                wt[1],
-                wt[3],
-                f"{wt[2]:.2f} ₽"
-            ), tags=(wt[0],))
+        self._refresh()
 
         # Поля ввода
         self.quantity_frame = ctk.CTkFrame(self)
@@ -403,6 +375,23 @@ class WorkTypeSelectionDialog(ctk.CTkToplevel):
             command=self.destroy
         ).pack(side="right", padx=5)
 
+    def _on_search_input(self, _event=None) -> None:
+        """Поиск запускается после паузы во вводе."""
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(SEARCH_DELAY_MS, self._refresh)
+
+    def _refresh(self) -> None:
+        """Показывает лучшие совпадения по введенному тексту."""
+        self._search_job = None
+        self.tree.delete(*self.tree.get_children())
+        for wt in search_work_types(self.db, self.search_entry.get()):
+            self.tree.insert("", "end", values=(
+                wt[1],
+                wt[3],
+                f"{wt[2]:.2f} ₽"
+            ), tags=(wt[0],))
+
     def _on_select(self) -> None:
         """Обработка выбора работы с валидацией."""
         selected = self.tree.selection()
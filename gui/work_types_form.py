@@ -1,11 +1,22 @@
 # gui/work_types_form.py
+import logging
+import sqlite3
 from typing import Optional
 import customtkinter as ctk
 from db.database import Database
+from db.queries import (
+    WORK_TYPE_DELETE,
+    WORK_TYPE_INSERT,
+    WORK_TYPE_UPDATE,
+    WORK_TYPE_USAGE_COUNT,
+    WORK_TYPES_LIST
+)
 from gui.base_form import BaseForm
 from gui.dialogs import show_error
 from utils.validators import validate_unique_work_type_name
 
+logger = logging.getLogger(__name__)
+
 
 class WorkTypesForm(BaseForm):
     """Форма для управления видами работ с поддержкой ID."""
@@ -18,8 +29,7 @@ class WorkTypesForm(BaseForm):
 
     def _load_data(self) -> None:
         """Загрузка данных с ID."""
-        query = "SELECT id, name, unit, price FROM work_types"
-        super()._load_data(query)
+        super()._load_data(WORK_TYPES_LIST)
 
     def _add_item(self) -> None:
         """Добавление нового вида работ."""
@@ -47,15 +57,21 @@ class WorkTypesForm(BaseForm):
             return
         work_id = self.table.item(selected[0])["values"][0]
 
-        # Проверка использования в нарядах
-        usage = self.db.execute_query(
-            "SELECT COUNT(*) FROM order_work_types WHERE work_type_id = ?", (work_id,)
-        )
-        if usage and usage[0][0] > 0:
-            show_error("Невозможно удалить: вид работ используется в нарядах")
+        # Проверка использования в нарядах и удаление - одна транзакция; сообщения - после ее завершения
+        try:
+            with self.db.transaction():
+                usage = self.db.execute_query(WORK_TYPE_USAGE_COUNT, (work_id,))
+                in_use = bool(usage and usage[0][0] > 0)
+                if not in_use:
+                    self.db.execute_query(WORK_TYPE_DELETE, (work_id,))
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка удаления вида работ {work_id}: {str(e)}")
+            show_error("Не удалось удалить запись, подробности в журнале")
             return
 
-        self.db.execute_query("DELETE FROM work_types WHERE id = ?", (work_id,))
+        if in_use:
+            show_error("Невозможно удалить: вид работ используется в нарядах")
+            return
         self._load_data()
 
 
@@ -130,19 +146,8 @@ class WorkTypeDialog(ctk.CTkToplevel):
 
         # Обновление или вставка
         if self.work_id:
-            query = """
-                UPDATE work_types 
-                SET name = ?, unit = ?, price = ?
-                WHERE id = ?
-            """
-            params = (name, unit, price, self.work_id)
+            self.db.execute_query(WORK_TYPE_UPDATE, (name, unit, price, self.work_id))
         else:
-            query = """
-                INSERT INTO work_types (name, unit, price)
-                VALUES (?, ?, ?)
-            """
-            params = (name, unit, price)
-
-        self.db.execute_query(query, params)
+            self.db.execute_query(WORK_TYPE_INSERT, (name, unit, price))
         self.result = True
         self.destroy()
\ No newline at end of file
@@ -2,6 +2,7 @@
 import sys
 import logging
 import tkinter as tk
+from pathlib import Path
 from db.backup import BackupManager
 from db.database import Database
 from gui.dialogs import show_error
@@ -10,6 +11,9 @@ from utils.logger import configure_logging
 
 logger = logging.getLogger(__name__)
 
+# Сводка времени выполнения запросов, сохраняемая при выходе
+QUERY_STATS_PATH = Path("logs/query_stats.json")
+
 
 def main() -> None:
     """Точка входа в программу с улучшенной обработкой ошибок."""
@@ -18,8 +22,10 @@ def main() -> None:
         logger.info("Инициализация приложения")
 
         # Инициализация базы данных
-        db = Database()
-        BackupManager(str(db.db_path)).create_backup()
+        db = Database.default()
+        # Копия снимается в фоне, окно открывается без ожидания; в хранилище
+        # попадают только изменившиеся с прошлого запуска блоки
+        BackupManager(str(db.db_path)).create_backup_async(incremental=True)
 
         # Инициализация GUI
         logger.debug("Создание главного окна")
@@ -42,6 +48,8 @@ def main() -> None:
                 app.destroy()
             except tk.TclError:
                 pass
+        if 'db' in locals():
+            db.profiler.dump(QUERY_STATS_PATH)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,20 @@
+# reports/_output.py
+import itertools
+from datetime import datetime
+from pathlib import Path
+
+
+def unique_output_path(output_dir: Path, prefix: str, suffix: str) -> Path:
+    """Создает пустой файл отчета с уникальным именем и возвращает его путь.
+
+    Имя - метка времени с микросекундами; файл создается в режиме "x", поэтому
+    задания, запущенные одновременно, не получат один и тот же путь.
+    """
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    for number in itertools.count():
+        path = output_dir / (f"{prefix}_{stamp}{suffix}" if not number else f"{prefix}_{stamp}_{number}{suffix}")
+        try:
+            path.open("x").close()
+            return path
+        except FileExistsError:
+            continue
@@ -0,0 +1,8 @@
+# reports/_pool.py
+import multiprocessing
+
+# Пулы процессов отчетов запускаются из потоков ReportJobQueue, пока живы
+# поток GUI, другие задания и соединения SQLite. После fork дочерний процесс
+# мог бы унаследовать блокировку, захваченную другим потоком, и зависнуть,
+# поэтому процессы стартуют через spawn (функции заданий - верхнего уровня)
+POOL_CONTEXT = multiprocessing.get_context("spawn")
@@ -0,0 +1,190 @@
+# reports/bundle.py
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+from db.database import Database
+from db.queries import REPORT_COLUMNS, report_query
+from reports._pool import POOL_CONTEXT
+from utils.progress import ProgressCallback
+
+logger = logging.getLogger(__name__)
+
+
+# Форматы комплекта и имена файлов в каталоге комплекта
+BUNDLE_FORMATS = {
+    "excel": "report.xlsx",
+    "pdf": "report.pdf",
+    "html": "report.html",
+}
+
+SNAPSHOT_NAME = "snapshot.db"
+
+# Строк в одной пачке при записи и чтении снимка
+SNAPSHOT_BATCH_SIZE = 2000
+
+SNAPSHOT_INSERT = (
+    f"INSERT INTO report_rows ({', '.join(REPORT_COLUMNS)}) "
+    f"VALUES ({', '.join('?' * len(REPORT_COLUMNS))})"
+)
+
+
+def _iter_snapshot(conn: sqlite3.Connection) -> Iterator[Tuple]:
+    cursor = conn.execute(f"SELECT {', '.join(REPORT_COLUMNS)} FROM report_rows ORDER BY rowid")
+    while True:
+        rows = cursor.fetchmany(SNAPSHOT_BATCH_SIZE)
+        if not rows:
+            return
+        yield from rows
+
+
+def render_bundle_part(
+        kind: str,
+        snapshot: str,
+        output_dir: str,
+        filters: Optional[Dict]
+) -> Optional[str]:
+    """Отрисовывает один формат комплекта по снимку (выполняется в процессе пула)."""
+    # Импорт внутри процесса: каждому формату нужны только свои библиотеки
+    if kind == "excel":
+        from reports.excel_report import ExcelReportGenerator
+        generator = ExcelReportGenerator(None, output_dir=Path(output_dir))
+    elif kind == "pdf":
+        from reports.pdf_report import PDFReportGenerator
+        generator = PDFReportGenerator(None, output_dir=Path(output_dir))
+    else:
+        from reports.html_report import HTMLReportGenerator
+        generator = HTMLReportGenerator(None, output_dir=Path(output_dir))
+
+    conn = sqlite3.connect(f"{Path(snapshot).resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        total = conn.execute("SELECT COUNT(*) FROM report_rows").fetchone()[0]
+        rows = _iter_snapshot(conn)
+        if kind == "excel":
+            return generator.generate_from_rows(rows, total, BUNDLE_FORMATS[kind])
+        return generator.generate_from_rows(rows, total, filters, BUNDLE_FORMATS[kind])
+    finally:
+        conn.close()
+
+
+class ReportBundleGenerator:
+    """Комплект отчета в Excel, PDF и HTML по одним и тем же данным.
+
+    Строки отчета читаются из БД один раз (один запрос - один согласованный
+    снимок данных) во временный файл SQLite, после чего форматы
+    отрисовываются параллельно в пуле процессов, каждый из своей копии
+    курсора по снимку. Запись в БД во время формирования на файлы не влияет.
+    """
+
+    def __init__(self, db: Database, output_dir: Optional[Path] = None, workers: Optional[int] = None) -> None:
+        self.db = db
+        self._output_dir = Path(output_dir) if output_dir else Path("reports/bundles")
+        self._output_dir.mkdir(exist_ok=True, parents=True)
+        self.workers = workers or min(len(BUNDLE_FORMATS), os.cpu_count() or 1)
+
+    def generate(
+            self,
+            filters: Optional[Dict] = None,
+            name: Optional[str] = None,
+            progress: Optional[ProgressCallback] = None
+    ) -> Optional[str]:
+        """Формирует комплект; фильтры - как у потоковой выгрузки Excel.
+
+        Возвращает каталог с report.xlsx, report.pdf и report.html или None,
+        если данных нет или хотя бы один формат не получился.
+        """
+        try:
+            bundle_dir = self._create_output_dir(name)
+        except OSError as e:
+            logger.error(f"Не удалось создать каталог комплекта: {str(e)}")
+            return None
+
+        complete = False
+        try:
+            snapshot = bundle_dir / SNAPSHOT_NAME
+            rows = self._take_snapshot(snapshot, filters)
+            if not rows:
+                logger.warning("Нет данных для отчета")
+                return None
+
+            results = self._render_all(snapshot, bundle_dir, filters, progress)
+            snapshot.unlink()
+            failed = [kind for kind, path in results.items() if not path]
+            if failed:
+                logger.error(f"Комплект {bundle_dir.name}: не сформированы {', '.join(failed)}")
+                return None
+            complete = True
+            logger.info(f"Комплект отчета: {rows} строк, каталог: {bundle_dir}")
+            return str(bundle_dir)
+
+        except Exception as e:
+            logger.error(f"Ошибка формирования комплекта отчета: {str(e)}", exc_info=True)
+            return None
+        finally:
+            # Неполный комплект (ошибка, нет данных, отмена задания) не оставляем
+            if not complete:
+                shutil.rmtree(bundle_dir, ignore_errors=True)
+
+    def _take_snapshot(self, snapshot: Path, filters: Optional[Dict]) -> int:
+        """Копирует строки отчета во временный файл одним запросом; возвращает их число."""
+        query, params = report_query(filters)
+        conn = sqlite3.connect(str(snapshot))
+        try:
+            # Снимок временный: журнал и синхронизация с диском не нужны
+            conn.execute("PRAGMA journal_mode = OFF")
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.execute(f"CREATE TABLE report_rows ({', '.join(REPORT_COLUMNS)})")
+            count = 0
+            batch = []
+            with conn:
+                for row in self.db.iter_query(query, params, batch_size=SNAPSHOT_BATCH_SIZE):
+                    batch.append(row)
+                    if len(batch) == SNAPSHOT_BATCH_SIZE:
+                        conn.executemany(SNAPSHOT_INSERT, batch)
+                        count += len(batch)
+                        batch = []
+                if batch:
+                    conn.executemany(SNAPSHOT_INSERT, batch)
+                    count += len(batch)
+            return count
+        finally:
+            conn.close()
+
+    def _render_all(
+            self,
+            snapshot: Path,
+            bundle_dir: Path,
+            filters: Optional[Dict],
+            progress: Optional[ProgressCallback]
+    ) -> Dict[str, Optional[str]]:
+        results: Dict[str, Optional[str]] = {}
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=POOL_CONTEXT) as pool:
+            running = {
+                pool.submit(render_bundle_part, kind, str(snapshot), str(bundle_dir), filters): kind
+                for kind in BUNDLE_FORMATS
+            }
+            while running:
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    results[running.pop(future)] = future.result()
+                if progress is not None:
+                    progress(len(results), len(BUNDLE_FORMATS))
+        return results
+
+    def _create_output_dir(self, name: Optional[str]) -> Path:
+        """Создает каталог комплекта; существующий каталог с тем же именем не используется.
+
+        Без имени к метке времени добавляется уникальный суффикс: комплекты,
+        запущенные в одну секунду, не сталкиваются.
+        """
+        if name:
+            bundle_dir = self._output_dir / name
+            bundle_dir.mkdir(parents=True)
+            return bundle_dir
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return Path(tempfile.mkdtemp(prefix=f"bundle_{timestamp}_", dir=self._output_dir))
@@ -1,23 +1,36 @@
 # reports/excel_report.py
 import logging
-from datetime import datetime
 from pathlib import Path
-from typing import Optional, Dict
+from typing import Dict, Iterable, Optional, Tuple
 
 import pandas as pd
+from openpyxl import Workbook
 
 from db.database import Database
-from db.queries import REPORT_BASE_QUERY
+from db.queries import REPORT_COLUMNS, report_query
+from reports._output import unique_output_path
+from utils.dates import from_db_date
+from utils.progress import ProgressCallback
 
 logger = logging.getLogger(__name__)
 
+# Предел строк листа Excel, включая строку заголовка
+EXCEL_MAX_ROWS = 1_048_576
+
+# Строк в одной пачке чтения из БД при потоковой выгрузке
+STREAM_BATCH_SIZE = 2000
+
+# Дата хранится как ГГГГ-ММ-ДД, в отчет выводится как ДД.ММ.ГГГГ (как в PDF и HTML)
+ORDER_DATE_INDEX = REPORT_COLUMNS.index("order_date")
+
 
 class ExcelReportGenerator:
     """Генератор отчетов в формате Excel."""
 
-    def __init__(self, db: Database) -> None:
+    def __init__(self, db: Optional[Database], output_dir: Optional[Path] = None) -> None:
+        # Без БД (None) доступен только generate_from_rows
         self.db = db
-        self._output_dir = Path("reports/excel")
+        self._output_dir = Path(output_dir) if output_dir else Path("reports/excel")
         self._output_dir.mkdir(exist_ok=True, parents=True)
 
     def generate(
@@ -27,25 +40,16 @@ class ExcelReportGenerator:
     ) -> Optional[str]:
         """Генерирует отчет с фильтрацией данных."""
         try:
-            # Выполнение запроса
-            data = self.db.execute_query(REPORT_BASE_QUERY)
+            # Фильтры применяются в запросе, до чтения строк
+            query, params = report_query(filters)
+            data = self.db.execute_query(query, params)
             if not data:
-                logger.warning("Нет данных для отчета")
+                logger.warning("Нет данных для отчета" if not filters else "Данные не соответствуют фильтрам")
                 return None
 
             # Создание DataFrame
-            df = pd.DataFrame(
-                data,
-                columns=["order_id", "order_date", "product", "contract_code",
-                         "total_amount", "workers"]
-            )
-
-            # Применение фильтров
-            if filters:
-                df = self._apply_filters(df, filters)
-                if df.empty:
-                    logger.warning("Данные не соответствуют фильтрам")
-                    return None
+            df = pd.DataFrame(data, columns=REPORT_COLUMNS)
+            df["order_date"] = df["order_date"].map(from_db_date)
 
             # Генерация имени файла
             output_path = self._get_output_path(filename)
@@ -56,22 +60,73 @@ class ExcelReportGenerator:
             logger.error(f"Ошибка генерации Excel-отчета: {str(e)}", exc_info=True)
             return None
 
-    def _apply_filters(self, df: pd.DataFrame, filters: Dict) -> pd.DataFrame:
-        """Применяет фильтры к данным."""
-        for column, value in filters.items():
-            if column not in df.columns:
-                continue
+    def generate_streaming(
+            self,
+            filters: Optional[Dict] = None,
+            filename: Optional[str] = None,
+            progress: Optional[ProgressCallback] = None,
+            max_rows_per_sheet: int = EXCEL_MAX_ROWS
+    ) -> Optional[str]:
+        """Потоковая выгрузка отчета для больших объемов.
+
+        Строки читаются из БД пачками и сразу пишутся в write-only книгу
+        openpyxl, поэтому память не зависит от размера отчета. Когда лист
+        заполнен до предела Excel, выгрузка продолжается на новом листе.
+        """
+        try:
+            query, params = report_query(filters)
+            with self.db.counted_query(query, params, batch_size=STREAM_BATCH_SIZE) as (total, rows):
+                return self.generate_from_rows(rows, total, filename, progress, max_rows_per_sheet)
+        except Exception as e:
+            logger.error(f"Ошибка генерации Excel-отчета: {str(e)}", exc_info=True)
+            return None
+
+    def generate_from_rows(
+            self,
+            rows: Iterable[Tuple],
+            total: int,
+            filename: Optional[str] = None,
+            progress: Optional[ProgressCallback] = None,
+            max_rows_per_sheet: int = EXCEL_MAX_ROWS
+    ) -> Optional[str]:
+        """Потоковая запись готовых строк отчета (в порядке REPORT_COLUMNS)."""
+        try:
+            workbook = Workbook(write_only=True)
+            sheet = None
+            sheet_rows = written = 0
+            for row in rows:
+                if sheet is None or sheet_rows >= max_rows_per_sheet:
+                    sheet = workbook.create_sheet(self._sheet_title(len(workbook.worksheets)))
+                    sheet.append(REPORT_COLUMNS)
+                    sheet_rows = 1
+                row = list(row)
+                row[ORDER_DATE_INDEX] = from_db_date(row[ORDER_DATE_INDEX])
+                sheet.append(row)
+                sheet_rows += 1
+                written += 1
+                if progress is not None and written % STREAM_BATCH_SIZE == 0:
+                    progress(written, total)
+
+            if not written:
+                logger.warning("Нет данных для отчета")
+                return None
+
+            # Последнее сообщение о прогрессе - до записи: отмена задания файла не оставит
+            if progress is not None:
+                progress(written, total)
+            output_path = self._get_output_path(filename)
+            workbook.save(output_path)
+            logger.info(f"Excel-отчет: {written} строк, листов: {len(workbook.worksheets)}")
+            return str(output_path)
 
-            if isinstance(value, (list, tuple)):
-                df = df[df[column].isin(value)]
-            elif isinstance(value, dict):
-                # Для диапазонов значений (например, дат)
-                if "start" in value and "end" in value:
-                    df = df[df[column].between(value["start"], value["end"])]
-            else:
-                df = df[df[column] == value]
+        except Exception as e:
+            logger.error(f"Ошибка генерации Excel-отчета: {str(e)}", exc_info=True)
+            return None
 
-        return df
+    @staticmethod
+    def _sheet_title(index: int) -> str:
+        """Имя листа: "Отчет", затем "Отчет (2)", "Отчет (3)"..."""
+        return "Отчет" if index == 0 else f"Отчет ({index + 1})"
 
     def _get_output_path(self, filename: Optional[str]) -> Path:
         """Генерирует путь к файлу."""
@@ -80,5 +135,4 @@ class ExcelReportGenerator:
                 filename += ".xlsx"
             return self._output_dir / filename
 
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        return self._output_dir / f"report_{timestamp}.xlsx"
\ No newline at end of file
+        return unique_output_path(self._output_dir, "report", ".xlsx")
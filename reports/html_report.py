@@ -1,52 +1,179 @@
 # reports/html_report.py
-from pathlib import Path
+import logging
 from datetime import datetime
+from functools import lru_cache
+from html import escape
+from pathlib import Path
+from string import Template
+from typing import Dict, Iterable, Optional, Tuple
 from db.database import Database
-from db.queries import WORK_ORDERS_FOR_PDF_HTML
-from typing import Optional, Dict
-import logging
+from db.queries import report_query
+from reports._output import unique_output_path
+from utils.dates import from_db_date
+from utils.formatting import format_amount
+from utils.progress import ProgressCallback
 
 logger = logging.getLogger(__name__)
 
+TEMPLATE_PATH = Path(__file__).with_name("templates") / "report.html"
+
+# Место вывода строк в шаблоне: до него - шапка, после - итоги и скрипт
+ROWS_PLACEHOLDER = "$rows"
+
+HEADERS = ["Наряд №", "Дата", "Изделие", "Контракт", "Сумма", "Рабочие"]
+# Столбцы, которые сортируются как числа (по data-sort)
+NUMERIC_COLUMNS = {0, 4}
+
+ROW_TEMPLATE = (
+    '<tr><td class="num">{0}</td><td data-sort="{1}">{2}</td><td>{3}</td><td>{4}</td>'
+    '<td class="num" data-sort="{5}">{6}</td><td>{7}</td></tr>\n'
+)
+
+# Строк в одной пачке чтения из БД и записи в файл
+STREAM_BATCH_SIZE = 2000
+
+# Строк на странице при просмотре; 0 - без разбивки (все строки сразу)
+DEFAULT_PAGE_SIZE = 100
+
+# Дат в отчете намного меньше, чем строк, а strptime дорогой
+_display_date = lru_cache(maxsize=4096)(from_db_date)
+
+
+@lru_cache(maxsize=None)
+def load_template(path: Path = TEMPLATE_PATH) -> Tuple[Template, Template]:
+    """Читает и разбирает шаблон один раз: (часть до строк, часть после строк)."""
+    head, separator, tail = path.read_text(encoding="utf-8").partition(ROWS_PLACEHOLDER)
+    if not separator:
+        raise ValueError(f"В шаблоне {path} нет места для строк ({ROWS_PLACEHOLDER})")
+    return Template(head), Template(tail)
+
 
 class HTMLReportGenerator:
-    """Генератор отчетов в формате HTML."""
+    """Генератор отчетов в формате HTML.
+
+    Строки пишутся в файл пачками по мере чтения из БД, весь документ в
+    памяти не собирается. Таблица читается и печатается без JavaScript;
+    скрипт в странице добавляет разбивку на страницы и сортировку по столбцам.
+    """
 
-    def __init__(self, db: Database) -> None:
+    def __init__(self, db: Optional[Database], output_dir: Optional[Path] = None) -> None:
+        # Без БД (None) доступен только generate_from_rows
         self.db = db
-        self._output_dir = Path("reports/html")
+        self._output_dir = Path(output_dir) if output_dir else Path("reports/html")
         self._output_dir.mkdir(exist_ok=True, parents=True)
 
-    def generate(self, filters: Optional[Dict] = None, filename: Optional[str] = None) -> Optional[str]:
-        """Генерирует HTML-отчет."""
+    def generate(
+            self,
+            filters: Optional[Dict] = None,
+            filename: Optional[str] = None,
+            progress: Optional[ProgressCallback] = None,
+            page_size: int = DEFAULT_PAGE_SIZE
+    ) -> Optional[str]:
+        """Генерирует HTML-отчет; фильтры - как у потоковой выгрузки Excel."""
+        try:
+            query, params = report_query(filters)
+            with self.db.counted_query(query, params, batch_size=STREAM_BATCH_SIZE) as (total, rows):
+                return self.generate_from_rows(rows, total, filters, filename, progress, page_size)
+        except Exception as e:
+            logger.error(f"Ошибка генерации HTML-отчета: {str(e)}", exc_info=True)
+            return None
+
+    def generate_from_rows(
+            self,
+            rows: Iterable[Tuple],
+            total: int,
+            filters: Optional[Dict] = None,
+            filename: Optional[str] = None,
+            progress: Optional[ProgressCallback] = None,
+            page_size: int = DEFAULT_PAGE_SIZE
+    ) -> Optional[str]:
+        """HTML из готовых строк отчета; filters только выводятся в заголовке."""
         try:
-            data = self.db.execute_query(WORK_ORDERS_FOR_PDF_HTML)
-            if not data:
+            if not total:
                 logger.warning("Нет данных для отчета")
                 return None
 
-            # Формирование HTML-контента
-            html_content = self._build_html(data)
-
-            # Сохранение файла
+            head, tail = load_template()
             output_path = self._get_output_path(filename)
-            with open(output_path, "w", encoding="utf-8") as f:
-                f.write(html_content)
+            try:
+                with open(output_path, "w", encoding="utf-8") as f:
+                    f.write(head.substitute(
+                        title="Отчет по нарядам работ",
+                        info=escape(self._info_text(filters)),
+                        page_size=page_size,
+                        headers=self._headers_html(),
+                    ))
+                    written, amount = self._write_rows(f, rows, total, progress)
+                    f.write(tail.substitute(total=escape(format_amount(amount)), count=written))
+            except BaseException:
+                # Оборванный файл (ошибка или отмена задания) не оставляем
+                output_path.unlink(missing_ok=True)
+                raise
 
+            logger.info(f"HTML-отчет: {written} строк, файл: {output_path}")
             return str(output_path)
 
         except Exception as e:
-            logger.error(f"Ошибка генерации HTML-отчета: {str(e)}")
+            logger.error(f"Ошибка генерации HTML-отчета: {str(e)}", exc_info=True)
             return None
 
-    def _build_html(self, data: list) -> str:
-        """Создает HTML-структуру."""
-        # Реализация построения HTML...
-        return "<html>...</html>"
+    @staticmethod
+    def _write_rows(
+            f,
+            rows: Iterable[Tuple],
+            total: int,
+            progress: Optional[ProgressCallback]
+    ) -> Tuple[int, float]:
+        """Пишет строки таблицы пачками; возвращает (число строк, общая сумма)."""
+        written = 0
+        amount = 0.0
+        chunk = []
+        for order_id, order_date, product, contract_code, total_amount, workers in rows:
+            total_amount = total_amount or 0
+            amount += total_amount
+            chunk.append(ROW_TEMPLATE.format(
+                order_id,
+                escape(order_date),
+                escape(_display_date(order_date)),
+                escape(product),
+                escape(contract_code),
+                total_amount,
+                escape(format_amount(total_amount)),
+                escape(workers),
+            ))
+            if len(chunk) == STREAM_BATCH_SIZE:
+                f.write("".join(chunk))
+                written += len(chunk)
+                chunk = []
+                if progress is not None:
+                    progress(written, total)
+        if chunk:
+            f.write("".join(chunk))
+            written += len(chunk)
+            if progress is not None:
+                progress(written, total)
+        return written, amount
+
+    @staticmethod
+    def _headers_html() -> str:
+        return "".join(
+            f"<th data-numeric>{escape(title)}</th>" if column in NUMERIC_COLUMNS else f"<th>{escape(title)}</th>"
+            for column, title in enumerate(HEADERS)
+        )
+
+    @staticmethod
+    def _info_text(filters: Optional[Dict]) -> str:
+        """Дата формирования и примененные фильтры."""
+        text = f"Сформировано: {datetime.now().strftime('%d.%m.%Y %H:%M')}"
+        applied = [f"{k}: {v}" for k, v in (filters or {}).items() if v]
+        if applied:
+            text += ". Примененные фильтры: " + ", ".join(applied)
+        return text
 
     def _get_output_path(self, filename: Optional[str]) -> Path:
         """Генерирует путь к файлу."""
         if filename:
+            if not filename.endswith(".html"):
+                filename += ".html"
             return self._output_dir / filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        return self._output_dir / f"report_{timestamp}.html"
\ No newline at end of file
+        return unique_output_path(self._output_dir, "report", ".html")
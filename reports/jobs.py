@@ -0,0 +1,186 @@
+# reports/jobs.py
+import itertools
+import logging
+import shutil
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional
+from utils.progress import ProgressCallback
+
+logger = logging.getLogger(__name__)
+
+# Одновременно формируемых отчетов; остальные ждут в очереди
+MAX_PARALLEL_JOBS = 2
+
+# Сколько завершенных заданий хранить в списке
+MAX_FINISHED_JOBS = 20
+
+# Состояния задания
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+STATUS_TITLES = {
+    PENDING: "В очереди",
+    RUNNING: "Выполняется",
+    DONE: "Готово",
+    FAILED: "Ошибка",
+    CANCELLED: "Отменено",
+}
+
+# Задание получает функцию прогресса и возвращает путь к файлу или None
+JobTarget = Callable[[ProgressCallback], Optional[str]]
+
+
+class JobCancelled(BaseException):
+    """Прерывает генератор отчета из функции прогресса.
+
+    Наследуется от BaseException, чтобы пройти сквозь обработчики
+    except Exception в генераторах, а не превратиться в ошибку отчета.
+    """
+
+
+class JobState(NamedTuple):
+    """Снимок задания для отображения в интерфейсе."""
+    job_id: int
+    title: str
+    status: str
+    done: int
+    total: int
+    result: Optional[str]
+    created: datetime
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    @property
+    def fraction(self) -> float:
+        return self.done / self.total if self.total else 0.0
+
+
+class _Job:
+    def __init__(self, job_id: int, title: str, target: JobTarget) -> None:
+        self.job_id = job_id
+        self.title = title
+        self.target = target
+        self.status = PENDING
+        self.done = self.total = 0
+        self.result: Optional[str] = None
+        self.created = datetime.now()
+        self.cancel_event = threading.Event()
+        self.future: Optional[Future] = None
+
+    def state(self) -> JobState:
+        return JobState(self.job_id, self.title, self.status, self.done, self.total, self.result, self.created)
+
+
+class ReportJobQueue:
+    """Очередь фоновых заданий формирования отчетов.
+
+    Задания выполняются в пуле потоков, интерфейс не блокируется. Потоки
+    пула только обновляют состояние заданий под блокировкой; окно читает
+    снимки через snapshot() по таймеру after(), поэтому к Tk обращается
+    только главный поток.
+    """
+
+    def __init__(self, max_workers: int = MAX_PARALLEL_JOBS) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="report")
+        self._lock = threading.Lock()
+        self._jobs: Dict[int, _Job] = {}
+        self._ids = itertools.count(1)
+
+    def submit(self, title: str, target: JobTarget) -> int:
+        """Ставит задание в очередь; возвращает его номер."""
+        job = _Job(next(self._ids), title, target)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._trim_finished()
+        job.future = self._executor.submit(self._run, job)
+        logger.info(f"Задание {job.job_id} ({title}) поставлено в очередь")
+        return job.job_id
+
+    def cancel(self, job_id: int) -> bool:
+        """Отменяет задание: ожидающее снимается с очереди, выполняемое
+        прерывается при ближайшем сообщении о прогрессе."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status not in (PENDING, RUNNING):
+                return False
+            job.cancel_event.set()
+            if job.status == PENDING and job.future is not None and job.future.cancel():
+                job.status = CANCELLED
+        logger.info(f"Задание {job_id} отменяется")
+        return True
+
+    def snapshot(self) -> List[JobState]:
+        """Состояние всех заданий в порядке постановки."""
+        with self._lock:
+            return [job.state() for job in self._jobs.values()]
+
+    def has_active(self) -> bool:
+        with self._lock:
+            return any(job.status in (PENDING, RUNNING) for job in self._jobs.values())
+
+    def shutdown(self, cancel: bool = True) -> None:
+        """Останавливает очередь; по умолчанию незавершенные задания отменяются."""
+        if cancel:
+            for state in self.snapshot():
+                if not state.finished:
+                    self.cancel(state.job_id)
+        self._executor.shutdown(wait=True)
+
+    def _run(self, job: _Job) -> None:
+        with self._lock:
+            if job.cancel_event.is_set():
+                job.status = CANCELLED
+                return
+            job.status = RUNNING
+
+        def progress(done: int, total: int) -> None:
+            with self._lock:
+                job.done, job.total = done, total
+            if job.cancel_event.is_set():
+                raise JobCancelled()
+
+        status = FAILED
+        result = None
+        try:
+            result = job.target(progress)
+            if job.cancel_event.is_set():
+                status = CANCELLED
+            elif result:
+                status = DONE
+        except JobCancelled:
+            status = CANCELLED
+        except Exception as e:
+            logger.error(f"Задание {job.job_id} ({job.title}) завершилось ошибкой: {str(e)}", exc_info=True)
+        if status == CANCELLED and result:
+            # Отмена пришла после записи результата: отмененное задание файлов не оставляет
+            self._discard(result)
+            result = None
+        with self._lock:
+            job.status = status
+            job.result = result
+        logger.info(f"Задание {job.job_id} ({job.title}): {STATUS_TITLES[status]}")
+
+    @staticmethod
+    def _discard(result: str) -> None:
+        """Удаляет файл или каталог (комплект) результата."""
+        path = Path(result)
+        try:
+            if path.is_dir():
+                shutil.rmtree(path)
+            else:
+                path.unlink(missing_ok=True)
+        except OSError as e:
+            logger.error(f"Не удалось удалить результат отмененного задания {path}: {str(e)}")
+
+    def _trim_finished(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in (DONE, FAILED, CANCELLED)]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
@@ -0,0 +1,278 @@
+# reports/order_sheets.py
+import json
+import logging
+import os
+import tempfile
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+from xml.sax.saxutils import escape
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import cm
+from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+from db.database import Database
+from db.queries import ORDER_SHEET_SELECT, ORDER_SHEET_WORKERS, ORDER_SHEET_WORKS, report_query
+from reports._output import unique_output_path
+from reports._pool import POOL_CONTEXT
+from reports.pdf_report import register_fonts
+from utils.dates import from_db_date
+from utils.formatting import format_amount
+from utils.progress import ProgressCallback
+
+try:
+    from pypdf import PdfWriter
+except ImportError:  # без pypdf бланки выдаются ZIP-архивом
+    PdfWriter = None
+
+logger = logging.getLogger(__name__)
+
+
+# Нарядов в одном задании процесса: меньше - больше накладных расходов
+# на передачу, больше - хуже распределение между процессами
+SHEETS_PER_TASK = 20
+
+# Подписи внизу бланка
+SIGNATURES = ("Мастер", "Начальник цеха", "Нормировщик", "Бухгалтер")
+
+
+class OrderSheet(NamedTuple):
+    """Данные одного бланка наряда (передаются в процесс отрисовки)."""
+    order_id: int
+    order_date: str
+    product: str
+    contract_code: str
+    total_amount: float
+    workers: Tuple[Tuple[str, str, str], ...]
+    works: Tuple[Tuple[str, str, int, float], ...]
+
+
+def render_order_sheets(sheets: List[OrderSheet], output_dir: str, per_order: bool) -> Tuple[List[str], int]:
+    """Отрисовывает пачку бланков (выполняется в процессе пула).
+
+    per_order=True - файл на каждый наряд, иначе один файл на пачку: подмножество
+    шрифта встраивается один раз, что заметно быстрее. Возвращает (файлы, число бланков).
+    """
+    font, bold_font = register_fonts()
+    styles = {
+        "title": ParagraphStyle(name="SheetTitle", fontName=bold_font, fontSize=16, leading=20, alignment=1),
+        "normal": ParagraphStyle(name="SheetNormal", fontName=font, fontSize=10, leading=13),
+        "cell": ParagraphStyle(name="SheetCell", fontName=font, fontSize=9, leading=11),
+    }
+    groups = [[sheet] for sheet in sheets] if per_order else [sheets]
+    paths = []
+    for group in groups:
+        path = Path(output_dir) / f"naryad_{group[0].order_id:08d}.pdf"
+        elements: List[Any] = []
+        for sheet in group:
+            if elements:
+                elements.append(PageBreak())
+            elements.extend(_sheet_elements(sheet, styles, font, bold_font))
+        doc = SimpleDocTemplate(str(path), pagesize=A4, leftMargin=2 * cm, rightMargin=1.5 * cm,
+                                topMargin=1.5 * cm, bottomMargin=1.5 * cm, title="Наряды")
+        doc.build(elements)
+        paths.append(str(path))
+    return paths, len(sheets)
+
+
+def _sheet_elements(sheet: OrderSheet, styles: Dict[str, ParagraphStyle], font: str, bold_font: str) -> List:
+    """Содержимое бланка: шапка, рабочие, работы с итогом и подписи."""
+    elements: List[Any] = [
+        Paragraph(f"НАРЯД № {sheet.order_id}", styles["title"]),
+        Spacer(1, 0.4 * cm),
+        Paragraph(f"Дата: {escape(from_db_date(sheet.order_date))}", styles["normal"]),
+        Paragraph(f"Изделие: {escape(sheet.product)}", styles["normal"]),
+        Paragraph(f"Контракт: {escape(sheet.contract_code)}", styles["normal"]),
+        Spacer(1, 0.4 * cm),
+        Paragraph("Исполнители", styles["normal"]),
+    ]
+
+    workers_data: List[List[Any]] = [["№", "Табельный №", "ФИО", "Должность"]]
+    for number, (employee_id, full_name, position) in enumerate(sheet.workers, 1):
+        workers_data.append([str(number), employee_id, Paragraph(escape(full_name), styles["cell"]),
+                             Paragraph(escape(position), styles["cell"])])
+    if len(workers_data) == 1:
+        workers_data.append(["", "", "Не выбраны", ""])
+    elements.append(_table(workers_data, [1 * cm, 3 * cm, 8 * cm, 5.5 * cm], font, bold_font, 0))
+    elements.append(Spacer(1, 0.4 * cm))
+    elements.append(Paragraph("Выполненные работы", styles["normal"]))
+
+    works_data: List[List[Any]] = [["№", "Наименование", "Ед. изм.", "Кол-во", "Цена", "Сумма"]]
+    for number, (name, unit, quantity, amount) in enumerate(sheet.works, 1):
+        works_data.append([str(number), Paragraph(escape(name), styles["cell"]), unit, str(quantity),
+                           format_amount(amount / quantity if quantity else 0), format_amount(amount)])
+    works_data.append(["", "Итого", "", "", "", format_amount(sheet.total_amount)])
+    elements.append(_table(works_data, [1 * cm, 7 * cm, 2 * cm, 1.7 * cm, 2.9 * cm, 2.9 * cm], font, bold_font, 1))
+    elements.append(Spacer(1, 1.2 * cm))
+
+    signatures = [[f"{title}:", "____________________", "/____________________/"] for title in SIGNATURES]
+    signature_table = Table(signatures, colWidths=[4 * cm, 5.5 * cm, 6 * cm], rowHeights=0.9 * cm)
+    signature_table.setStyle(TableStyle([
+        ("FONTNAME", (0, 0), (-1, -1), font),
+        ("FONTSIZE", (0, 0), (-1, -1), 10),
+        ("VALIGN", (0, 0), (-1, -1), "BOTTOM"),
+    ]))
+    elements.append(signature_table)
+    return elements
+
+
+def _table(data: List[List[Any]], widths: List[float], font: str, bold_font: str, summary_rows: int) -> Table:
+    table = Table(data, colWidths=widths, repeatRows=1)
+    style = [
+        ("FONTNAME", (0, 0), (-1, -1), font),
+        ("FONTNAME", (0, 0), (-1, 0), bold_font),
+        ("FONTSIZE", (0, 0), (-1, -1), 9),
+        ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+    ]
+    if summary_rows:
+        style.append(("FONTNAME", (0, -summary_rows), (-1, -1), bold_font))
+    table.setStyle(TableStyle(style))
+    return table
+
+
+class OrderSheetPrinter:
+    """Пакетная печать бланков нарядов за период или по контракту.
+
+    Данные читаются из БД в главном процессе пачками нарядов, бланки
+    отрисовываются параллельно в пуле процессов и собираются в один PDF
+    (если установлен pypdf) или в ZIP-архив.
+    """
+
+    def __init__(
+            self,
+            db: Database,
+            output_dir: Optional[Path] = None,
+            workers: Optional[int] = None,
+            sheets_per_task: int = SHEETS_PER_TASK
+    ) -> None:
+        self.db = db
+        self._output_dir = Path(output_dir) if output_dir else Path("reports/naryady")
+        self._output_dir.mkdir(exist_ok=True, parents=True)
+        self.workers = workers or os.cpu_count() or 1
+        self.sheets_per_task = sheets_per_task
+
+    def print_orders(
+            self,
+            filters: Optional[Dict] = None,
+            output_format: str = "pdf",
+            filename: Optional[str] = None,
+            progress: Optional[ProgressCallback] = None
+    ) -> Optional[str]:
+        """Печатает бланки нарядов по фильтрам отчета (report_query), например
+        {"order_date": {"start": "01.03.2024", "end": "31.03.2024"}, "contract_code": "К-1"}.
+
+        output_format: "pdf" - один файл, "zip" - архив с файлом на каждый наряд.
+        """
+        try:
+            query, params = report_query(filters, ORDER_SHEET_SELECT)
+            with self.db.counted_query(query, params, batch_size=self.sheets_per_task) as (total, rows):
+                if not total:
+                    logger.warning("Нет нарядов для печати")
+                    return None
+
+                if output_format == "pdf" and PdfWriter is None:
+                    logger.warning("pypdf не установлен, бланки будут сохранены в ZIP-архив")
+                    output_format = "zip"
+
+                with tempfile.TemporaryDirectory(dir=self._output_dir) as tmp:
+                    parts = self._render_all(self._iter_sheets(rows), tmp, output_format == "zip", total, progress)
+                    output_path = self._get_output_path(filename, output_format)
+                    if output_format == "pdf":
+                        self._merge_pdf(parts, output_path)
+                    else:
+                        self._write_zip(parts, output_path)
+            logger.info(f"Напечатано нарядов: {total}, файл: {output_path}")
+            return str(output_path)
+
+        except Exception as e:
+            logger.error(f"Ошибка печати нарядов: {str(e)}", exc_info=True)
+            return None
+
+    def _iter_sheets(self, rows: Iterator[Tuple]) -> Iterator[List[OrderSheet]]:
+        """Пачки бланков: шапки нарядов потоком, рабочие и работы - запросом на пачку."""
+        batch: List[Tuple] = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == self.sheets_per_task:
+                yield self._load_details(batch)
+                batch = []
+        if batch:
+            yield self._load_details(batch)
+
+    def _load_details(self, orders: List[Tuple]) -> List[OrderSheet]:
+        ids = json.dumps([order[0] for order in orders])
+        workers: Dict[int, List[Tuple[str, str, str]]] = {}
+        for order_id, employee_id, full_name, position in self.db.execute_query(ORDER_SHEET_WORKERS, (ids,)) or []:
+            workers.setdefault(order_id, []).append((employee_id, full_name, position))
+        works: Dict[int, List[Tuple[str, str, int, float]]] = {}
+        for order_id, name, unit, quantity, amount in self.db.execute_query(ORDER_SHEET_WORKS, (ids,)) or []:
+            works.setdefault(order_id, []).append((name, unit, quantity, amount))
+        return [
+            OrderSheet(*order, tuple(workers.get(order[0], ())), tuple(works.get(order[0], ())))
+            for order in orders
+        ]
+
+    def _render_all(
+            self,
+            batches: Iterator[List[OrderSheet]],
+            tmp_dir: str,
+            per_order: bool,
+            total: int,
+            progress: Optional[ProgressCallback]
+    ) -> List[str]:
+        """Распределяет пачки по процессам; в работе не больше двух пачек на процесс."""
+        parts: List[str] = []
+        done = 0
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=POOL_CONTEXT) as pool:
+            running: Set[Future] = set()
+            for batch in batches:
+                running.add(pool.submit(render_order_sheets, batch, tmp_dir, per_order))
+                if len(running) >= self.workers * 2:
+                    finished, running = wait(running, return_when=FIRST_COMPLETED)
+                    done += self._collect(finished, parts)
+                    if progress is not None:
+                        progress(done, total)
+            while running:
+                finished, running = wait(running, return_when=FIRST_COMPLETED)
+                done += self._collect(finished, parts)
+                if progress is not None:
+                    progress(done, total)
+        # Имена файлов содержат номер (первого) наряда с ведущими нулями
+        return sorted(parts)
+
+    @staticmethod
+    def _collect(finished: Set[Future], parts: List[str]) -> int:
+        count = 0
+        for future in finished:
+            paths, sheets = future.result()
+            parts.extend(paths)
+            count += sheets
+        return count
+
+    @staticmethod
+    def _merge_pdf(parts: List[str], output_path: Path) -> None:
+        writer = PdfWriter()
+        for part in parts:
+            writer.append(part)
+        with open(output_path, "wb") as f:
+            writer.write(f)
+
+    @staticmethod
+    def _write_zip(parts: List[str], output_path: Path) -> None:
+        # PDF уже сжат внутри, повторное сжатие только тратит время
+        with zipfile.ZipFile(output_path, "w", compression=zipfile.ZIP_STORED) as archive:
+            for part in parts:
+                archive.write(part, arcname=Path(part).name)
+
+    def _get_output_path(self, filename: Optional[str], output_format: str) -> Path:
+        """Генерация пути для сохранения файла."""
+        suffix = f".{output_format}"
+        if filename:
+            if not filename.endswith(suffix):
+                filename += suffix
+            return self._output_dir / filename
+        return unique_output_path(self._output_dir, "naryady", suffix)
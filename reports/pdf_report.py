@@ -1,180 +1,327 @@
 # reports/pdf_report.py
 import logging
+from collections import deque
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Optional, List, Tuple
+from typing import Any, Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from xml.sax.saxutils import escape
 from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.styles import ParagraphStyle
 from reportlab.lib.units import cm
-from reportlab.platypus import (
-    SimpleDocTemplate,
-    Table,
-    TableStyle,
-    Paragraph,
-    Spacer
-)
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Paragraph, Table, TableStyle
 from db.database import Database
-from db.queries import WORK_ORDERS_FOR_PDF_HTML
-from utils.validators import validate_date_range
+from db.queries import report_query
+from reports._output import unique_output_path
+from utils.dates import from_db_date
+from utils.formatting import format_amount
+from utils.progress import ProgressCallback
 
 logger = logging.getLogger(__name__)
 
+PAGE_SIZE = landscape(A4)
+MARGIN = 1.5 * cm
+COLUMN_WIDTHS = [2 * cm, 2.5 * cm, 4.5 * cm, 4 * cm, 3.2 * cm, 10.4 * cm]
+HEADERS = ["Наряд №", "Дата", "Изделие", "Контракт", "Сумма", "Рабочие"]
+
+# Больше строк на страницу не поместится даже без переносов
+MAX_ROWS_PER_PAGE = 40
+
+# Строк в одной пачке чтения из БД
+STREAM_BATCH_SIZE = 500
+
+# Ширина таблицы отчета на странице
+TABLE_WIDTH = PAGE_SIZE[0] - 2 * MARGIN
+
+# Шрифты с кириллицей: встроенная Helvetica русский текст не отображает
+FONT_CANDIDATES = [
+    ("DejaVuSans", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+     "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"),
+    ("Arial", "C:/Windows/Fonts/arial.ttf", "C:/Windows/Fonts/arialbd.ttf"),
+    ("LiberationSans", "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+     "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf"),
+]
+
+
+class PreparedRow(NamedTuple):
+    """Строка отчета, готовая к выводу: исходная строка, ячейки, сумма и высота."""
+    row: Tuple
+    cells: List[Any]
+    amount: float
+    height: float
+
+
+@lru_cache(maxsize=None)
+def register_fonts() -> Tuple[str, str]:
+    """Регистрирует TTF-шрифт с кириллицей; возвращает имена обычного и жирного начертаний."""
+    for name, regular, bold in FONT_CANDIDATES:
+        if Path(regular).exists():
+            pdfmetrics.registerFont(TTFont(name, regular))
+            bold_name = name
+            if Path(bold).exists():
+                bold_name = f"{name}-Bold"
+                pdfmetrics.registerFont(TTFont(bold_name, bold))
+            return name, bold_name
+    logger.warning("Шрифт с кириллицей не найден, текст PDF может отображаться некорректно")
+    return "Helvetica", "Helvetica-Bold"
+
 
 class PDFReportGenerator:
-    """Генератор PDF-отчетов с расширенными возможностями фильтрации."""
+    """Генератор PDF-отчетов с расширенными возможностями фильтрации.
 
-    def __init__(self, db: Database):
+    Строки читаются из БД пачками и выводятся постранично: каждая страница -
+    отдельная таблица с заголовком столбцов и итогом страницы. Время растет
+    линейно с числом строк, в памяти держится одна страница данных.
+    """
+
+    def __init__(self, db: Optional[Database], output_dir: Optional[Path] = None):
+        # Без БД (None) доступен только generate_from_rows
         self.db = db
-        self._output_dir = Path("reports/pdf")
+        self._output_dir = Path(output_dir) if output_dir else Path("reports/pdf")
         self._output_dir.mkdir(exist_ok=True, parents=True)
+        self.font, self.bold_font = register_fonts()
         self.styles = self._create_custom_styles()
 
     def generate(
             self,
             filters: Optional[Dict] = None,
-            filename: Optional[str] = None
+            filename: Optional[str] = None,
+            progress: Optional[ProgressCallback] = None
     ) -> Optional[str]:
         """Генерирует PDF-отчет с применением фильтров."""
         try:
-            data = self._get_filtered_data(filters)
-            if not data:
+            query, params = report_query(filters)
+            with self.db.counted_query(query, params, batch_size=STREAM_BATCH_SIZE) as (total, rows):
+                return self.generate_from_rows(rows, total, filters, filename, progress)
+        except Exception as e:
+            logger.error(f"Ошибка генерации PDF: {str(e)}", exc_info=True)
+            return None
+
+    def generate_from_rows(
+            self,
+            rows: Iterable[Tuple],
+            total: int,
+            filters: Optional[Dict] = None,
+            filename: Optional[str] = None,
+            progress: Optional[ProgressCallback] = None
+    ) -> Optional[str]:
+        """PDF из готовых строк отчета; filters только выводятся в заголовке."""
+        try:
+            if not total:
                 logger.warning("Нет данных для формирования отчета")
                 return None
 
             output_path = self._get_output_path(filename)
-            doc = SimpleDocTemplate(
-                str(output_path),
-                pagesize=A4,
-                leftMargin=2 * cm,
-                rightMargin=2 * cm
-            )
-            elements = []
-            self._add_header(elements)
-            self._add_filters_info(elements, filters)
-            self._add_data_table(elements, data)
-            self._add_footer(elements)
-            doc.build(elements)
+            pdf = canvas.Canvas(str(output_path), pagesize=PAGE_SIZE, pageCompression=1)
+            pdf.setTitle("Отчет по нарядам работ")
+            self._render(pdf, iter(rows), filters, total, progress)
+            pdf.save()
             return str(output_path)
         except Exception as e:
-            logger.error(f"Ошибка генерации PDF: {str(e)}")
+            logger.error(f"Ошибка генерации PDF: {str(e)}", exc_info=True)
             return None
 
-    def _get_filtered_data(self, filters: Optional[Dict]) -> List[Tuple]:
-        """Получение данных с применением фильтров."""
-        query = WORK_ORDERS_FOR_PDF_HTML
-        params = []
-        if filters:
-            where_clauses = []
-            for key, value in filters.items():
-                if value:
-                    if key == "date_range":
-                        if validate_date_range(value["start"], value["end"]):
-                            where_clauses.append(
-                                "wo.order_date BETWEEN ? AND ?"
-                            )
-                            params.extend([value["start"], value["end"]])
-                    elif key == "contract":
-                        where_clauses.append("c.contract_code = ?")
-                        params.append(value)
-                    elif key == "product":
-                        where_clauses.append("p.name = ?")
-                        params.append(value)
-                    elif key == "worker":
-                        where_clauses.append("e.full_name LIKE ?")
-                        params.append(f"%{value}%")
-            if where_clauses:
-                query += " WHERE " + " AND ".join(where_clauses)
-
-        return self.db.execute_query(query, tuple(params)) or []
-
-    def _create_custom_styles(self) -> Dict:
+    def _create_custom_styles(self) -> Dict[str, ParagraphStyle]:
         """Создание кастомных стилей для отчета."""
-        styles = getSampleStyleSheet()
-        styles.add(ParagraphStyle(
-            name="Title",
-            fontSize=14,
-            leading=16,
-            alignment=1,
-            spaceAfter=12
-        ))
-        styles.add(ParagraphStyle(
-            name="Footer",
-            fontSize=8,
-            textColor=colors.grey,
-            alignment=2
-        ))
-        return styles
-
-    def _add_header(self, elements: List) -> None:
-        """Добавление заголовка отчета."""
-        title = Paragraph(
-            "Отчет по нарядам работ",
-            self.styles["Title"]
-        )
-        elements.append(title)
-        elements.append(Spacer(1, 0.5 * cm))
-
-    def _add_filters_info(self, elements: List, filters: Dict) -> None:
-        """Добавление информации о примененных фильтрах."""
-        if filters:
-            filter_text = "Примененные фильтры: " + ", ".join(
-                [f"{k}: {v}" for k, v in filters.items() if v]
-            )
-            elements.append(Paragraph(filter_text, self.styles["Normal"]))
-            elements.append(Spacer(1, 0.2 * cm))
-
-    def _add_data_table(self, elements: List, data: List[Tuple]) -> None:
-        """Создание основной таблицы с данными."""
-        headers = [
-            "Наряд №",
-            "Дата",
-            "Изделие",
-            "Контракт",
-            "Сумма",
-            "Рабочие"
+        return {
+            "ReportTitle": ParagraphStyle(
+                name="ReportTitle",
+                fontName=self.bold_font,
+                fontSize=14,
+                leading=16,
+                alignment=1
+            ),
+            "Normal": ParagraphStyle(name="ReportNormal", fontName=self.font, fontSize=9, leading=11),
+            "Cell": ParagraphStyle(name="ReportCell", fontName=self.font, fontSize=8, leading=10),
+        }
+
+    def _render(
+            self,
+            pdf: canvas.Canvas,
+            rows: Iterator[Tuple],
+            filters: Optional[Dict],
+            total: int,
+            progress: Optional[ProgressCallback]
+    ) -> None:
+        """Постраничный вывод: на страницу берется столько строк, сколько помещается.
+
+        Ячейки строки переносятся один раз при чтении, страница набирается по
+        сумме высот строк, и таблица строится один раз на страницу.
+        """
+        header_height = self._row_height(HEADERS, header=True)
+        summary_height = self._row_height(["", "", "", "Итого по отчету", format_amount(0), ""])
+        pending: Deque[PreparedRow] = deque()
+        page = written = 0
+        grand_total = 0.0
+        while True:
+            # Одна строка сверх страницы нужна, чтобы знать, последняя ли это страница
+            while len(pending) <= MAX_ROWS_PER_PAGE:
+                row = next(rows, None)
+                if row is None:
+                    break
+                pending.append(self._prepare_row(row))
+            if not pending:
+                break
+
+            page += 1
+            top = self._draw_page_header(pdf, page, filters)
+            available = top - MARGIN - 1 * cm
+            # Строка выше свободного места страницы (длинный список рабочих) сокращается
+            row_limit = available - header_height - 2 * summary_height
+            if pending[0].height > row_limit:
+                pending[0] = self._prepare_row(pending[0].row, row_limit)
+            used = header_height + summary_height
+            count = 0
+            while count < min(len(pending), MAX_ROWS_PER_PAGE):
+                row_height = pending[count].height
+                if count and used + row_height > available:
+                    break
+                used += row_height
+                count += 1
+            is_last = count == len(pending)
+            if is_last and count > 1 and used + summary_height > available:
+                # Общий итог не помещается: последняя строка уходит на следующую страницу
+                count -= 1
+                is_last = False
+
+            chunk = [pending.popleft() for _ in range(count)]
+            table = self._build_table(chunk, grand_total, is_last)
+            _, height = table.wrap(TABLE_WIDTH, available)
+            table.drawOn(pdf, MARGIN, top - height)
+            grand_total += sum(row.amount for row in chunk)
+            written += count
+            self._draw_page_footer(pdf, page)
+            pdf.showPage()
+            if progress is not None:
+                progress(written, total)
+
+    def _row_height(self, cells: List[Any], header: bool = False) -> float:
+        """Высота строки таблицы: строка измеряется отдельной таблицей из одной строки."""
+        style = [
+            ("FONTNAME", (0, 0), (-1, -1), self.bold_font if header else self.font),
+            ("FONTSIZE", (0, 0), (-1, -1), 10 if header else 8),
+        ]
+        if header:
+            style.append(("BOTTOMPADDING", (0, 0), (-1, -1), 8))
+        _, height = Table([cells], colWidths=COLUMN_WIDTHS, style=style).wrap(TABLE_WIDTH, PAGE_SIZE[1])
+        return height
+
+    def _row_cells(self, row: Tuple, workers: str) -> List[Any]:
+        cell_style = self.styles["Cell"]
+        return [
+            str(row[0]),
+            from_db_date(row[1]),
+            Paragraph(escape(row[2] if row[2] else "Не указано"), cell_style),
+            Paragraph(escape(row[3] if row[3] else "Без контракта"), cell_style),
+            format_amount(row[4] or 0),
+            Paragraph(escape(workers), cell_style),
         ]
-        table_data = [headers]
-        for row in data:
-            formatted_row = [
-                str(row[0]),
-                datetime.strptime(row[1], "%Y-%m-%d").strftime("%d.%m.%Y"),
-                row[2] if row[2] else "Не указано",
-                row[3] if row[3] else "Без контракта",
-                f"{row[4]:,.2f} ₽".replace(",", " "),
-                ", ".join(row[5].split(", ")) if row[5] else "Не выбраны"
-            ]
-            table_data.append(formatted_row)
-
-        table = Table(
-            table_data,
-            colWidths=[2 * cm, 2.5 * cm, 4 * cm, 4 * cm, 3 * cm, 6 * cm],
-            repeatRows=1
-        )
+
+    def _prepare_row(self, row: Tuple, max_height: Optional[float] = None) -> PreparedRow:
+        """Ячейки строки отчета и ее высота в таблице.
+
+        Если задан max_height и строка выше, список рабочих сокращается до
+        помещающихся с пометкой, сколько рабочих не показано.
+        """
+        workers = row[5] if row[5] else "Не выбраны"
+        cells = self._row_cells(row, workers)
+        height = self._row_height(cells)
+        if max_height is not None and height > max_height:
+            names = workers.split(", ")
+            # Двоичный поиск наибольшего числа рабочих, с которым строка помещается
+            low, high = 0, len(names) - 1
+            best = None
+            while low <= high:
+                shown = (low + high) // 2
+                text = f"{', '.join(names[:shown])} ... и еще {len(names) - shown}".lstrip()
+                candidate = self._row_cells(row, text)
+                candidate_height = self._row_height(candidate)
+                if candidate_height <= max_height:
+                    best = (candidate, candidate_height)
+                    low = shown + 1
+                else:
+                    high = shown - 1
+            if best is None:
+                logger.warning(f"Строка наряда {row[0]} не помещается на страницу")
+            else:
+                cells, height = best
+        return PreparedRow(row, cells, row[4] or 0, height)
+
+    def _draw_page_header(self, pdf: canvas.Canvas, page: int, filters: Optional[Dict]) -> float:
+        """Заголовок (на первой странице - с фильтрами); возвращает верх таблицы."""
+        width, height = PAGE_SIZE
+        top = height - MARGIN
+        if page == 1:
+            title = Paragraph("Отчет по нарядам работ", self.styles["ReportTitle"])
+            _, title_height = title.wrap(width - 2 * MARGIN, top)
+            title.drawOn(pdf, MARGIN, top - title_height)
+            top -= title_height + 0.4 * cm
+            filter_text = self._filters_text(filters)
+            if filter_text:
+                info = Paragraph(escape(filter_text), self.styles["Normal"])
+                _, info_height = info.wrap(width - 2 * MARGIN, top)
+                info.drawOn(pdf, MARGIN, top - info_height)
+                top -= info_height + 0.3 * cm
+        else:
+            pdf.setFont(self.font, 8)
+            pdf.setFillColor(colors.grey)
+            pdf.drawString(MARGIN, top - 8, "Отчет по нарядам работ (продолжение)")
+            pdf.setFillColor(colors.black)
+            top -= 0.6 * cm
+        return top
+
+    def _draw_page_footer(self, pdf: canvas.Canvas, page: int) -> None:
+        """Подвал: дата формирования и номер страницы."""
+        pdf.setFont(self.font, 8)
+        pdf.setFillColor(colors.grey)
+        pdf.drawString(MARGIN, MARGIN / 2, f"Сформировано: {datetime.now().strftime('%d.%m.%Y %H:%M')}")
+        pdf.drawRightString(PAGE_SIZE[0] - MARGIN, MARGIN / 2, f"Стр. {page}")
+        pdf.setFillColor(colors.black)
+
+    @staticmethod
+    def _filters_text(filters: Optional[Dict]) -> str:
+        """Описание примененных фильтров."""
+        if not filters:
+            return ""
+        applied = [f"{k}: {v}" for k, v in filters.items() if v]
+        return "Примененные фильтры: " + ", ".join(applied) if applied else ""
+
+    def _build_table(self, chunk: List[PreparedRow], previous_total: float, is_last: bool) -> Table:
+        """Таблица страницы: заголовок столбцов, строки, итог страницы и (в конце) общий итог."""
+        table_data: List[List[Any]] = [HEADERS]
+        page_total = 0.0
+        for row in chunk:
+            page_total += row.amount
+            table_data.append(row.cells)
+        table_data.append(["", "", "", "Итого по странице", format_amount(page_total), ""])
+        if is_last:
+            table_data.append(["", "", "", "Итого по отчету", format_amount(previous_total + page_total), ""])
+
+        summary_rows = 2 if is_last else 1
+        table = Table(table_data, colWidths=COLUMN_WIDTHS)
         table.setStyle(TableStyle([
             ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
             ("TEXTCOLOR", (0, 0), (-1, 0), colors.black),
             ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+            ("ALIGN", (4, 1), (4, -1), "RIGHT"),
+            ("FONTNAME", (0, 0), (-1, -1), self.font),
+            ("FONTNAME", (0, 0), (-1, 0), self.bold_font),
+            ("FONTNAME", (0, -summary_rows), (-1, -1), self.bold_font),
+            ("FONTSIZE", (0, 0), (-1, -1), 8),
             ("FONTSIZE", (0, 0), (-1, 0), 10),
-            ("BOTTOMPADDING", (0, 0), (-1, 0), 12),
-            ("GRID", (0, 0), (-1, -1), 1, colors.black),
+            ("BOTTOMPADDING", (0, 0), (-1, 0), 8),
+            ("GRID", (0, 0), (-1, -summary_rows - 1), 0.5, colors.black),
+            ("BOX", (3, -summary_rows), (4, -1), 0.5, colors.black),
             ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
         ]))
-        elements.append(table)
-
-    def _add_footer(self, elements: List) -> None:
-        """Добавление подвала отчета."""
-        footer_text = Paragraph(
-            f"Сформировано: {datetime.now().strftime('%d.%m.%Y %H:%M')}",
-            self.styles["Footer"]
-        )
-        elements.append(Spacer(1, 1 * cm))
-        elements.append(footer_text)
+        return table
 
     def _get_output_path(self, filename: Optional[str]) -> Path:
         """Генерация пути для сохранения файла."""
         if filename:
             return self._output_dir / filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        return self._output_dir / f"report_{timestamp}.pdf"
\ No newline at end of file
+        return unique_output_path(self._output_dir, "report", ".pdf")
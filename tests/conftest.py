@@ -0,0 +1,34 @@
+import pytest
+from db.database import Database
+from db.seed import seed_wide_orders
+
+TEST_DB_PATH = "test_work_orders.db"
+
+
+@pytest.fixture(scope="function")
+def test_db(tmp_path):
+    """Фикстура для создания и удаления тестовой БД (свой файл у каждого теста)."""
+    db = Database(tmp_path / TEST_DB_PATH)
+
+    # Схема создается миграциями при открытии БД; здесь только тестовая запись
+    db.execute_query(
+        "INSERT INTO employees (employee_id, full_name, workshop_number, position) VALUES (?, ?, ?, ?)",
+        ("dummy", "Тест", 0, "Тест")
+    )
+
+    # Закрываем соединения, чтобы файл разблокировался
+    db.close()
+
+    yield db
+
+    db.close()
+
+
+@pytest.fixture
+def seed_orders(test_db):
+    """Наполняет тестовую БД однотипными нарядами (вместо записи-заглушки в employees)."""
+    def seed(orders: int, workers: int, works: int) -> Database:
+        test_db.execute_query("DELETE FROM employees")
+        seed_wide_orders(test_db, orders=orders, workers=workers, works=works)
+        return test_db
+    return seed
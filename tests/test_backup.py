@@ -0,0 +1,158 @@
+import shutil
+import sqlite3
+
+from pathlib import Path
+from db.backup import BackupManager, check_backup
+
+
+def test_backup_manager(test_db, tmp_path):
+    """Проверка создания резервных копий."""
+    # Проверка существования файла БД
+    assert Path(test_db.db_path).exists(), "Файл БД не создан!"
+
+    # Создание BackupManager
+    manager = BackupManager(str(test_db.db_path), backup_dir=str(tmp_path / "test_backups"), max_backups=2)
+    backup_path = manager.create_backup()
+
+    # Проверки
+    assert backup_path is not None, "Резервная копия не создана."
+    assert Path(backup_path).exists(), "Файл резервной копии отсутствует."
+
+
+def test_online_backup(test_db, tmp_path):
+    """Копия через backup API согласована и снимается в фоне с прогрессом."""
+    test_db.execute_many(
+        "INSERT INTO employees (employee_id, full_name, workshop_number, position) VALUES (?, ?, ?, ?)",
+        ((f"{i:05d}", f"Работник {i}", 1, "Сборщик") for i in range(3000))
+    )
+    # Незафиксированные изменения не попадают в копию
+    manager = BackupManager(str(test_db.db_path), backup_dir=str(tmp_path / "backups"), pages_per_step=5)
+    steps = []
+    done = []
+    with test_db.transaction():
+        test_db.execute_query("DELETE FROM employees")
+        thread = manager.create_backup_async(progress=lambda copied, total: steps.append((copied, total)),
+                                             on_done=done.append)
+        thread.join()
+
+    assert done[0] is not None and not list(Path(tmp_path / "backups").glob("*.part"))
+    assert len(steps) > 1 and steps[-1][0] == steps[-1][1]
+    conn = sqlite3.connect(done[0])
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM employees").fetchone()[0] == 3001
+        assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    finally:
+        conn.close()
+
+    compact_path = manager.create_backup(compact=True)
+    conn = sqlite3.connect(compact_path)
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM employees").fetchone()[0] == 0
+    finally:
+        conn.close()
+
+
+def test_incremental_backup_store(test_db, tmp_path):
+    """Повторная копия записывает только измененные блоки, восстановление точное."""
+    from db.backup_store import ChunkStore
+
+    test_db.execute_many(
+        "INSERT INTO employees (employee_id, full_name, workshop_number, position) VALUES (?, ?, ?, ?)",
+        ((f"{i:05d}", f"Работник {i}" * 5, 1, "Сборщик") for i in range(5000))
+    )
+    manager = BackupManager(str(test_db.db_path), backup_dir=str(tmp_path / "backups"), max_backups=2)
+    store = ChunkStore(tmp_path / "backups" / "store", chunk_size=16 * 1024)
+    first = store.add(_snapshot(manager, tmp_path / "s1.db"))
+    assert first.new_chunks == first.chunks > 4
+
+    # Без изменений новая копия не создается
+    assert store.add(_snapshot(manager, tmp_path / "s2.db")).manifest == first.manifest
+
+    test_db.execute_query("UPDATE employees SET position = ? WHERE employee_id = ?", ("Токарь", "00010"))
+    second = store.add(_snapshot(manager, tmp_path / "s3.db"))
+    assert second.manifest != first.manifest
+    assert 0 < second.new_chunks < second.chunks // 2
+    assert store.verify() == []
+
+    restored = store.restore(second.manifest, tmp_path / "restored.db")
+    conn = sqlite3.connect(restored)
+    try:
+        assert conn.execute("SELECT position FROM employees WHERE employee_id = '00010'").fetchone()[0] == "Токарь"
+    finally:
+        conn.close()
+
+    # Поврежденный блок обнаруживается проверкой
+    chunk = next((tmp_path / "backups" / "store" / "chunks").glob("*/*"))
+    chunk.write_bytes(b"broken")
+    assert store.verify()
+
+    # Через BackupManager: манифест в backup_dir/store, старые копии удаляются
+    for position in ("Маляр", "Сварщик", "Слесарь"):
+        test_db.execute_query("UPDATE employees SET position = ? WHERE employee_id = '00001'", (position,))
+        assert manager.create_incremental_backup() is not None
+    assert len(ChunkStore(tmp_path / "backups" / "store").manifests()) == 2
+
+
+def _snapshot(manager, path):
+    manager._copy_online(path, None)
+    return path
+
+
+def test_compressed_backups_and_verify(test_db, tmp_path):
+    """Сжатые копии ротируются по индексу и проверяются в параллельных процессах."""
+    test_db.execute_many(
+        "INSERT INTO employees (employee_id, full_name, workshop_number, position) VALUES (?, ?, ?, ?)",
+        ((f"{i:05d}", f"Работник {i}", 1, "Сборщик") for i in range(2000))
+    )
+    backup_dir = tmp_path / "backups"
+    paths = []
+    for compression in ("lzma", "gzip", None, "lzma"):
+        manager = BackupManager(str(test_db.db_path), backup_dir=str(backup_dir), max_backups=3,
+                                compression=compression)
+        paths.append(Path(manager.create_backup()))
+    assert paths[0].name.endswith(".db.xz") and paths[1].name.endswith(".db.gz")
+    assert paths[3].stat().st_size < paths[2].stat().st_size / 2
+
+    # Самая старая копия удалена по индексу
+    assert not paths[0].exists()
+    assert manager.list_backups() == paths[1:]
+
+    paths[1].write_bytes(paths[1].read_bytes()[:200])
+    results = manager.verify_backups(workers=2)
+    assert results[str(paths[2])] == "ok" and results[str(paths[3])] == "ok"
+    assert results[str(paths[1])] != "ok"
+
+    # Символы, значимые в URI, в пути каталога копий не мешают проверке
+    odd_dir = tmp_path / "копии #1 100%"
+    odd_dir.mkdir()
+    odd_copy = odd_dir / paths[2].name
+    shutil.copy2(paths[2], odd_copy)
+    assert check_backup(str(odd_copy)) == (str(odd_copy), "ok")
+    odd_copy.write_bytes(odd_copy.read_bytes()[:200])
+    assert check_backup(str(odd_copy))[1] != "ok"
+    assert [p.name for p in tmp_path.iterdir() if p.name.startswith("копии")] == [odd_dir.name]
+
+
+def test_concurrent_incremental_backups(test_db, tmp_path):
+    """Параллельные инкрементные копии в один каталог не мешают друг другу."""
+    import threading
+    from db.backup_store import ChunkStore
+
+    test_db.execute_many(
+        "INSERT INTO employees (employee_id, full_name, workshop_number, position) VALUES (?, ?, ?, ?)",
+        ((f"{i:05d}", f"Работник {i}" * 5, 1, "Сборщик") for i in range(3000))
+    )
+    backup_dir = tmp_path / "backups"
+    managers = [BackupManager(str(test_db.db_path), backup_dir=str(backup_dir), max_backups=1, pages_per_step=4)
+                for _ in range(4)]
+    results = []
+    threads = [threading.Thread(target=lambda m=m: results.append(m.create_incremental_backup())) for m in managers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 4 and None not in results
+    store = ChunkStore(backup_dir / "store")
+    assert len(store.manifests()) == 1 and store.verify() == []
+    assert not list(backup_dir.glob("*.part"))
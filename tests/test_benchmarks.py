@@ -0,0 +1,58 @@
+def test_synthetic_dataset(test_db):
+    """Генератор заполняет все таблицы согласованными данными."""
+    from benchmarks.dataset import generate_dataset
+
+    test_db.execute_query("DELETE FROM employees")
+    counts = generate_dataset(test_db, "tiny", seed=7)
+
+    for table, count in counts.items():
+        assert test_db.execute_query(f"SELECT COUNT(*) FROM {table}")[0][0] == count
+    assert counts["work_orders"] == 1000
+    assert counts["order_workers"] > counts["work_orders"]
+
+    # Итоги нарядов совпадают с суммой строк работ
+    mismatches = test_db.execute_query("""
+        SELECT COUNT(*) FROM work_orders wo
+        JOIN order_summary s ON s.order_id = wo.id
+        WHERE ABS(wo.total_amount - s.total_amount) > 0.01
+    """)
+    assert mismatches[0][0] == 0
+
+
+def test_benchmark_regression_check(tmp_path):
+    """Бенчмарки выполняются на копии данных, замедление сверх допуска выявляется."""
+    from benchmarks.run import (
+        BENCHMARKS, BenchmarkResult, find_missing_baselines, find_regressions, load_baseline,
+        run_benchmarks, save_baseline
+    )
+
+    results = run_benchmarks(["tiny"], ["order_save", "backup"], repeat=1, data_dir=tmp_path / "data")
+    assert all(result.seconds is not None for result in results)
+
+    baseline_path = tmp_path / "baselines.json"
+    save_baseline(results, baseline_path)
+    baseline = load_baseline(baseline_path)
+    assert set(baseline["tiny"]) == {"order_save", "backup"}
+    assert find_regressions(results, baseline, tolerance=0.25) == []
+
+    # Вдвое медленнее базового значения - регрессия, в пределах шума - нет
+    slower = [BenchmarkResult("tiny", "order_save", 1.0), BenchmarkResult("tiny", "backup", 0.04)]
+    baseline = {"tiny": {"order_save": 0.5, "backup": 0.01}}
+    regressions = find_regressions(slower, baseline, tolerance=0.25)
+    assert [r.name for r in regressions] == ["order_save"]
+
+    # Замер без базового значения - ошибка; в репозитории базовые значения есть для всех замеров
+    assert find_missing_baselines(slower, {"tiny": {"order_save": 0.5}}) == ["tiny/backup"]
+    committed = load_baseline()
+    assert {preset: set(committed[preset]) for preset in committed} == {
+        preset: set(BENCHMARKS) for preset in ("tiny", "small")
+    }
+
+
+def test_legacy_report_query_fan_out(test_db, seed_orders):
+    """Прежний запрос замера завышает сумму в число рабочих раз (веер строк соединения)."""
+    from benchmarks.bench_report_query import LEGACY_REPORT_QUERY
+
+    seed_orders(orders=3, workers=50, works=50)
+    legacy = test_db.execute_query(LEGACY_REPORT_QUERY)
+    assert legacy[0][4] == 500.0 * 50
@@ -1,59 +1,12 @@
+import logging
 import sqlite3
 
 import pytest
-from pathlib import Path
 from db.database import Database
-from db.backup import BackupManager
-
-TEST_DB_PATH = "test_work_orders.db"
-
-
-@pytest.fixture(scope="function")
-def test_db():
-    """Фикстура для создания и удаления тестовой БД."""
-    db_path = Path(TEST_DB_PATH)
-
-    # Удаление старой БД
-    if db_path.exists():
-        db_path.unlink(missing_ok=True)
-
-    # Создание новой БД
-    db = Database()
-    db.db_path = TEST_DB_PATH
-    db._init_db()  # Создает файл через Path.touch()
-
-    # Явное создание таблиц и данных
-    with db.conn:
-        cursor = db.conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS employees (
-                id INTEGER PRIMARY KEY,
-                employee_id TEXT UNIQUE NOT NULL,
-                full_name TEXT NOT NULL,
-                workshop_number INTEGER NOT NULL,
-                position TEXT NOT NULL
-            )
-        """)
-        cursor.execute(
-            "INSERT INTO employees (employee_id, full_name, workshop_number, position) VALUES (?, ?, ?, ?)",
-            ("dummy", "Тест", 0, "Тест")
-        )
-        db.conn.commit()
-
-    # Закрываем соединение, чтобы файл разблокировался
-    db.conn.close()
-
-    yield db
-
-    # Удаление БД
-    if db_path.exists():
-        db_path.unlink()
 
 
 def test_create_tables(test_db):
     """Проверка создания таблиц."""
-    # Переоткрываем соединение для теста
-    test_db.conn = sqlite3.connect(TEST_DB_PATH)
     test_db.execute_query("DELETE FROM employees")
 
     test_db.execute_query(
@@ -62,23 +15,494 @@ def test_create_tables(test_db):
     )
     result = test_db.execute_query("SELECT * FROM employees")
     assert len(result) == 1, "Данные не добавлены в таблицу."
-    test_db.conn.close()
 
 
-def test_backup_manager(test_db):
-    """Проверка создания резервных копий."""
-    # Проверка существования файла БД
-    assert Path(TEST_DB_PATH).exists(), "Файл БД не создан!"
+def test_thread_connections(test_db):
+    """Фоновый поток получает собственное соединение и видит данные в WAL-режиме."""
+    import threading
+
+    test_db.execute_query(
+        "INSERT INTO employees (employee_id, full_name, workshop_number, position) VALUES (?, ?, ?, ?)",
+        ("002", "Петров Петр", 2, "Слесарь")
+    )
+    results = {}
+
+    def worker():
+        results["rows"] = test_db.execute_query("SELECT employee_id FROM employees ORDER BY employee_id")
+        results["conn"] = test_db.conn
+        results["mode"] = test_db.conn.execute("PRAGMA journal_mode").fetchone()[0]
+        test_db.pool.close_thread_connection()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+
+    assert results["rows"] == [("002",), ("dummy",)]
+    assert results["conn"] is not test_db.conn, "Потоки не должны делить соединение."
+    assert results["mode"] == "wal"
+
+
+def test_execute_many(test_db):
+    """Пакетная вставка выполняется одной транзакцией и возвращает число строк."""
+    rows = ((f"{i:04d}", f"Работник {i}", 1, "Сборщик") for i in range(500))
+    inserted = test_db.execute_many(
+        "INSERT INTO employees (employee_id, full_name, workshop_number, position) VALUES (?, ?, ?, ?)",
+        rows
+    )
+    assert inserted == 500
+
+    # Ошибка в любой строке откатывает всю пачку
+    failed = test_db.execute_many(
+        "INSERT INTO employees (employee_id, full_name, workshop_number, position) VALUES (?, ?, ?, ?)",
+        [("9999", "Новый", 1, "Сборщик"), ("0001", "Дубликат", 1, "Сборщик")]
+    )
+    assert failed is None
+    count = test_db.execute_query("SELECT COUNT(*) FROM employees")
+    assert count[0][0] == 501
+
+
+def test_transaction_unit_of_work(test_db):
+    """Единица работы фиксируется целиком или откатывается целиком."""
+    insert = "INSERT INTO employees (employee_id, full_name, workshop_number, position) VALUES (?, ?, ?, ?)"
+
+    with pytest.raises(sqlite3.IntegrityError):
+        with test_db.transaction():
+            test_db.execute_query(insert, ("100", "Сидоров", 1, "Токарь"))
+            test_db.execute_query(insert, ("dummy", "Дубликат", 1, "Токарь"))
+    assert test_db.execute_query("SELECT COUNT(*) FROM employees")[0][0] == 1
+
+    with test_db.transaction():
+        test_db.execute_query(insert, ("101", "Кузнецов", 1, "Токарь"))
+        # Ошибка во вложенном блоке откатывает только точку сохранения
+        with pytest.raises(sqlite3.IntegrityError):
+            with test_db.transaction():
+                test_db.execute_query(insert, ("102", "Смирнов", 1, "Токарь"))
+                test_db.execute_query(insert, ("101", "Дубликат", 1, "Токарь"))
+        assert test_db.in_transaction
+    assert not test_db.in_transaction
+
+    ids = test_db.execute_query("SELECT employee_id FROM employees ORDER BY employee_id")
+    assert ids == [("101",), ("dummy",)]
+
+
+def test_migrations_apply_indexes(test_db):
+    """Схема доводится до последней версии, проверки удаления идут по индексу."""
+    from db.migrations import MIGRATIONS, get_schema_version
+
+    assert get_schema_version(test_db) == MIGRATIONS[-1].version
+
+    plan = test_db.execute_query(
+        "EXPLAIN QUERY PLAN SELECT COUNT(*) FROM order_work_types WHERE work_type_id = ?", (1,)
+    )
+    assert any("USING COVERING INDEX idx_order_work_types_work_type" in row[-1] for row in plan)
+
+    plan = test_db.execute_query(
+        "EXPLAIN QUERY PLAN SELECT COUNT(*) FROM order_workers WHERE worker_id = ?", (1,)
+    )
+    assert any("USING COVERING INDEX idx_order_workers_worker" in row[-1] for row in plan)
+
+
+def test_migrations_upgrade_existing_database(tmp_path):
+    """Существующая БД без версии схемы переводится вперед при открытии."""
+    from db.migrations import MIGRATIONS
+
+    legacy_path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(legacy_path)
+    conn.execute("""CREATE TABLE order_workers (
+        order_id INTEGER NOT NULL,
+        worker_id INTEGER NOT NULL,
+        PRIMARY KEY(order_id, worker_id)
+    )""")
+    conn.commit()
+    conn.close()
+
+    db = Database(legacy_path)
+    try:
+        assert db.execute_query("PRAGMA user_version")[0][0] == MIGRATIONS[-1].version
+        indexes = {row[0] for row in db.execute_query(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'order_workers'"
+        )}
+        assert "idx_order_workers_worker" in indexes
+    finally:
+        db.close()
+
+
+def test_failed_migration_is_raised(tmp_path, monkeypatch):
+    """Ошибка миграции не скрывается: версия схемы остается последней успешной."""
+    import db.migrations as migrations
+
+    path = tmp_path / "broken.db"
+    last = migrations.MIGRATIONS[-1].version
+    monkeypatch.setattr(migrations, "MIGRATIONS", migrations.MIGRATIONS + [
+        migrations.Migration(last + 1, "Ошибочная миграция", ("CREATE TABLE employees (id INTEGER)",))
+    ])
+    with pytest.raises(sqlite3.OperationalError):
+        Database(path)
+
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == last
+    finally:
+        conn.close()
+
+
+def test_order_dates_migrated_to_iso(tmp_path):
+    """Даты ДД.ММ.ГГГГ переводятся в ISO, отбор по периоду идет по индексу."""
+    from utils.dates import from_db_date, to_db_date
+
+    legacy_path = tmp_path / "legacy_dates.db"
+    conn = sqlite3.connect(legacy_path)
+    conn.execute("""CREATE TABLE work_orders (
+        id INTEGER PRIMARY KEY,
+        order_date TEXT NOT NULL,
+        product_id INTEGER NOT NULL,
+        contract_id INTEGER NOT NULL,
+        total_amount REAL NOT NULL
+    )""")
+    conn.executemany(
+        "INSERT INTO work_orders (order_date, product_id, contract_id, total_amount) VALUES (?, 1, 1, 0)",
+        [("31.01.2024",), ("01.02.2024",), ("15.12.2023",)]
+    )
+    conn.commit()
+    conn.close()
+
+    db = Database(legacy_path)
+    try:
+        rows = db.execute_query(
+            "SELECT order_date FROM work_orders WHERE order_date BETWEEN ? AND ? ORDER BY order_date",
+            (to_db_date("01.01.2024"), to_db_date("31.01.2024"))
+        )
+        assert rows == [("2024-01-31",)]
+        assert from_db_date(rows[0][0]) == "31.01.2024"
+
+        plan = db.execute_query(
+            "EXPLAIN QUERY PLAN SELECT id FROM work_orders WHERE order_date BETWEEN ? AND ?",
+            ("2024-01-01", "2024-01-31")
+        )
+        assert any("idx_orders_date" in row[-1] for row in plan)
+    finally:
+        db.close()
+
+
+def test_order_summary_triggers(test_db, seed_orders):
+    """Итоги наряда пересчитываются триггерами при любой записи."""
+
+    seed_orders(orders=2, workers=3, works=4)
+
+    def summary(order_id):
+        return test_db.execute_query(
+            "SELECT total_amount, worker_count, workers FROM order_summary WHERE order_id = ?",
+            (order_id,)
+        )[0]
+
+    assert summary(1) == (40.0, 3, "Работник 1, Работник 2, Работник 3")
+
+    test_db.execute_query("UPDATE order_work_types SET amount = 25 WHERE order_id = 1 AND work_type_id = 1")
+    test_db.execute_query("DELETE FROM order_work_types WHERE order_id = 1 AND work_type_id = 2")
+    test_db.execute_query("DELETE FROM order_workers WHERE order_id = 1 AND worker_id = 2")
+    test_db.execute_query("UPDATE employees SET full_name = 'Иванов' WHERE id = 3")
+    assert summary(1) == (45.0, 2, "Работник 1, Иванов")
+    assert summary(2) == (40.0, 3, "Работник 1, Работник 2, Иванов")
+
+    with test_db.transaction():
+        test_db.execute_query("DELETE FROM order_workers WHERE order_id = 2")
+        test_db.execute_query("DELETE FROM order_work_types WHERE order_id = 2")
+        test_db.execute_query("DELETE FROM work_orders WHERE id = 2")
+    assert test_db.execute_query("SELECT order_id FROM order_summary") == [(1,)]
+
+
+def test_streaming_and_keyset_pages(test_db):
+    """Потоковое чтение и страницы по ключу возвращают всю выборку по порядку."""
+    test_db.execute_many(
+        "INSERT INTO employees (employee_id, full_name, workshop_number, position) VALUES (?, ?, 1, 'Сборщик')",
+        ((f"{i:04d}", f"Работник {i}") for i in range(250))
+    )
+    query = "SELECT employee_id, full_name FROM employees"
+
+    streamed = list(test_db.iter_query(query + " ORDER BY employee_id", batch_size=32))
+    assert len(streamed) == 251
+
+    first = test_db.fetch_page(query, key="employee_id", limit=100)
+    second = test_db.fetch_page(query, key="employee_id", after=first[-1][0], limit=100)
+    assert [row[0] for row in first[:2]] == ["0000", "0001"]
+    assert second[0][0] == "0100"
+
+    pages = list(test_db.iter_pages(query, key="employee_id", page_size=100))
+    assert [len(page) for page in pages] == [100, 100, 51]
+    assert [row for page in pages for row in page] == streamed
+
+    with pytest.raises(ValueError):
+        test_db.fetch_page(query, key="employee_id; DROP TABLE employees")
+    with pytest.raises(ValueError):
+        next(test_db.iter_pages(query, key="1 OR 1=1"))
+
+    # Псевдоним таблицы вне подзапроса не виден: ключ сводится к имени столбца
+    aliased = "SELECT e.employee_id, e.full_name FROM employees e"
+    assert test_db.fetch_page(aliased, key="e.employee_id", after="0099", limit=2) == second[:2]
+    with pytest.raises(sqlite3.OperationalError):
+        test_db.fetch_page(query, key="missing_column")
+
+
+def test_read_only_cte_detection(test_db):
+    """Запрос WITH считается чтением, если операторы записи встречаются лишь в именах и литералах."""
+    reads = [
+        "WITH x AS (SELECT 1 AS last_update) SELECT * FROM x",
+        "WITH x AS (SELECT replace('a', 'a', 'b') AS deleted_at, 'insert' AS \"update\") SELECT * FROM x",
+    ]
+    for query in reads:
+        assert Database._is_read_only(query), query
+    assert test_db.execute_query(reads[0]) == [(1,)]
+
+    writes = [
+        "WITH x AS (SELECT 1) DELETE FROM employees WHERE id IN x",
+        "WITH x AS (SELECT 1) INSERT OR REPLACE INTO employees (id) SELECT * FROM x",
+        "WITH x AS (SELECT 1) REPLACE INTO employees (id) SELECT * FROM x",
+        "with x as (select 1) update employees set position = 'a'",
+    ]
+    for query in writes:
+        assert not Database._is_read_only(query), query
+
+
+def test_reference_query_cache(test_db):
+    """Повторное чтение справочника идет из кэша до записи в таблицу."""
+    query = "SELECT employee_id FROM employees ORDER BY employee_id"
+    cache = test_db.cache
+
+    assert test_db.execute_query(query) == [("dummy",)]
+    hits = cache.hits
+    assert test_db.execute_query(query) == [("dummy",)]
+    assert cache.hits == hits + 1
+
+    test_db.execute_query(
+        "INSERT INTO employees (employee_id, full_name, workshop_number, position) VALUES (?, ?, ?, ?)",
+        ("001", "Иванов Иван", 1, "Инженер")
+    )
+    assert test_db.execute_query(query) == [("001",), ("dummy",)]
+
+    # Запись напрямую через соединение транзакции сбрасывает кэш целиком
+    with test_db.transaction() as conn:
+        conn.execute("DELETE FROM employees WHERE employee_id = '001'")
+    assert test_db.execute_query(query) == [("dummy",)]
+
+    # Запись другого соединения (другой процесс или экземпляр Database) видна без ожидания
+    other = sqlite3.connect(test_db.db_path)
+    with other:
+        other.execute("UPDATE employees SET employee_id = 'changed' WHERE employee_id = 'dummy'")
+    other.close()
+    assert test_db.execute_query(query) == [("changed",)]
+    hits = cache.hits
+    assert test_db.execute_query(query) == [("changed",)]
+    assert cache.hits == hits + 1
+
+    # Отчетные таблицы не кэшируются
+    misses = cache.misses
+    test_db.execute_query("SELECT COUNT(*) FROM work_orders")
+    test_db.execute_query("SELECT COUNT(*) FROM work_orders")
+    assert cache.misses == misses
+
+
+def test_profiler_env_settings(monkeypatch, caplog):
+    """Некорректный порог в окружении не роняет импорт, EXPLAIN включается переменной."""
+    import importlib
+    import db.profiler as profiler_module
+
+    monkeypatch.setenv("NARYAD_SLOW_QUERY_MS", "fast")
+    monkeypatch.setenv("NARYAD_EXPLAIN_SLOW", "yes")
+    try:
+        with caplog.at_level(logging.WARNING, logger="db.profiler"):
+            module = importlib.reload(profiler_module)
+        assert module.DEFAULT_SLOW_THRESHOLD_MS == module.FALLBACK_SLOW_THRESHOLD_MS
+        assert "NARYAD_SLOW_QUERY_MS" in caplog.text
+        profiler = module.QueryProfiler()
+        assert profiler.explain_slow is True
+        assert profiler.slow_threshold_ms == 200.0
+
+        monkeypatch.setenv("NARYAD_SLOW_QUERY_MS", "50.5")
+        monkeypatch.setenv("NARYAD_EXPLAIN_SLOW", "0")
+        module = importlib.reload(profiler_module)
+        assert module.DEFAULT_SLOW_THRESHOLD_MS == 50.5
+        assert module.QueryProfiler().explain_slow is False
+    finally:
+        monkeypatch.delenv("NARYAD_SLOW_QUERY_MS")
+        monkeypatch.delenv("NARYAD_EXPLAIN_SLOW")
+        importlib.reload(profiler_module)
+
+
+def test_query_profiler(test_db, tmp_path, caplog):
+    """Запросы учитываются по шаблону, медленные попадают в отдельный журнал."""
+    import json
+    import logging
+    from db.profiler import normalize_sql
+
+    profiler = test_db.profiler
+    profiler.reset()
+    for i in range(3):
+        test_db.execute_query("SELECT COUNT(*) FROM work_orders WHERE id > ?", (i,))
+    test_db.execute_query("SELECT id FROM work_orders WHERE id IN (1, 2, 3)")
+
+    summary = {item["query"]: item for item in profiler.summary()}
+    stats = summary[normalize_sql("SELECT COUNT(*) FROM work_orders WHERE id > ?")]
+    assert stats["count"] == 3
+    assert stats["rows"] == 3
+    assert stats["max_ms"] >= stats["p95_ms"] >= stats["p50_ms"] >= 0
+    assert "SELECT id FROM work_orders WHERE id IN (?)" in summary
+
+    threshold = profiler.slow_threshold_ms
+    profiler.slow_threshold_ms = 0
+    profiler.explain_slow = True
+    try:
+        with caplog.at_level(logging.WARNING, logger="db.slow_queries"):
+            test_db.execute_query("SELECT COUNT(*) FROM work_orders WHERE order_date > ?", ("2024-01-01",))
+    finally:
+        profiler.slow_threshold_ms = threshold
+        profiler.explain_slow = False
+    assert any("idx_orders_date" in record.getMessage() for record in caplog.records)
+
+    dump_path = profiler.dump(tmp_path / "query_stats.json")
+    data = json.loads(dump_path.read_text(encoding="utf-8"))
+    assert data["statements"]
+
+
+def test_query_plan_audit(test_db, seed_orders):
+    """Горячие запросы приложения используют индексы, а не полный скан."""
+    from db.query_audit import AuditedQuery, audit, format_report, run
+
+    seed_orders(orders=20, workers=5, works=5)
+
+    ok, report = run(test_db)
+    assert ok, report
+
+    # Без индекса по внешнему ключу проверка перед удалением становится сканом
+    test_db.execute_query("DROP INDEX idx_order_work_types_work_type")
+    results = audit(test_db, [AuditedQuery(
+        "WORK_TYPE_USAGE_COUNT", "SELECT COUNT(*) FROM order_work_types WHERE work_type_id = ?", hot=True
+    )])
+    assert results[0].failed
+    assert "order_work_types" in format_report(results)
+
+
+def test_query_plan_audit_read_only(tmp_path):
+    """Файл БД проверяется только для чтения: старая схема не мигрируется."""
+    from db.query_audit import run_read_only
+
+    path = tmp_path / "old.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE employees (id INTEGER PRIMARY KEY, employee_id TEXT)")
+    conn.commit()
+    conn.close()
+    content = path.read_bytes()
+
+    ok, report = run_read_only(path)
+    assert not ok and "no such table" in report
+    assert path.read_bytes() == content
+    with pytest.raises(FileNotFoundError):
+        run_read_only(tmp_path / "missing.db")
+
+
+def test_independent_memory_databases():
+    """Экземпляры независимы; БД в памяти общая для потоков и переживает close()."""
+    import threading
+
+    insert = "INSERT INTO employees (employee_id, full_name, workshop_number, position) VALUES (?, ?, ?, ?)"
+    first, second = Database(":memory:"), Database(":memory:")
+    assert first.is_memory and first is not second
+
+    first.execute_query(insert, ("001", "Иванов", 1, "Токарь"))
+    assert second.execute_query("SELECT COUNT(*) FROM employees")[0][0] == 0
+
+    results = {}
+    thread = threading.Thread(target=lambda: results.update(
+        rows=first.execute_query("SELECT employee_id FROM employees")
+    ))
+    thread.start()
+    thread.join()
+    assert results["rows"] == [("001",)]
+
+    first.close()
+    assert first.execute_query("SELECT COUNT(*) FROM employees")[0][0] == 1
+
+
+def test_shared_cache_memory_uri():
+    """URI общего кэша в памяти распознается как БД в памяти и переживает close()."""
+    db = Database("file::memory:?cache=shared")
+    try:
+        assert db.is_memory and db.db_path == "file::memory:?cache=shared"
+        db.execute_query(
+            "INSERT INTO employees (employee_id, full_name, workshop_number, position) VALUES (?, ?, ?, ?)",
+            ("001", "Иванов", 1, "Токарь")
+        )
+        db.close()
+        assert db.execute_query("SELECT COUNT(*) FROM employees")[0][0] == 1
+    finally:
+        db.pool.shutdown()
+
+
+def test_shared_cache_file_uri_uses_wal(tmp_path):
+    """Файл на диске с общим кэшем - не БД в памяти: WAL и параллельное чтение сохраняются."""
+    from db.connection import is_memory_path
+
+    db = Database(f"file:{tmp_path / 'shared.db'}?cache=shared")
+    try:
+        assert not db.is_memory
+        assert db.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert db.conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+    finally:
+        db.pool.shutdown()
+    assert is_memory_path("file:naryad?mode=memory&cache=shared") and is_memory_path("file::memory:")
+
+
+def test_memory_database_concurrent_read_write():
+    """В памяти запись не падает с "table is locked", пока другие потоки читают потоком."""
+    import threading
+
+    db = Database(":memory:")
+    insert = "INSERT INTO employees (employee_id, full_name, workshop_number, position) VALUES (?, ?, 1, 'Токарь')"
+    db.execute_many(insert, ((f"R{i:04d}", f"Работник {i}") for i in range(500)))
+    errors = []
+
+    def read():
+        try:
+            for _ in range(5):
+                assert sum(1 for _ in db.iter_query("SELECT * FROM employees", batch_size=50)) >= 500
+        except Exception as e:
+            errors.append(e)
+
+    def write():
+        try:
+            for i in range(50):
+                with db.transaction() as conn:
+                    conn.execute(insert, (f"W{i:04d}", f"Новый {i}"))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=read) for _ in range(3)] + [threading.Thread(target=write)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    try:
+        assert errors == []
+        assert db.execute_query("SELECT COUNT(*) FROM employees")[0][0] == 550
+    finally:
+        db.pool.shutdown()
+
+
+def test_counted_query_single_snapshot(test_db):
+    """Счетчик и строки читаются из одного снимка: запись другого потока их не разводит."""
+    import threading
 
-    # Создание BackupManager
-    manager = BackupManager(TEST_DB_PATH, backup_dir="test_backups", max_backups=2)
-    backup_path = manager.create_backup()
+    insert = "INSERT INTO employees (employee_id, full_name, workshop_number, position) VALUES (?, ?, 1, 'Токарь')"
+    test_db.execute_many(insert, ((f"{i:03d}", f"Работник {i}") for i in range(20)))
+    query = "SELECT employee_id FROM employees"
 
-    # Проверки
-    assert backup_path is not None, "Резервная копия не создана."
-    assert Path(backup_path).exists(), "Файл резервной копии отсутствует."
+    with test_db.counted_query(query, batch_size=5) as (total, rows):
+        writer = threading.Thread(target=test_db.execute_query, args=(insert, ("999", "Новый")))
+        writer.start()
+        writer.join()
+        streamed = list(rows)
+    assert total == len(streamed) == 21
+    assert test_db.execute_query("SELECT COUNT(*) FROM employees")[0][0] == 22
 
-    # Очистка
-    for file in Path("test_backups").glob("*.db"):
-        file.unlink()
-    Path("test_backups").rmdir()
\ No newline at end of file
+    with pytest.raises(sqlite3.Error):
+        with test_db.counted_query("SELECT nope FROM employees"):
+            pass
@@ -0,0 +1,103 @@
+from pathlib import Path
+
+
+def test_report_job_queue(test_db, seed_orders, tmp_path, monkeypatch):
+    """Отчеты формируются в фоне с прогрессом; отмена прерывает выполняемое задание и снимает ожидающее."""
+    import threading
+    import reports.html_report as html_report
+    from reports.jobs import CANCELLED, DONE, ReportJobQueue
+
+    seed_orders(orders=6, workers=1, works=1)
+    monkeypatch.setattr(html_report, "STREAM_BATCH_SIZE", 2)
+    generator = html_report.HTMLReportGenerator(test_db, output_dir=tmp_path)
+    queue = ReportJobQueue(max_workers=1)
+    try:
+        done_id = queue.submit("HTML", lambda progress: generator.generate(filename="done", progress=progress))
+
+        started, release = threading.Event(), threading.Event()
+
+        def blocking_report(progress):
+            def wait_after_first_batch(written, total):
+                started.set()
+                release.wait(5)
+                progress(written, total)
+            return generator.generate(filename="cancelled", progress=wait_after_first_batch)
+
+        cancelled_id = queue.submit("HTML", blocking_report)
+        pending_id = queue.submit("HTML", lambda progress: generator.generate(filename="pending"))
+        assert started.wait(5)
+        assert queue.cancel(pending_id) and queue.cancel(cancelled_id)
+        release.set()
+    finally:
+        queue.shutdown(cancel=False)
+
+    states = {state.job_id: state for state in queue.snapshot()}
+    assert states[done_id].status == DONE and (states[done_id].done, states[done_id].total) == (6, 6)
+    assert Path(states[done_id].result).exists()
+    assert states[cancelled_id].status == CANCELLED and not (tmp_path / "cancelled.html").exists()
+    assert states[pending_id].status == CANCELLED and not (tmp_path / "pending.html").exists()
+    assert not queue.has_active() and not queue.cancel(done_id)
+
+
+def test_cancelled_job_result_removed(tmp_path):
+    """Отмена, пришедшая после записи файла, не оставляет результат на диске."""
+    import threading
+    from reports.jobs import CANCELLED, ReportJobQueue
+
+    written, release = threading.Event(), threading.Event()
+
+    def report(progress):
+        path = tmp_path / "late.xlsx"
+        path.write_bytes(b"data")
+        written.set()
+        release.wait(5)
+        return str(path)
+
+    queue = ReportJobQueue(max_workers=1)
+    try:
+        job_id = queue.submit("Excel", report)
+        assert written.wait(5) and queue.cancel(job_id)
+        release.set()
+    finally:
+        queue.shutdown(cancel=False)
+
+    state = queue.snapshot()[0]
+    assert state.status == CANCELLED and state.result is None
+    assert not (tmp_path / "late.xlsx").exists()
+
+
+def test_same_type_jobs_get_separate_files(test_db, seed_orders, tmp_path):
+    """Два отчета одного типа, запущенные подряд, пишут разные файлы; отмена одного не трогает другой."""
+    import threading
+    import time
+    from reports.html_report import HTMLReportGenerator
+    from reports.jobs import CANCELLED, DONE, ReportJobQueue
+
+    seed_orders(orders=3, workers=1, works=1)
+    generator = HTMLReportGenerator(test_db, output_dir=tmp_path)
+    started, release = threading.Event(), threading.Event()
+
+    def blocking_report(progress):
+        def wait_for_release(written, total):
+            started.set()
+            release.wait(5)
+            progress(written, total)
+        return generator.generate(progress=wait_for_release)
+
+    queue = ReportJobQueue(max_workers=2)
+    try:
+        first_id = queue.submit("HTML", lambda progress: generator.generate(progress=progress))
+        second_id = queue.submit("HTML", blocking_report)
+        assert started.wait(5)
+        deadline = time.monotonic() + 5
+        while not queue.snapshot()[0].finished and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert queue.cancel(second_id)
+        release.set()
+    finally:
+        queue.shutdown(cancel=False)
+
+    states = {state.job_id: state for state in queue.snapshot()}
+    assert states[first_id].status == DONE and Path(states[first_id].result).exists()
+    assert states[second_id].status == CANCELLED
+    assert [path.name for path in tmp_path.glob("*.html")] == [Path(states[first_id].result).name]
@@ -0,0 +1,244 @@
+import pytest
+from pathlib import Path
+
+
+def test_report_query_without_fan_out(test_db, seed_orders):
+    """Сумма и список рабочих наряда 50x50 не размножаются соединением."""
+    from db.queries import REPORT_BASE_QUERY, build_report_query
+
+    seed_orders(orders=3, workers=50, works=50)
+
+    rows = test_db.execute_query(REPORT_BASE_QUERY)
+    assert len(rows) == 3
+    for row in rows:
+        assert row[4] == 500.0
+        assert len(row[5].split(", ")) == 50
+
+    filtered = test_db.execute_query(build_report_query(["wo.id = ?"]), (2,))
+    assert [row[0] for row in filtered] == [2]
+
+
+def test_report_filters_compiled_to_sql(test_db, seed_orders, tmp_path):
+    """Фильтры отчета становятся условиями WHERE и отбираются по индексам."""
+    from db.queries import build_report_query, compile_report_filters, report_query
+
+    clauses, params = compile_report_filters({
+        "contract_code": ["C1", "C2"],
+        "order_date": {"start": "2024-01-01", "end": "2024-01-31"},
+        "product": "Изделие",
+        "unknown": 1,
+    })
+    assert clauses == ["c.contract_code IN (?, ?)", "wo.order_date >= ?", "wo.order_date <= ?", "p.name = ?"]
+    assert params == ["C1", "C2", "2024-01-01", "2024-01-31", "Изделие"]
+    assert compile_report_filters({"order_id": []}) == (["0"], [])
+    assert report_query({"order_id": [1]}) == (build_report_query(["wo.id IN (?)"]), (1,))
+    assert report_query(None) == (build_report_query(), ())
+    assert compile_report_filters({"order_date": {"start": "01.03.2024"}}) == (["wo.order_date >= ?"], ["2024-03-01"])
+    for invalid in ({"start": "31.03.2024", "end": "01.03.2024"}, {"start": "32.01.2024"}):
+        with pytest.raises(ValueError):
+            compile_report_filters({"order_date": invalid})
+
+    seed_orders(orders=10, workers=2, works=2)
+    clauses, params = compile_report_filters({"order_id": {"start": 3, "end": 5}})
+    rows = test_db.execute_query(build_report_query(clauses), tuple(params))
+    assert [row[0] for row in rows] == [3, 4, 5]
+
+    plan = test_db.execute_query(
+        "EXPLAIN QUERY PLAN " + build_report_query(
+            compile_report_filters({"order_date": {"start": "01.01.2024", "end": "07.01.2024"}})[0]
+        ),
+        ("2024-01-01", "2024-01-07")
+    )
+    assert any("idx_orders_date" in row[-1] for row in plan)
+
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("openpyxl")
+    from reports.excel_report import ExcelReportGenerator
+
+    generator = ExcelReportGenerator(test_db, output_dir=tmp_path)
+    path = generator.generate(filters={"order_id": [1, 2]})
+    assert pd.read_excel(path)["order_date"].tolist() == ["01.03.2024"] * 2
+    assert generator.generate(filters={"order_id": [999]}) is None
+
+
+def test_streaming_excel_report(test_db, seed_orders, tmp_path):
+    """Потоковая выгрузка переносит строки на новый лист и сообщает прогресс."""
+    pytest.importorskip("pandas")
+    openpyxl = pytest.importorskip("openpyxl")
+    from reports.excel_report import ExcelReportGenerator
+
+    seed_orders(orders=25, workers=2, works=2)
+    progress = []
+    path = ExcelReportGenerator(test_db, output_dir=tmp_path).generate_streaming(
+        progress=lambda written, total: progress.append((written, total)), max_rows_per_sheet=11
+    )
+
+    workbook = openpyxl.load_workbook(path, read_only=True)
+    assert workbook.sheetnames == ["Отчет", "Отчет (2)", "Отчет (3)"]
+    assert [len(list(sheet.iter_rows())) for sheet in workbook.worksheets] == [11, 11, 6]
+    assert next(workbook.active.iter_rows(min_row=2, max_row=2, values_only=True))[1] == "01.03.2024"
+    assert progress[-1] == (25, 25)
+
+
+def test_paginated_pdf_report(test_db, seed_orders, tmp_path):
+    """PDF строится постранично: страниц столько, сколько нужно, прогресс доходит до конца."""
+    pytest.importorskip("reportlab")
+    from reports.pdf_report import MARGIN, MAX_ROWS_PER_PAGE, PAGE_SIZE, TABLE_WIDTH, PDFReportGenerator
+
+    seed_orders(orders=MAX_ROWS_PER_PAGE * 2 + 5, workers=2, works=2)
+    progress = []
+    path = PDFReportGenerator(test_db, output_dir=tmp_path).generate(
+        filename="report.pdf", progress=lambda written, total: progress.append((written, total))
+    )
+
+    assert path is not None
+    content = Path(path).read_bytes()
+    assert content.startswith(b"%PDF")
+    assert content.count(b"/Type /Page\n") + content.count(b"/Type /Page ") == len(progress) >= 3
+    assert progress[-1] == (MAX_ROWS_PER_PAGE * 2 + 5,) * 2
+    generator = PDFReportGenerator(test_db, output_dir=tmp_path)
+    assert generator.generate(filters={"contract_code": "нет такого"}) is None
+    assert generator.generate(filters={"order_date": {"start": "31.12.2024", "end": "01.01.2024"}}) is None
+    assert generator.generate(filters={"order_id": {"end": 3}}, filename="first.pdf") is not None
+
+    # Строка выше страницы не уходит за поле: список рабочих сокращается
+    workers = ", ".join(f"Работник {i}" for i in range(2000))
+    pages = []
+    original_build = generator._build_table
+
+    def build_table(chunk, previous_total, is_last):
+        table = original_build(chunk, previous_total, is_last)
+        pages.append((table, chunk))
+        return table
+
+    generator._build_table = build_table
+    assert generator.generate_from_rows([(1, "2024-03-01", "Изделие", "К-1", 10.0, workers)], 1,
+                                        filename="long.pdf") is not None
+    (table, chunk), = pages
+    assert table.wrap(TABLE_WIDTH, PAGE_SIZE[1])[1] < PAGE_SIZE[1] - 2 * MARGIN
+    assert "и еще" in chunk[0].cells[-1].text
+
+
+def test_streaming_html_report(test_db, seed_orders, tmp_path, monkeypatch):
+    """HTML пишется пачками строк по шаблону, текст экранируется, итог в подвале таблицы."""
+    import reports.html_report as html_report
+
+    seed_orders(orders=5, workers=2, works=3)
+    test_db.execute_query("UPDATE products SET name = 'Изделие <A&B>' WHERE id = 1")
+    # Нераспознанная дата выводится как есть и тоже экранируется
+    test_db.execute_query("UPDATE work_orders SET order_date = '<b>\"' WHERE id = 5")
+    monkeypatch.setattr(html_report, "STREAM_BATCH_SIZE", 2)
+    progress = []
+    generator = html_report.HTMLReportGenerator(test_db, output_dir=tmp_path)
+    path = generator.generate(filename="report", progress=lambda written, total: progress.append((written, total)))
+
+    content = Path(path).read_text(encoding="utf-8")
+    assert path.endswith("report.html")
+    assert progress == [(2, 5), (4, 5), (5, 5)]
+    assert content.count("<tr><td class=\"num\">") == 5
+    assert "Изделие &lt;A&amp;B&gt;" in content and "<A&B>" not in content
+    assert '<td data-sort="2024-03-01">01.03.2024</td>' in content
+    assert '<td data-sort="&lt;b&gt;&quot;">&lt;b&gt;&quot;</td>' in content and "<b>" not in content
+    assert "$" not in content and "150.00" in content
+    assert html_report.load_template.cache_info().currsize == 1
+    assert generator.generate(filters={"contract_code": "нет такого"}) is None
+
+
+def test_batch_order_sheets(test_db, seed_orders, tmp_path):
+    """Бланки нарядов отрисовываются в пуле процессов и собираются в ZIP или один PDF."""
+    pytest.importorskip("reportlab")
+    import zipfile
+    from reports.order_sheets import OrderSheetPrinter
+
+    seed_orders(orders=7, workers=3, works=4)
+    printer = OrderSheetPrinter(test_db, output_dir=tmp_path, workers=2, sheets_per_task=2)
+    progress = []
+    path = printer.print_orders(output_format="zip", progress=lambda done, total: progress.append((done, total)))
+
+    with zipfile.ZipFile(path) as archive:
+        assert archive.namelist() == [f"naryad_{i:08d}.pdf" for i in range(1, 8)]
+    assert progress[-1] == (7, 7)
+    assert printer.print_orders(filters={"contract_code": "нет такого"}) is None
+    # Неверный период не расширяет отбор до всех нарядов
+    assert printer.print_orders(filters={"order_date": {"start": "31.12.2024", "end": "01.01.2024"}}) is None
+    march = printer.print_orders(output_format="zip", filters={"order_date": {"start": "01.03.2024", "end": "31.03.2024"}})
+    with zipfile.ZipFile(march) as archive:
+        assert len(archive.namelist()) == 7
+    assert printer.print_orders(filters={"order_date": {"start": "01.04.2024", "end": "30.04.2024"}}) is None
+
+    pypdf = pytest.importorskip("pypdf")
+    merged = printer.print_orders(filename="all")
+    assert merged.endswith("all.pdf")
+    assert len(pypdf.PdfReader(merged).pages) == 7
+
+    # Нераспознанная дата экранируется в разметке бланка, сумма берется из order_summary
+    test_db.execute_query("UPDATE work_orders SET order_date = '<b>&', total_amount = 999999 WHERE id = 1")
+    single = printer.print_orders(filters={"order_id": [1]}, filename="single")
+    text = pypdf.PdfReader(single).pages[0].extract_text()
+    assert "Дата: <b>&" in text and "999" not in text
+
+
+def test_report_bundle_from_snapshot(test_db, seed_orders, tmp_path):
+    """Комплект Excel/PDF/HTML строится по одному снимку строк, пустой комплект не остается."""
+    pytest.importorskip("reportlab")
+    openpyxl = pytest.importorskip("openpyxl")
+    from reports.bundle import ReportBundleGenerator
+
+    seed_orders(orders=12, workers=2, works=2)
+    progress = []
+    bundle = ReportBundleGenerator(test_db, output_dir=tmp_path, workers=2)
+    path = bundle.generate(filters={"order_id": {"end": 10}}, name="audit",
+                           progress=lambda done, total: progress.append((done, total)))
+
+    assert path is not None
+    assert sorted(p.name for p in Path(path).iterdir()) == ["report.html", "report.pdf", "report.xlsx"]
+    assert progress[-1] == (3, 3) and progress == sorted(progress)
+    sheet = openpyxl.load_workbook(Path(path) / "report.xlsx", read_only=True).active
+    assert sum(1 for _ in sheet.iter_rows()) == 11
+    assert (Path(path) / "report.html").read_text(encoding="utf-8").count('<tr><td class="num">') == 10
+    assert Path(path, "report.pdf").read_bytes().startswith(b"%PDF")
+
+    assert bundle.generate(filters={"contract_code": "нет такого"}, name="empty") is None
+    assert not (tmp_path / "empty").exists()
+
+    # Комплекты без имени, запущенные в одну секунду, получают разные каталоги; имя не переиспользуется
+    assert bundle._create_output_dir(None) != bundle._create_output_dir(None)
+    assert bundle.generate(name="audit") is None and (Path(path) / "report.pdf").exists()
+
+    # Символы, значимые в URI, в пути каталога не мешают открыть снимок
+    odd = ReportBundleGenerator(test_db, output_dir=tmp_path / "отчеты #1 100%", workers=1)
+    assert odd.generate(filters={"order_id": [1]}, name="odd") is not None
+
+
+def test_order_sheets_with_reader_slots_taken(test_db, seed_orders, tmp_path):
+    """Подробности нарядов читаются в слоте потокового чтения и не ждут свободного слота."""
+    pytest.importorskip("reportlab")
+    import threading
+    from reports.order_sheets import OrderSheetPrinter
+
+    seed_orders(orders=3, workers=2, works=2)
+    # Остальные слоты читателей заняты другими потоками (например, отчетами в очереди)
+    taken, release = threading.Event(), threading.Event()
+    holders = []
+
+    def hold():
+        with test_db.pool.reader():
+            taken.set()
+            release.wait(60)
+
+    for _ in range(3):
+        taken.clear()
+        holders.append(threading.Thread(target=hold))
+        holders[-1].start()
+        assert taken.wait(5)
+    try:
+        result = {}
+        printer = threading.Thread(target=lambda: result.update(path=OrderSheetPrinter(
+            test_db, output_dir=tmp_path, workers=1).print_orders(output_format="zip")))
+        printer.start()
+        printer.join(10)
+        assert not printer.is_alive() and result["path"].endswith(".zip")
+    finally:
+        release.set()
+        for holder in holders:
+            holder.join()
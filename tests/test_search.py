@@ -0,0 +1,29 @@
+def test_full_text_search(test_db):
+    """Индекс FTS5 следует за изменениями справочников, поиск идет по префиксам."""
+    from db.queries import EMPLOYEE_UPSERT, WORK_TYPE_INSERT
+    from db.search import build_match, search_employees, search_work_types
+
+    test_db.execute_many(EMPLOYEE_UPSERT, [
+        ("101", "Петров Сергей Иванович", 1, "Токарь"),
+        ("102", "Петрова Анна Сергеевна", 2, "Маляр"),
+        ("103", "Сидоров Петр Олегович", 1, "Сварщик"),
+    ])
+    rows = search_employees(test_db, "петр")
+    assert [row[1] for row in rows][:2] == ["101", "102"]
+    assert {row[1] for row in rows} == {"101", "102", "103"}
+    assert [row[1] for row in search_employees(test_db, "Петров иван")] == ["101"]
+    assert [row[1] for row in search_employees(test_db, "сварщик")] == ["103"]
+
+    # Переименование и удаление обновляют индекс
+    test_db.execute_query(EMPLOYEE_UPSERT, ("103", "Смирнов Петр Олегович", 1, "Сварщик"))
+    assert search_employees(test_db, "сидоров") == []
+    test_db.execute_query("DELETE FROM employees WHERE employee_id = ?", ("101",))
+    assert [row[1] for row in search_employees(test_db, "петров")] == ["102"]
+
+    test_db.execute_query(WORK_TYPE_INSERT, ("Сварка узла", "штуки", 100.0))
+    assert search_work_types(test_db, "свар")[0][1] == "Сварка узла"
+    assert len(search_work_types(test_db, "")) == 1
+    # Служебный синтаксис FTS5 во вводе не ломает запрос
+    assert search_work_types(test_db, '"*) (') == search_work_types(test_db, "")
+    assert search_work_types(test_db, "свар OR NEAR") == []
+    assert build_match("  ") is None
@@ -0,0 +1,37 @@
+# utils/dates.py
+from datetime import date, datetime
+from typing import Union
+
+# Формат ввода и отображения дат в интерфейсе
+DISPLAY_DATE_FORMAT = "%d.%m.%Y"
+# Формат хранения в БД: ISO-строка сортируется хронологически
+DB_DATE_FORMAT = "%Y-%m-%d"
+
+
+def to_db_date(value: Union[str, date]) -> str:
+    """Преобразует дату из интерфейса (ДД.ММ.ГГГГ) в формат хранения ГГГГ-ММ-ДД."""
+    if isinstance(value, date):
+        return value.strftime(DB_DATE_FORMAT)
+    return datetime.strptime(value.strip(), DISPLAY_DATE_FORMAT).strftime(DB_DATE_FORMAT)
+
+
+def from_db_date(value: str) -> str:
+    """Преобразует дату из БД (ГГГГ-ММ-ДД) в формат интерфейса ДД.ММ.ГГГГ."""
+    try:
+        return datetime.strptime(value, DB_DATE_FORMAT).strftime(DISPLAY_DATE_FORMAT)
+    except (TypeError, ValueError):
+        # Нераспознанное значение показываем как есть
+        return value
+
+
+def parse_date(value: Union[str, date]) -> str:
+    """Дата в формате хранения из date, ГГГГ-ММ-ДД или ДД.ММ.ГГГГ; иначе ValueError."""
+    if isinstance(value, date):
+        return value.strftime(DB_DATE_FORMAT)
+    text = str(value).strip()
+    for fmt in (DB_DATE_FORMAT, DISPLAY_DATE_FORMAT):
+        try:
+            return datetime.strptime(text, fmt).strftime(DB_DATE_FORMAT)
+        except ValueError:
+            continue
+    raise ValueError(f"Неверная дата: {value!r}")
@@ -1,12 +1,19 @@
 # utils/excel_handler.py
 import pandas as pd
 from pathlib import Path
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Iterator, Tuple
 from db.database import Database
+from db.queries import EMPLOYEES_IMPORT, WORK_TYPES_IMPORT
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Запросы пакетной вставки для импортируемых таблиц
+IMPORT_QUERIES = {
+    "employees": EMPLOYEES_IMPORT,
+    "work_types": WORK_TYPES_IMPORT
+}
+
 
 class ExcelHandler:
     """Класс для импорта/экспорта данных из Excel."""
@@ -47,11 +54,15 @@ class ExcelHandler:
             if not self._validate_columns(df, table_name):
                 return (False, "Неверная структура файла")
 
-            # Валидация и преобразование данных
-            for _, row in df.iterrows():
-                self._process_row(table_name, row)
+            # Все строки файла записываются одной транзакцией
+            inserted = self.db.execute_many(
+                IMPORT_QUERIES[table_name],
+                self._iter_rows(table_name, df)
+            )
+            if inserted is None:
+                return (False, "Ошибка записи в БД")
 
-            return (True, "Успешный импорт")
+            return (True, f"Успешный импорт: {inserted} записей")
 
         except Exception as e:
             return (False, f"Ошибка: {str(e)}")
@@ -62,13 +73,12 @@ class ExcelHandler:
         actual = set(df.columns)
         return expected == actual
 
-    def _process_row(self, table_name: str, row: pd.Series) -> None:
-        """Обрабатывает строку данных."""
-        # Пример для таблицы работников
+    def _iter_rows(self, table_name: str, df: pd.DataFrame) -> Iterator[Tuple]:
+        """Преобразует строки файла в параметры запроса вставки."""
         if table_name == "employees":
-            self.db.execute_query(
-                """INSERT INTO employees (full_name, workshop_number, position, employee_id)
-                   VALUES (?, ?, ?, ?)
-                   ON CONFLICT(employee_id) DO NOTHING""",
-                (row["ФИО"], row["Номер цеха"], row["Должность"], row["Табельный номер"])
-            )
\ No newline at end of file
+            columns = ["ФИО", "Номер цеха", "Должность", "Табельный номер"]
+        else:
+            columns = ["Наименование", "Единица измерения", "Цена"]
+
+        for row in df[columns].itertuples(index=False, name=None):
+            yield tuple(value.item() if hasattr(value, "item") else value for value in row)
\ No newline at end of file
@@ -0,0 +1,6 @@
+# utils/formatting.py
+
+
+def format_amount(value: float) -> str:
+    """Сумма в рублях с пробелом между разрядами: 1 234.50 ₽."""
+    return f"{value:,.2f} ₽".replace(",", " ")
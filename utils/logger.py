@@ -23,6 +23,18 @@ def configure_logging() -> None:
     )
     file_handler.setFormatter(formatter)
 
+    # Отдельный журнал медленных запросов к БД (см. db/profiler.py)
+    slow_handler = RotatingFileHandler(
+        filename=log_dir / "slow_queries.log",
+        maxBytes=5*1024*1024,  # 5 MB
+        backupCount=3,
+        encoding="utf-8"
+    )
+    slow_handler.setFormatter(logging.Formatter("%(asctime)s - %(message)s"))
+    slow_logger = logging.getLogger("db.slow_queries")
+    slow_logger.addHandler(slow_handler)
+    slow_logger.propagate = False
+
     # Консольный обработчик только для ошибок
     console_handler = logging.StreamHandler()
     console_handler.setLevel(logging.WARNING)
@@ -0,0 +1,5 @@
+# utils/progress.py
+from typing import Callable
+
+# Прогресс длительной операции: (выполнено, всего)
+ProgressCallback = Callable[[int, int], None]
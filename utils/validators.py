@@ -1,6 +1,7 @@
 # utils/validators.py
 from datetime import datetime
 from db.database import Database
+from db.queries import CONTRACT_CODE_EXISTS, EMPLOYEE_ID_EXISTS, WORK_TYPE_NAME_EXISTS
 from typing import Optional, Tuple
 
 
@@ -13,6 +14,13 @@ def validate_date(date_str: str) -> bool:
         return False
 
 
+def validate_date_range(start: str, end: str) -> bool:
+    """Проверяет, что обе даты корректны (ДД.ММ.ГГГГ) и начало не позже конца."""
+    if not (validate_date(start) and validate_date(end)):
+        return False
+    return datetime.strptime(start, "%d.%m.%Y") <= datetime.strptime(end, "%d.%m.%Y")
+
+
 def validate_positive_number(value: str, is_float: bool = False) -> bool:
     """Проверяет, что значение является положительным числом (целым или дробным)."""
     try:
@@ -22,28 +30,25 @@ def validate_positive_number(value: str, is_float: bool = False) -> bool:
         return False
 
 
-def validate_unique(field: str, value: str, table: str, db: Database) -> bool:
-    """Универсальная проверка уникальности значения в указанной таблице."""
-    result = db.execute_query(
-        f"SELECT COUNT(*) FROM {table} WHERE {field} = ?",
-        (value,)
-    )
+def validate_unique(query: str, params: tuple, db: Database) -> bool:
+    """Универсальная проверка уникальности: запрос COUNT(*) должен вернуть 0."""
+    result = db.execute_query(query, params)
     return result[0][0] == 0 if result else False
 
 
 def validate_unique_employee_id(employee_id: str, db: Database) -> bool:
     """Проверяет уникальность табельного номера."""
-    return validate_unique("employee_id", employee_id, "employees", db)
+    return validate_unique(EMPLOYEE_ID_EXISTS, (employee_id,), db)
 
 
 def validate_unique_contract_code(code: str, db: Database) -> bool:
     """Проверяет уникальность шифра контракта."""
-    return validate_unique("contract_code", code, "contracts", db)
+    return validate_unique(CONTRACT_CODE_EXISTS, (code,), db)
 
 
-def validate_unique_work_type_name(name: str, db: Database) -> bool:
-    """Проверяет уникальность наименования вида работ."""
-    return validate_unique("name", name, "work_types", db)
+def validate_unique_work_type_name(name: str, db: Database, exclude_id: Optional[int] = None) -> bool:
+    """Проверяет уникальность наименования вида работ (кроме редактируемого)."""
+    return validate_unique(WORK_TYPE_NAME_EXISTS, (name, exclude_id or 0), db)
 
 
 def validate_order_data(